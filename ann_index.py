@@ -0,0 +1,364 @@
+"""
+Approximate Nearest-Neighbour (ANN) Index for Item Vectors
+==========================================================
+
+Exact cosine similarity against every item vector (see the semantic search
+guide at the end of app.py) costs O(N·d) per query. This module provides an
+IVF (inverted file) index in pure numpy:
+
+- Coarse spherical k-means splits the catalog into ``n_lists`` cells.
+- Every vector is stored in its cell, cells are laid out contiguously on disk.
+- A query only scans the ``nprobe`` cells whose centroids are closest.
+
+``nprobe`` is the recall/latency knob: ``nprobe=1`` is fastest,
+``nprobe=n_lists`` is an exact search.
+
+All arrays are written as ``.npy`` files and opened with ``mmap_mode='r'``,
+so several processes share the same pages and loading is instant.
+
+USAGE:
+------
+    python ann_index.py build --csv books.csv --text-columns title authors --out indexes/books
+    python ann_index.py query --index indexes/books --text "harry potter" --k 5
+"""
+
+import argparse
+import json
+import os
+import zlib
+
+import numpy as np
+
+INDEX_FORMAT_VERSION = 1
+DEFAULT_VECTOR_DIM = 256
+ASSIGN_CHUNK_ROWS = 65536
+
+# Files making up an index directory
+CENTROIDS_FILE = 'centroids.npy'
+LIST_OFFSETS_FILE = 'list_offsets.npy'
+LIST_IDS_FILE = 'list_ids.npy'
+LIST_VECTORS_FILE = 'list_vectors.npy'
+META_FILE = 'meta.json'
+
+
+# ============================================================================
+# VECTORS
+# ============================================================================
+
+def hashed_text_vectors(texts, dim=DEFAULT_VECTOR_DIM, ngram=3, out=None):
+    """Embed texts as L2-normalised hashed character n-gram vectors.
+
+    A dependency-free stand-in for sentence-transformer embeddings: two titles
+    that share many character trigrams get a high cosine similarity. Hashing
+    uses crc32 so vectors are identical across processes and runs.
+
+    Args:
+        texts: Iterable of strings (None/NaN are treated as empty)
+        dim: Vector dimensionality
+        ngram: Character n-gram length
+        out: Optional preallocated float32 array (e.g. a memmap) of shape (N, dim)
+
+    Returns:
+        float32 array of shape (N, dim)
+    """
+    texts = list(texts)
+    if out is None:
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+
+    for row, text in enumerate(texts):
+        text = text if isinstance(text, str) else ''
+        padded = f" {text.lower()} "
+        vec = np.zeros(dim, dtype=np.float32)
+        for i in range(max(len(padded) - ngram + 1, 1)):
+            h = zlib.crc32(padded[i:i + ngram].encode('utf-8'))
+            # Signed hashing keeps collisions from always adding up
+            vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        out[row] = vec / norm if norm > 0 else vec
+    return out
+
+
+def save_vectors(path, vectors):
+    """Write item vectors (row order) to a .npy file that can be memory-mapped."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    mm = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=vectors.shape)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+        mm[start:start + ASSIGN_CHUNK_ROWS] = vectors[start:start + ASSIGN_CHUNK_ROWS]
+    mm.flush()
+    del mm
+
+
+def open_vectors(path):
+    """Open item vectors read-only as a shared memory map."""
+    return np.load(path, mmap_mode='r')
+
+
+def _normalize_rows(x):
+    """L2-normalise rows, leaving all-zero rows untouched."""
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def _top_k(scores, k):
+    """Return indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind='stable')]
+
+
+# ============================================================================
+# COARSE QUANTISER (SPHERICAL K-MEANS)
+# ============================================================================
+
+def _assign(vectors, centroids):
+    """Assign each vector to its most similar centroid, chunk by chunk."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK_ROWS], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors, n_lists, iters=10, sample_size=100_000, seed=0):
+    """Train coarse centroids with spherical k-means on a random sample.
+
+    Args:
+        vectors: (N, d) array or memmap of L2-normalised vectors
+        n_lists: Number of cells
+        iters: Lloyd iterations
+        sample_size: Maximum number of vectors used for training
+        seed: Random seed for reproducible builds
+
+    Returns:
+        float32 array of shape (n_lists, d)
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    sample_idx = np.sort(rng.choice(n, size=min(n, sample_size), replace=False))
+    sample = _normalize_rows(vectors[sample_idx])
+
+    n_lists = min(n_lists, len(sample))
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+    for _ in range(iters):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+        # Re-seed empty cells with random sample points
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize_rows(sums)
+
+    return centroids
+
+
+# ============================================================================
+# IVF INDEX
+# ============================================================================
+
+class IVFIndex:
+    """Inverted-file ANN index over memory-mapped, cell-ordered vectors.
+
+    Attributes:
+        centroids: (n_lists, d) coarse centroids
+        list_offsets: (n_lists + 1,) start offset of each cell
+        list_ids: (N,) row position of each stored vector
+        list_vectors: (N, d) vectors grouped by cell
+        nprobe: Default number of cells scanned per query
+    """
+
+    def __init__(self, centroids, list_offsets, list_ids, list_vectors, nprobe=8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.list_vectors = list_vectors
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.list_ids)
+
+    @classmethod
+    def build(cls, vectors, path, n_lists=None, iters=10, sample_size=100_000,
+              nprobe=8, seed=0):
+        """Build an index from item vectors and write it to ``path``.
+
+        Vectors are streamed in chunks, so ``vectors`` may itself be a memmap
+        larger than RAM.
+
+        Args:
+            vectors: (N, d) array or memmap of item vectors (row order)
+            path: Output directory
+            n_lists: Number of cells (default ~4·sqrt(N))
+            iters: k-means iterations
+            sample_size: k-means training sample size
+            nprobe: Default cells probed per query, stored in the metadata
+            seed: Random seed
+
+        Returns:
+            The freshly built IVFIndex, opened from disk
+        """
+        n, dim = vectors.shape
+        if n == 0:
+            raise ValueError("Cannot build an ANN index over zero vectors")
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(n)))
+
+        os.makedirs(path, exist_ok=True)
+        centroids = train_centroids(vectors, n_lists, iters=iters,
+                                    sample_size=sample_size, seed=seed)
+        assignments = _assign(vectors, centroids)
+
+        order = np.argsort(assignments, kind='stable').astype(np.int32)
+        counts = np.bincount(assignments, minlength=len(centroids))
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        np.save(os.path.join(path, CENTROIDS_FILE), centroids)
+        np.save(os.path.join(path, LIST_OFFSETS_FILE), offsets)
+        np.save(os.path.join(path, LIST_IDS_FILE), order)
+
+        list_vectors = np.lib.format.open_memmap(
+            os.path.join(path, LIST_VECTORS_FILE), mode='w+', dtype=np.float32, shape=(n, dim)
+        )
+        for start in range(0, n, ASSIGN_CHUNK_ROWS):
+            rows = order[start:start + ASSIGN_CHUNK_ROWS]
+            # Sorted gather keeps reads from a memmapped source sequential
+            sort = np.argsort(rows)
+            gathered = np.empty((len(rows), dim), dtype=np.float32)
+            gathered[sort] = _normalize_rows(vectors[rows[sort]])
+            list_vectors[start:start + len(rows)] = gathered
+        list_vectors.flush()
+        del list_vectors
+
+        meta = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'n_vectors': int(n),
+            'dim': int(dim),
+            'n_lists': int(len(centroids)),
+            'nprobe': int(nprobe),
+        }
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path, nprobe=None):
+        """Open an index directory; large arrays are memory-mapped read-only."""
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index format in {path}: {meta.get('format_version')}")
+
+        return cls(
+            centroids=np.load(os.path.join(path, CENTROIDS_FILE)),
+            list_offsets=np.load(os.path.join(path, LIST_OFFSETS_FILE)),
+            list_ids=np.load(os.path.join(path, LIST_IDS_FILE), mmap_mode='r'),
+            list_vectors=np.load(os.path.join(path, LIST_VECTORS_FILE), mmap_mode='r'),
+            nprobe=nprobe if nprobe is not None else meta['nprobe'],
+        )
+
+    def search(self, query, k=10, nprobe=None, exclude=None):
+        """Find the approximate k most similar items to a query vector.
+
+        Args:
+            query: (d,) query vector (normalised internally)
+            k: Number of neighbours to return
+            nprobe: Cells to scan (defaults to ``self.nprobe``)
+            exclude: Optional row position to leave out (e.g. the item itself)
+
+        Returns:
+            Tuple (row_positions int32 array, cosine_scores float32 array), best first
+        """
+        query = _normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+
+        cells = _top_k(self.centroids @ query, nprobe)
+        ids_parts, score_parts = [], []
+        for cell in cells:
+            start, end = self.list_offsets[cell], self.list_offsets[cell + 1]
+            if start == end:
+                continue
+            ids_parts.append(self.list_ids[start:end])
+            score_parts.append(self.list_vectors[start:end] @ query)
+
+        if not ids_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        if exclude is not None:
+            keep = ids != exclude
+            ids, scores = ids[keep], scores[keep]
+
+        best = _top_k(scores, k)
+        return ids[best].astype(np.int32), scores[best].astype(np.float32)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def _read_texts(csv_path, text_columns):
+    """Join the given CSV columns into one text per row (decoded like the app's loader)."""
+    from datasets import _read_csv_with_fallback
+
+    df = _read_csv_with_fallback(csv_path, usecols=text_columns)
+    return df[text_columns].fillna('').astype(str).agg(' '.join, axis=1).tolist()
+
+
+def main(argv=None):
+    """Build or query an IVF index from the command line."""
+    parser = argparse.ArgumentParser(description="Build or query an ANN index over catalog vectors.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Embed a CSV catalog and build an IVF index")
+    build.add_argument('--csv', required=True, help="Catalog CSV file")
+    build.add_argument('--text-columns', nargs='+', required=True, help="Columns to embed")
+    build.add_argument('--out', required=True, help="Output index directory")
+    build.add_argument('--dim', type=int, default=DEFAULT_VECTOR_DIM)
+    build.add_argument('--n-lists', type=int, default=None)
+    build.add_argument('--nprobe', type=int, default=8)
+
+    query = sub.add_parser('query', help="Query an existing index")
+    query.add_argument('--index', required=True, help="Index directory")
+    query.add_argument('--text', required=True, help="Query text")
+    query.add_argument('--k', type=int, default=10)
+    query.add_argument('--nprobe', type=int, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        texts = _read_texts(args.csv, args.text_columns)
+        os.makedirs(args.out, exist_ok=True)
+        vectors_path = os.path.join(args.out, 'vectors.npy')
+        # Embed straight into the memory-mapped file, so the matrix never has to fit in RAM
+        vectors = np.lib.format.open_memmap(vectors_path, mode='w+', dtype=np.float32,
+                                            shape=(len(texts), args.dim))
+        hashed_text_vectors(texts, dim=args.dim, out=vectors)
+        vectors.flush()
+        del vectors
+        index = IVFIndex.build(open_vectors(vectors_path), args.out,
+                               n_lists=args.n_lists, nprobe=args.nprobe)
+        print(f"✅ Indexed {len(index):,} vectors into {index.n_lists} lists at {args.out}")
+    else:
+        index = IVFIndex.load(args.index)
+        dim = index.centroids.shape[1]
+        ids, scores = index.search(hashed_text_vectors([args.text], dim=dim)[0],
+                                   k=args.k, nprobe=args.nprobe)
+        for row, score in zip(ids, scores):
+            print(f"{row}\t{score:.3f}")
+
+
+if __name__ == "__main__":
+    main()
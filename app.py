@@ -29,7 +29,7 @@ HOW TO RUN:
 
 REQUIREMENTS.TXT:
 -----------------
-streamlit>=1.28.0
+streamlit>=1.65.0
 pandas>=2.0.0
 pillow>=10.0.0
 rapidfuzz>=3.0.0
@@ -51,14 +51,51 @@ FUTURE ENHANCEMENTS (commented sections in code):
 ======================================================================================
 """
 
-import streamlit as st
-import pandas as pd
 import time
-from io import BytesIO
-from PIL import Image, ImageOps, ImageDraw, ImageFont
-import requests
-from rapidfuzz import fuzz, process
+
+_SCRIPT_START = time.perf_counter()
+
+import streamlit as st
+import os
+from io import BufferedReader, BytesIO
 import base64
+import html
+import json
+import logging
+import queue
+import uuid
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from startup import BUDGETS_MS, lazy_module, over_budget
+from metrics import REGISTRY
+from dataset_cache import ByteBudgetCache, dataframe_nbytes
+from cooccurrence import CooccurrenceTracker
+
+# Modules that pull in pandas/numpy are imported on first attribute access,
+# i.e. when a tab first loads its dataset (see startup.py). PIL, requests and rapidfuzz are
+# imported inside the functions that need them.
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
+datasets = lazy_module('datasets')
+bundle = lazy_module('bundle')
+neighbours = lazy_module('neighbours')
+prefix_index = lazy_module('prefix_index')
+search_engine = lazy_module('search_engine')
+export = lazy_module('export')
+single_flight = lazy_module('single_flight')
+search_pool = lazy_module('search_pool')
+sharding = lazy_module('sharding')
+session_memory = lazy_module('session_memory')
+memory_report = lazy_module('memory_report')
+warmup = lazy_module('warmup')
+query_log = lazy_module('query_log')
+shadow = lazy_module('shadow')
+range_index = lazy_module('range_index')
+frozen_frame = lazy_module('frozen_frame')
+
+_IMPORT_MS = (time.perf_counter() - _SCRIPT_START) * 1000
 
 # ============================================================================
 # CONFIGURATION & STYLING
@@ -214,6 +251,41 @@ def inject_custom_css():
         font-weight: 600;
     }
     
+    /* Pre-rendered result grids */
+    .card-grid {
+        display: grid;
+        gap: 1rem;
+        align-items: start;
+    }
+    
+    .card-image {
+        width: 100%;
+        aspect-ratio: 2 / 3;
+        object-fit: cover;
+        border-radius: 10px;
+    }
+    
+    .card-caption {
+        color: #a0a0a0;
+        font-size: 0.85rem;
+        text-align: center;
+        margin: 0.25rem 0 0.5rem;
+    }
+    
+    .recommendation-card details {
+        margin-top: 0.5rem;
+        border: 2px solid #00d4ff;
+        border-radius: 8px;
+        padding: 0.4rem 0.75rem;
+        background-color: #2a2a2a;
+    }
+    
+    .recommendation-card summary {
+        color: #00d4ff;
+        font-weight: 600;
+        cursor: pointer;
+    }
+    
     /* Rating stars */
     .rating-stars {
         color: #fff200;
@@ -243,47 +315,13 @@ def inject_custom_css():
 BOOK_IMAGE_SIZE = (300, 450)
 MOVIE_IMAGE_SIZE = (300, 450)
 
-def _convert_enrollment_to_numeric(value):
-    """Convert enrollment strings like '5.3k', '17k', '130k' to numeric values.
-    
-    Args:
-        value: String or numeric value
-    
-    Returns:
-        Numeric value (e.g., '5.3k' -> 5300, '17k' -> 17000)
-    """
-    if pd.isna(value):
-        return 0
-    
-    if isinstance(value, (int, float)):
-        return int(value)
-    
-    # Convert string like '5.3k' or '17k' to numeric
-    value_str = str(value).strip().lower()
-    
-    if 'k' in value_str:
-        try:
-            num = float(value_str.replace('k', ''))
-            return int(num * 1000)
-        except ValueError:
-            return 0
-    elif 'm' in value_str:
-        try:
-            num = float(value_str.replace('m', ''))
-            return int(num * 1000000)
-        except ValueError:
-            return 0
-    else:
-        try:
-            return int(float(value_str))
-        except ValueError:
-            return 0
-
 def _make_placeholder_image(size, text="No Image"):
     """Create a solid placeholder image of the given size with centered text.
 
     Ensures a consistent aspect ratio across items to preserve grid alignment.
     """
+    from PIL import Image, ImageDraw, ImageFont
+
     width, height = size
     bg_color = (42, 42, 42)
     fg_color = (0, 212, 255)  # neon blue accent
@@ -305,6 +343,9 @@ def _load_image_with_fallback(url: str, size, placeholder_text: str):
 
     Uses ImageOps.fit to preserve aspect ratio and crop/letterbox to target size.
     """
+    import requests
+    from PIL import Image, ImageOps
+
     try:
         if url and isinstance(url, str) and url.startswith("http"):
             resp = requests.get(url, timeout=4)
@@ -316,439 +357,477 @@ def _load_image_with_fallback(url: str, size, placeholder_text: str):
         pass
     return _make_placeholder_image(size, placeholder_text)
 
-@st.cache_data
-def load_books_dataset(file_path=None, uploaded_file=None):
-    """Load and validate books dataset from CSV file."""
+def _load_bundled(kind):
+    """Preprocessed default dataset from its warm-start bundle, or None to parse the CSV."""
     try:
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file, encoding='latin-1')
-        else:
-            # Try different encodings
-            try:
-                df = pd.read_csv(file_path if file_path else 'books.csv', encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    df = pd.read_csv(file_path if file_path else 'books.csv', encoding='latin-1')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file_path if file_path else 'books.csv', encoding='ISO-8859-1')
-        
-        required_cols = ['title', 'authors', 'average_rating', 'image_url']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        
-        if missing_cols:
-            st.error(f"❌ Books dataset missing required columns: {missing_cols}")
-            return None
-        
-        # Preprocess: handle missing values and convert types
-        df['title'] = df['title'].fillna('Unknown Title')
-        df['authors'] = df['authors'].fillna('Unknown Author')
-        df['average_rating'] = pd.to_numeric(df['average_rating'], errors='coerce').fillna(0)
-        df['original_publication_year'] = pd.to_numeric(df['original_publication_year'], errors='coerce').fillna(0)
-        df['image_url'] = df['image_url'].fillna('')
-        df['original_title'] = df['original_title'].fillna(df['title'])
-        df['language_code'] = df['language_code'].fillna('en')
-        
-        # Create lowercase search columns
-        df['title_lower'] = df['title'].str.lower()
-        df['authors_lower'] = df['authors'].str.lower()
-        df['original_title_lower'] = df['original_title'].str.lower()
-        
-        return df
+        return bundle.load_bundled_dataset(kind)
+    except bundle.StaleBundleError as e:
+        st.warning(f"⚠️ Ignoring stale {kind} bundle ({e}). Rebuild it with `python run_app.py build`.")
+    except bundle.BundleError:
+        pass
+    return None
+
+
+def _load_dataset(kind, file_path=None, uploaded_file=None):
+    """Load a catalog via its bundle or datasets.load_catalog, reporting failures in the UI."""
+    try:
+        if file_path is None and uploaded_file is None:
+            df = _load_bundled(kind)
+            if df is not None:
+                return df
+        return datasets.load_catalog(kind, file_path=file_path, uploaded_file=uploaded_file)
     except FileNotFoundError:
-        st.error("❌ books.csv not found. Please upload the file or place it in the same directory.")
+        st.error(f"❌ {datasets.CATALOGS[kind]['file']} not found. Please upload the file or place it in the same directory.")
+        return None
+    except datasets.MissingColumnsError as e:
+        st.error(f"❌ {e}")
         return None
     except Exception as e:
-        st.error(f"❌ Error loading books dataset: {str(e)}")
+        st.error(f"❌ Error loading {kind} dataset: {str(e)}")
         return None
 
 
-@st.cache_data
+# Total memory for cached datasets (bundled defaults are pinned, uploads are LRU-evicted)
+DATASET_CACHE_BYTES = int(float(os.environ.get('RECOMMENDER_DATASET_CACHE_MB', '1024')) * 1024 * 1024)
+
+
+@st.cache_resource
+def get_dataset_cache():
+    """Process-wide byte-budgeted cache of loaded datasets."""
+    return ByteBudgetCache(DATASET_CACHE_BYTES, sizeof=dataframe_nbytes)
+
+
+@st.cache_resource
+def get_dataset_flights():
+    """Single-flight group so concurrent loads of one dataset parse it once."""
+    return single_flight.SingleFlight('dataset.flights', REGISTRY)
+
+
+def _cached_dataset(kind, file_path=None, uploaded_file=None):
+    """Load a dataset through the byte-budgeted cache.
+    
+    Uploads are keyed by a hash of their content and evicted LRU when the
+    budget is exceeded. The bundled default file is keyed by its mtime/size and
+    pinned; a newer version of it atomically replaces the old pinned entry.
+    Concurrent loads of the same key share one parse. Every caller gets the
+    same read-only DataFrame (see frozen_frame.py), never a copy.
+    """
+    cache = get_dataset_cache()
+    if uploaded_file is not None:
+        key = (kind, 'upload', datasets.source_version(uploaded_file.getvalue()))
+        pinned = False
+    else:
+        path = file_path if file_path else datasets.default_path(kind)
+        try:
+            stat = os.stat(path)
+            key = (kind, 'file', os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            # No CSV: a bundle may still provide the dataset
+            key = (kind, 'file', os.path.abspath(path), None, None)
+        pinned = file_path is None
+    
+    df = cache.get(key)
+    if df is not None:
+        return df
+    
+    def load():
+        df = _load_dataset(kind, file_path=file_path, uploaded_file=uploaded_file)
+        if df is not None:
+            # Shared by every session as is: write-protect it, then swap out the previous version
+            df = frozen_frame.freeze(df)
+            replaces = (lambda k: k[:3] == key[:3] and k != key) if pinned else None
+            cache.put(key, df, pinned=pinned, replaces=replaces)
+        return df
+    
+    # The startup warm-up and the first visitor may ask for the same file at once
+    df, _ = get_dataset_flights().do(key, load)
+    return df
+
+
+def load_books_dataset(file_path=None, uploaded_file=None):
+    """Load and validate books dataset from CSV file."""
+    return _cached_dataset('books', file_path=file_path, uploaded_file=uploaded_file)
+
+
 def load_courses_dataset(file_path=None, uploaded_file=None):
     """Load and validate courses dataset from CSV file."""
-    try:
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file, encoding='latin-1')
-        else:
-            # Try different encodings
-            try:
-                df = pd.read_csv(file_path if file_path else 'courses.csv', encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    df = pd.read_csv(file_path if file_path else 'courses.csv', encoding='latin-1')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file_path if file_path else 'courses.csv', encoding='ISO-8859-1')
-        
-        required_cols = ['course_title', 'course_rating', 'course_difficulty']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        
-        if missing_cols:
-            st.error(f"❌ Courses dataset missing required columns: {missing_cols}")
-            return None
-        
-        # Preprocess
-        df['course_title'] = df['course_title'].fillna('Unknown Course')
-        df['course_organization'] = df['course_organization'].fillna('Unknown')
-        df['course_rating'] = pd.to_numeric(df['course_rating'], errors='coerce').fillna(0)
-        df['course_difficulty'] = df['course_difficulty'].fillna('Unknown')
-        # Convert enrollment strings like '5.3k', '17k' to proper numbers
-        df['course_students_enrolled'] = df['course_students_enrolled'].apply(_convert_enrollment_to_numeric)
-        df['course_Certificate_type'] = df['course_Certificate_type'].fillna('N/A')
-        
-        # Create lowercase search columns
-        df['course_title_lower'] = df['course_title'].str.lower()
-        df['course_difficulty_lower'] = df['course_difficulty'].str.lower()
-        
-        return df
-    except FileNotFoundError:
-        st.error("❌ courses.csv not found. Please upload the file or place it in the same directory.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading courses dataset: {str(e)}")
-        return None
+    return _cached_dataset('courses', file_path=file_path, uploaded_file=uploaded_file)
 
 
-@st.cache_data
 def load_movies_dataset(file_path=None, uploaded_file=None):
     """Load and validate movies dataset from CSV file."""
-    try:
-        if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file, encoding='latin-1')
-        else:
-            # Try different encodings
-            try:
-                df = pd.read_csv(file_path if file_path else 'movies.csv', encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    df = pd.read_csv(file_path if file_path else 'movies.csv', encoding='latin-1')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file_path if file_path else 'movies.csv', encoding='ISO-8859-1')
-        
-        required_cols = ['Title', 'IMDB Score', 'Genre', 'Poster']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        
-        if missing_cols:
-            st.error(f"❌ Movies dataset missing required columns: {missing_cols}")
-            return None
-        
-        # Preprocess
-        df['Title'] = df['Title'].fillna('Unknown Movie')
-        df['IMDB Score'] = pd.to_numeric(df['IMDB Score'], errors='coerce').fillna(0)
-        df['Genre'] = df['Genre'].fillna('Unknown')
-        df['Poster'] = df['Poster'].fillna('')
-        df['Imdb Link'] = df['Imdb Link'].fillna('')
-        
-        # Create lowercase search columns
-        df['Title_lower'] = df['Title'].str.lower()
-        df['Genre_lower'] = df['Genre'].str.lower()
-        
-        return df
-    except FileNotFoundError:
-        st.error("❌ movies.csv not found. Please upload the file or place it in the same directory.")
-        return None
-    except Exception as e:
-        st.error(f"❌ Error loading movies dataset: {str(e)}")
-        return None
+    return _cached_dataset('movies', file_path=file_path, uploaded_file=uploaded_file)
+
+
+def preview_rows(df, n_rows=3):
+    """First rows of a dataset for display, without its attrs (st.dataframe sends them to the browser as JSON)."""
+    rows = df.head(n_rows)
+    rows.attrs = {}
+    return rows
 
 
 # ============================================================================
-# RECOMMENDATION LOGIC - BOOKS
+# SIMILAR ITEMS ("MORE LIKE THIS")
 # ============================================================================
 
-def recommend_books(df, book_name='', genre='', publisher='', top_n=5):
-    """
-    Recommend books based on title, genre, and publisher using substring and fuzzy matching.
-    
-    Args:
-        df: Books DataFrame
-        book_name: Book title to search for
-        genre: Genre to filter by
-        publisher: Publisher/author to filter by
-        top_n: Number of recommendations to return
-    
-    Returns:
-        DataFrame of recommended books
+@st.cache_resource
+def get_neighbour_table(kind, dataset_version, n_items):
+    """Open the precomputed neighbour table for a dataset, if one was built for it.
+
+    Tables are produced offline with ``python neighbours.py <kind>``.
     """
-    if df is None or df.empty:
-        return pd.DataFrame()
-    
-    # Start with full dataset
-    filtered_df = df.copy()
-    
-    # If no inputs provided, return top-rated books
-    if not book_name and not genre and not publisher:
-        return filtered_df.nlargest(top_n, 'average_rating')
-    
-    # Apply filters independently (AND logic: all specified filters must match)
-    
-    # Filter by book title if provided
-    if book_name:
-        book_name_lower = book_name.lower()
-        
-        # Substring matching on title and original_title
-        mask = (filtered_df['title_lower'].str.contains(book_name_lower, na=False, regex=False) |
-                filtered_df['original_title_lower'].str.contains(book_name_lower, na=False, regex=False))
-        
-        substring_matches = filtered_df[mask]
-        
-        # If few results, add fuzzy matching
-        if len(substring_matches) < top_n:
-            # Use RapidFuzz for fuzzy matching
-            titles = filtered_df['title'].tolist()
-            fuzzy_matches = process.extract(book_name, titles, scorer=fuzz.ratio, limit=top_n * 2)
-            fuzzy_indices = [filtered_df[filtered_df['title'] == match[0]].index[0] 
-                           for match in fuzzy_matches if match[1] > 60]
-            
-            fuzzy_df = filtered_df.loc[fuzzy_indices]
-            filtered_df = pd.concat([substring_matches, fuzzy_df]).drop_duplicates()
-        else:
-            filtered_df = substring_matches
-    
-    # Filter by genre if provided (search in title as proxy for genre keywords)
-    if genre:
-        genre_lower = genre.lower()
-        filtered_df = filtered_df[
-            filtered_df['title_lower'].str.contains(genre_lower, na=False, regex=False) |
-            filtered_df['original_title_lower'].str.contains(genre_lower, na=False, regex=False)
-        ]
-    
-    # Filter by publisher/author if provided
-    if publisher:
-        publisher_lower = publisher.lower()
-        filtered_df = filtered_df[
-            filtered_df['authors_lower'].str.contains(publisher_lower, na=False, regex=False)
-        ]
-    
-    # Sort by rating and return top N
-    if not filtered_df.empty:
-        return filtered_df.nlargest(min(top_n, len(filtered_df)), 'average_rating')
-    
-    return pd.DataFrame()
-
-
-def display_book_card(book, col):
-    """Display a single book recommendation card."""
-    with col:
-        st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
-        
-        # Display book cover with robust same-ratio placeholder fallback (2:3)
-        img = _load_image_with_fallback(book.get('image_url', ''), BOOK_IMAGE_SIZE, "No Cover")
-        st.image(img, width='stretch', caption=book['title'])
-        
-        # Book details
-        st.markdown(f"### 📚 {book['title']}")
-        st.markdown(f"**Author(s):** {book['authors']}")
-        
-        if book['original_publication_year'] > 0:
-            st.markdown(f"**Year:** {int(book['original_publication_year'])}")
-        
-        st.markdown(f"**Language:** {book['language_code']}")
-        
-        # Rating display
-        rating = float(book['average_rating'])
-        stars = "⭐" * int(rating)
-        st.markdown(f'<div class="rating-stars">{stars} {rating:.2f}/5.0</div>', unsafe_allow_html=True)
-        
-        # Ratings breakdown
-        if all(col in book.index for col in ['ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5']):
-            with st.expander("📊 Ratings Breakdown"):
-                total_ratings = sum([book[f'ratings_{i}'] for i in range(1, 6)])
-                if total_ratings > 0:
-                    for i in range(5, 0, -1):
-                        count = int(book[f'ratings_{i}'])
-                        percentage = (count / total_ratings) * 100
-                        st.markdown(f"{i}⭐: {count:,} ({percentage:.1f}%)")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    return neighbours.load_neighbour_table(kind, dataset_version, n_items)
+
+
+def similar_titles(df, kind, label, k=5):
+    """Titles of the precomputed nearest neighbours of the row with index ``label``."""
+    table = get_neighbour_table(kind, df.attrs.get('dataset_version'), len(df))
+    if table is None:
+        return []
+    ids, _ = table.neighbours(df.index.get_loc(label), k)
+    return df[datasets.CATALOGS[kind]['title_col']].iloc[ids].tolist()
+
+
+def _similar_html(similar):
+    """HTML for a collapsible "More like this" list inside a card."""
+    if not similar:
+        return ''
+    items = ''.join(f'<li>{html.escape(str(title))}</li>' for title in similar)
+    return f'<details><summary>🔗 More like this</summary><ul>{items}</ul></details>'
 
 
 # ============================================================================
-# RECOMMENDATION LOGIC - COURSES
+# AUTOCOMPLETE
 # ============================================================================
 
-def recommend_courses(df, course_title='', difficulty='', top_n=5):
+@st.cache_resource(max_entries=8)
+def get_prefix_index(kind, dataset_version, _df):
+    """Prefix index over a dataset's titles, from the bundle or built once per dataset version."""
+    index = bundle.load_bundled_prefix_index(kind, dataset_version)
+    if index is not None:
+        return index
+    meta = datasets.CATALOGS[kind]
+    return prefix_index.PrefixIndex(_df[meta['title_col']].tolist(), _df[meta['rating_col']].to_numpy())
+
+
+def warm_prefix_index(kind, df):
+    """Build a tab's autocomplete index as soon as its dataset loads, before the first keystroke."""
+    if df is not None:
+        get_prefix_index(kind, df.attrs.get('dataset_version'), df)
+
+
+def autocomplete(df, kind, prefix, k=6):
+    """Top-rated, de-duplicated titles starting with the text typed so far."""
+    if df is None or not prefix_index.normalize_title(prefix):
+        return []
+    index = get_prefix_index(kind, df.attrs.get('dataset_version'), df)
+    titles = df[datasets.CATALOGS[kind]['title_col']]
+    suggestions = []
+    for position in index.suggest(prefix, k * 2):
+        title = titles.iloc[position]
+        if title not in suggestions:
+            suggestions.append(title)
+        if len(suggestions) == k:
+            break
+    return suggestions
+
+
+@st.fragment
+def title_input_with_suggestions(label, placeholder, key, kind, df):
+    """Title box that suggests matching titles while the user types.
+
+    Runs as a fragment so each typing pause only reruns the input and its
+    suggestions, not the whole page.
     """
-    Recommend courses based on title and difficulty using substring and fuzzy matching.
+    value = st.text_input(label, placeholder=placeholder, key=key, live=True)
+    suggestions = [title for title in autocomplete(df, kind, value) if title != value]
+    if suggestions:
+        st.pills(
+            "💡 Suggestions",
+            suggestions,
+            key=f'{key}_suggestions',
+            on_change=_apply_suggestion,
+            args=(kind, f'{key}_suggestions', key)
+        )
+    return value
+
+
+# ============================================================================
+# RESULT CARDS - BOOKS
+# ============================================================================
+
+BOOK_CARD_COLUMNS = ['title', 'authors', 'original_publication_year', 'language_code', 'average_rating',
+                     'image_url', 'ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5', 'editions']
+
+
+def _book_card_html(book, image_uri, similar=None):
+    """Pre-rendered HTML for a single book recommendation card."""
+    title = html.escape(str(book['title']))
+    parts = [
+        '<div class="recommendation-card">',
+        f'<img class="card-image" src="{image_uri}" alt="{title}">',
+        f'<div class="card-caption">{title}</div>',
+        f'<h3>📚 {title}</h3>',
+        f'<p><strong>Author(s):</strong> {html.escape(str(book["authors"]))}</p>',
+    ]
+    
+    if book['original_publication_year'] > 0:
+        parts.append(f'<p><strong>Year:</strong> {int(book["original_publication_year"])}</p>')
+    
+    parts.append(f'<p><strong>Language:</strong> {html.escape(str(book["language_code"]))}</p>')
+    
+    # Only collapsed catalogs (one row per work) count editions
+    if not pd.isna(book['editions']) and book['editions'] > 1:
+        parts.append(f'<p><strong>Editions:</strong> {int(book["editions"]):,}</p>')
+    
+    # Rating display
+    rating = float(book['average_rating'])
+    stars = "⭐" * int(rating)
+    parts.append(f'<div class="rating-stars">{stars} {rating:.2f}/5.0</div>')
+    
+    # Ratings breakdown (columns are NaN when the dataset lacks them)
+    counts = [book[f'ratings_{i}'] for i in range(1, 6)]
+    if not any(pd.isna(count) for count in counts):
+        rows = []
+        total_ratings = sum(counts)
+        if total_ratings > 0:
+            for i in range(5, 0, -1):
+                count = int(counts[i - 1])
+                percentage = (count / total_ratings) * 100
+                rows.append(f'<p>{i}⭐: {count:,} ({percentage:.1f}%)</p>')
+        parts.append(f'<details><summary>📊 Ratings Breakdown</summary>{"".join(rows)}</details>')
+    
+    parts.append(_similar_html(similar))
+    parts.append('</div>')
+    return ''.join(parts)
+
+
+# ============================================================================
+# RESULT CARDS - COURSES
+# ============================================================================
+
+COURSE_CARD_COLUMNS = ['course_title', 'course_organization', 'course_Certificate_type', 'course_rating',
+                       'course_difficulty', 'course_students_enrolled']
+
+DIFFICULTY_COLORS = {
+    'beginner': '#00ff9f',
+    'intermediate': '#fff200',
+    'advanced': '#ff6b6b',
+    'mixed': '#00d4ff'
+}
+
+
+def _course_card_html(course, image_uri=None, similar=None):
+    """Pre-rendered HTML for a single course recommendation card."""
+    parts = [
+        '<div class="recommendation-card">',
+        f'<h3>🎓 {html.escape(str(course["course_title"]))}</h3>',
+        f'<p><strong>Organization:</strong> {html.escape(str(course["course_organization"]))}</p>',
+        f'<p><strong>Certificate:</strong> {html.escape(str(course["course_Certificate_type"]))}</p>',
+    ]
+    
+    # Rating display
+    rating = float(course['course_rating'])
+    stars = "⭐" * int(rating)
+    parts.append(f'<div class="rating-stars">{stars} {rating:.2f}/5.0</div>')
+    
+    # Difficulty badge
+    difficulty = str(course['course_difficulty'])
+    diff_lower = difficulty.lower()
+    badge_color = next((color for key, color in DIFFICULTY_COLORS.items() if key in diff_lower), '#00d4ff')
+    parts.append(
+        f'<div style="background-color: {badge_color}; color: #1f1f1f; '
+        f'padding: 5px 15px; border-radius: 20px; display: inline-block; '
+        f'font-weight: bold; margin: 10px 0;">{html.escape(difficulty)}</div>'
+    )
+    
+    # Students enrolled
+    students = int(course['course_students_enrolled'])
+    parts.append(f'<p><strong>👥 Students Enrolled:</strong> {students:,}</p>')
+    
+    parts.append(_similar_html(similar))
+    parts.append('</div>')
+    return ''.join(parts)
+
+
+# ============================================================================
+# RESULT CARDS - MOVIES
+# ============================================================================
+
+MOVIE_CARD_COLUMNS = ['Title', 'IMDB Score', 'Genre', 'Imdb Link', 'Poster']
+
+
+def _movie_card_html(movie, image_uri, similar=None):
+    """Pre-rendered HTML for a single movie recommendation card."""
+    title = html.escape(str(movie['Title']))
+    parts = [
+        '<div class="recommendation-card">',
+        f'<img class="card-image" src="{image_uri}" alt="{title}">',
+        f'<div class="card-caption">{title}</div>',
+        f'<h3>🎬 {title}</h3>',
+    ]
+    
+    # IMDB Score
+    score = float(movie['IMDB Score'])
+    stars = "⭐" * int(score / 2)  # Convert 10-point scale to 5-star
+    parts.append(f'<div class="rating-stars">{stars} {score:.1f}/10</div>')
+    
+    # Genre
+    parts.append(f'<p><strong>Genre:</strong> {html.escape(str(movie["Genre"]))}</p>')
+    
+    # IMDB Link
+    if movie['Imdb Link']:
+        parts.append(f'<p><a href="{html.escape(str(movie["Imdb Link"]), quote=True)}" target="_blank">🔗 View on IMDB</a></p>')
+    
+    parts.append(_similar_html(similar))
+    parts.append('</div>')
+    return ''.join(parts)
+
+
+# ============================================================================
+# RESULT GRID RENDERING
+# ============================================================================
+
+# Byte budget for resized cover/poster images kept as JPEG data URIs
+IMAGE_CACHE_BYTES = int(float(os.environ.get('RECOMMENDER_IMAGE_CACHE_MB', '64')) * 1024 * 1024)
+IMAGE_FETCH_WORKERS = 8
+
+# Per catalog: card builder, columns it reads, image column/size/placeholder, grid width
+CARD_SPECS = {
+    'books': (_book_card_html, BOOK_CARD_COLUMNS, 'image_url', BOOK_IMAGE_SIZE, "No Cover", 3),
+    'courses': (_course_card_html, COURSE_CARD_COLUMNS, None, None, None, 2),
+    'movies': (_movie_card_html, MOVIE_CARD_COLUMNS, 'Poster', MOVIE_IMAGE_SIZE, "No Poster", 4),
+}
+
+
+@st.cache_resource
+def get_image_cache():
+    """Process-wide byte-budgeted cache of resized images as data URIs."""
+    return ByteBudgetCache(IMAGE_CACHE_BYTES, sizeof=len)
+
+
+@st.cache_resource
+def get_image_fetch_pool():
+    """Thread pool for fetching card images concurrently."""
+    return ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS, thread_name_prefix='image-fetch')
+
+
+def _image_data_uri(url, size, placeholder_text, cache):
+    """Fetch and resize an image (or its placeholder) as a cached JPEG data URI."""
+    key = (url, size, placeholder_text)
+    uri = cache.get(key)
+    if uri is None:
+        img = _load_image_with_fallback(url, size, placeholder_text)
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=85)
+        uri = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+        cache.put(key, uri)
+    return uri
+
+
+def build_cards_html(kind, df, recommendations):
+    """Pre-render one card per result row from array-backed records.
     
-    Args:
-        df: Courses DataFrame
-        course_title: Course title to search for
-        difficulty: Difficulty level to filter by
-        top_n: Number of recommendations to return
+    Only the columns a card reads are materialised, rows are walked with
+    itertuples, and images are fetched concurrently through the image cache.
     
     Returns:
-        DataFrame of recommended courses
+        List of card HTML strings in result order
     """
-    if df is None or df.empty:
-        return pd.DataFrame()
-    
-    filtered_df = df.copy()
-    
-    # If no inputs, return top-rated courses
-    if not course_title and not difficulty:
-        return filtered_df.nlargest(min(top_n, len(filtered_df)), 'course_rating')
-    
-    # Filter by course title
-    if course_title:
-        course_title_lower = course_title.lower()
-        
-        # Substring matching
-        mask = filtered_df['course_title_lower'].str.contains(course_title_lower, na=False, regex=False)
-        substring_matches = filtered_df[mask]
-        
-        # Fuzzy matching if few results
-        if len(substring_matches) < top_n:
-            titles = filtered_df['course_title'].tolist()
-            fuzzy_matches = process.extract(course_title, titles, scorer=fuzz.ratio, limit=top_n * 2)
-            fuzzy_indices = [filtered_df[filtered_df['course_title'] == match[0]].index[0] 
-                           for match in fuzzy_matches if match[1] > 60]
-            
-            fuzzy_df = filtered_df.loc[fuzzy_indices]
-            filtered_df = pd.concat([substring_matches, fuzzy_df]).drop_duplicates()
-        else:
-            filtered_df = substring_matches
-    
-    # Filter by difficulty
-    if difficulty:
-        difficulty_lower = difficulty.lower()
-        filtered_df = filtered_df[
-            filtered_df['course_difficulty_lower'].str.contains(difficulty_lower, na=False, regex=False)
-        ]
-    
-    # Sort by rating, then by enrolled students
-    if not filtered_df.empty:
-        filtered_df = filtered_df.sort_values(
-            by=['course_rating', 'course_students_enrolled'],
-            ascending=[False, False]
-        )
-        return filtered_df.head(min(top_n, len(filtered_df)))
-    
-    return pd.DataFrame()
+    card_fn, columns, image_col, image_size, placeholder, _ = CARD_SPECS[kind]
+    records = recommendations.reindex(columns=columns)
+    
+    image_uris = [None] * len(records)
+    if image_col:
+        cache = get_image_cache()
+        urls = records[image_col].fillna('').tolist()
+        image_uris = list(get_image_fetch_pool().map(
+            lambda url: _image_data_uri(url, image_size, placeholder, cache), urls
+        ))
+    
+    cards = []
+    for (label, *values), image_uri in zip(records.itertuples(name=None), image_uris):
+        record = dict(zip(columns, values))
+        cards.append(card_fn(record, image_uri, similar=similar_titles(df, kind, label)))
+    return cards
 
 
-def display_course_card(course, col):
-    """Display a single course recommendation card."""
-    with col:
-        st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
-        
-        st.markdown(f"### 🎓 {course['course_title']}")
-        st.markdown(f"**Organization:** {course['course_organization']}")
-        st.markdown(f"**Certificate:** {course['course_Certificate_type']}")
-        
-        # Rating display
-        rating = float(course['course_rating'])
-        stars = "⭐" * int(rating)
-        st.markdown(f'<div class="rating-stars">{stars} {rating:.2f}/5.0</div>', unsafe_allow_html=True)
-        
-        # Difficulty badge
-        difficulty = course['course_difficulty']
-        color_map = {
-            'beginner': '#00ff9f',
-            'intermediate': '#fff200',
-            'advanced': '#ff6b6b',
-            'mixed': '#00d4ff'
-        }
-        diff_lower = difficulty.lower()
-        badge_color = next((color for key, color in color_map.items() if key in diff_lower), '#00d4ff')
-        
-        st.markdown(
-            f'<div style="background-color: {badge_color}; color: #1f1f1f; '
-            f'padding: 5px 15px; border-radius: 20px; display: inline-block; '
-            f'font-weight: bold; margin: 10px 0;">{difficulty}</div>',
-            unsafe_allow_html=True
-        )
-        
-        # Students enrolled
-        students = int(course['course_students_enrolled'])
-        st.markdown(f"**👥 Students Enrolled:** {students:,}")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+def render_card_grid(cards, n_cols):
+    """Render pre-built cards as a single HTML grid (one delta message)."""
+    if not cards:
+        return
+    n_cols = min(len(cards), n_cols)
+    st.html(
+        f'<div class="card-grid" style="grid-template-columns: repeat({n_cols}, minmax(0, 1fr));">'
+        + ''.join(cards)
+        + '</div>'
+    )
+
+
+def render_recommendations(kind, df, recommendations):
+    """Render a catalog's results as one batched card grid."""
+    render_card_grid(build_cards_html(kind, df, recommendations), CARD_SPECS[kind][5])
 
 
 # ============================================================================
-# RECOMMENDATION LOGIC - MOVIES
+# RESULT PAGINATION
 # ============================================================================
 
-def recommend_movies(df, movie_name='', genre='', top_n=8):
+def _reset_result_window(kind):
+    """Show the first page of a fresh search."""
+    st.session_state[f'{kind}_window'] = (0, 1)
+
+
+def _move_result_window(kind, start, pages):
+    st.session_state[f'{kind}_window'] = (max(start, 0), pages)
+
+
+def render_result_window(kind, df, cursor, page_size):
     """
-    Recommend movies based on title and genre using substring and fuzzy matching.
-    
+    Render the visible window of a search cursor with paging controls.
+
+    The window is a start offset plus a number of loaded pages, so
+    "Load more" appends the next page below the current results and
+    Previous/Next move by one page. Every page is a slice of the cursor;
+    the search itself is never re-run.
+
     Args:
-        df: Movies DataFrame
-        movie_name: Movie title to search for
-        genre: Genre to filter by
-        top_n: Number of recommendations to return
-    
+        kind: 'books', 'courses' or 'movies'
+        df: Catalog DataFrame the cursor was built from
+        cursor: SearchCursor returned by a recommend_* function
+        page_size: Results per page (sidebar slider)
+
     Returns:
-        DataFrame of recommended movies
+        Row positions currently shown, or None if the cursor is stale
     """
-    if df is None or df.empty:
-        return pd.DataFrame()
-    
-    filtered_df = df.copy()
-    
-    # If no inputs, return top-rated movies
-    if not movie_name and not genre:
-        return filtered_df.nlargest(min(top_n, len(filtered_df)), 'IMDB Score')
-    
-    # Filter by movie title
-    if movie_name:
-        movie_name_lower = movie_name.lower()
-        
-        # Substring matching
-        mask = filtered_df['Title_lower'].str.contains(movie_name_lower, na=False, regex=False)
-        substring_matches = filtered_df[mask]
-        
-        # Fuzzy matching if few results
-        if len(substring_matches) < top_n:
-            titles = filtered_df['Title'].tolist()
-            fuzzy_matches = process.extract(movie_name, titles, scorer=fuzz.ratio, limit=top_n * 2)
-            fuzzy_indices = [filtered_df[filtered_df['Title'] == match[0]].index[0] 
-                           for match in fuzzy_matches if match[1] > 60]
-            
-            fuzzy_df = filtered_df.loc[fuzzy_indices]
-            filtered_df = pd.concat([substring_matches, fuzzy_df]).drop_duplicates()
-        else:
-            filtered_df = substring_matches
-    
-    # Filter by genre
-    if genre:
-        genre_lower = genre.lower()
-        filtered_df = filtered_df[
-            filtered_df['Genre_lower'].str.contains(genre_lower, na=False, regex=False)
-        ]
-    
-    # Sort by IMDB score
-    if not filtered_df.empty:
-        return filtered_df.nlargest(min(top_n, len(filtered_df)), 'IMDB Score')
-    
-    return pd.DataFrame()
+    if not cursor.matches(df):
+        st.info("🔄 The dataset changed since this search. Please search again.")
+        return None
 
+    if cursor.degraded:
+        st.caption("⏱️ Fuzzy matching was cut short to answer in time, so close spellings may be missing.")
 
-def display_movie_card(movie, col):
-    """Display a single movie recommendation card."""
-    with col:
-        st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
-        
-        # Display movie poster with robust same-ratio placeholder fallback (2:3)
-        img = _load_image_with_fallback(movie.get('Poster', ''), MOVIE_IMAGE_SIZE, "No Poster")
-        st.image(img, width='stretch', caption=movie['Title'])
-        
-        # Movie details
-        st.markdown(f"### 🎬 {movie['Title']}")
-        
-        # IMDB Score
-        score = float(movie['IMDB Score'])
-        stars = "⭐" * int(score / 2)  # Convert 10-point scale to 5-star
-        st.markdown(f'<div class="rating-stars">{stars} {score:.1f}/10</div>', unsafe_allow_html=True)
-        
-        # Genre
-        st.markdown(f"**Genre:** {movie['Genre']}")
-        
-        # IMDB Link
-        if movie['Imdb Link']:
-            st.markdown(f"[🔗 View on IMDB]({movie['Imdb Link']})")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    start, pages = st.session_state.get(f'{kind}_window', (0, 1))
+    start = min(start, max(len(cursor) - 1, 0))
+    stop = min(start + pages * page_size, len(cursor))
+    render_recommendations(kind, df, cursor.slice(df, start, stop))
+
+    if len(cursor) > page_size:
+        col1, col2, col3, col4 = st.columns([1, 2, 1, 1])
+        with col1:
+            st.button("⬅️ Previous", key=f'{kind}_prev_page', disabled=start == 0, width='stretch',
+                      on_click=_move_result_window, args=(kind, start - page_size, 1))
+        with col2:
+            st.caption(f"Showing {start + 1}–{stop} of {len(cursor):,} ranked matches "
+                       f"(page {start // page_size + 1} of {cursor.n_pages(page_size)})")
+        with col3:
+            st.button("⬇️ Load more", key=f'{kind}_load_more', disabled=stop >= len(cursor), width='stretch',
+                      on_click=_move_result_window, args=(kind, start, pages + 1))
+        with col4:
+            st.button("Next ➡️", key=f'{kind}_next_page', disabled=stop >= len(cursor), width='stretch',
+                      on_click=_move_result_window, args=(kind, stop, 1))
+
+    return cursor.positions[start:stop]
 
 
 # ============================================================================
@@ -763,24 +842,559 @@ def initialize_session_state():
         st.session_state.refresh_interval = 5
     if 'last_recommendations' not in st.session_state:
         st.session_state.last_recommendations = None
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
 
 # ============================================================================
-# EXPORT FUNCTIONALITY
+# SESSION MEMORY
+# ============================================================================
+
+@st.cache_resource
+def get_session_memory_tracker():
+    """Process-wide totals of per-session state size (see session_memory.py)."""
+    return session_memory.SessionMemoryTracker(REGISTRY)
+
+
+def account_session_memory():
+    """Measure this session's state, trim results over the ceiling, and summarise."""
+    tracker = get_session_memory_tracker()
+    footprint = tracker.account(st.session_state)
+    stats = tracker.stats()
+    summary = (f"🧠 Session state: {footprint.nbytes / 1024:,.1f} / "
+               f"{session_memory.SESSION_MAX_BYTES / 1024:,.0f} KB · "
+               f"{stats['sessions']} sessions, {stats['bytes'] / 2**20:,.2f} MB total")
+    if footprint.dropped_rows:
+        summary += f" · {footprint.dropped_rows:,} ranked results trimmed"
+    return summary
+
+
+# ============================================================================
+# MEMORY ACCOUNTING (ADMIN)
+# ============================================================================
+
+@st.cache_resource(max_entries=32)
+def get_dataset_memory(dataset_version, _df):
+    """Per-column memory of a dataset version (versions never change, so each is measured once)."""
+    return memory_report.dataset_memory(_df)
+
+
+@st.cache_resource(max_entries=32)
+def get_prefix_index_memory(kind, dataset_version, _df):
+    """Deep size of a dataset version's autocomplete index, titles included."""
+    return memory_report.deep_nbytes(get_prefix_index(kind, dataset_version, _df))
+
+
+def collect_memory_report():
+    """Measure cached datasets, their indexes, the shared caches and the process.
+
+    The totals are published as ``memory.*`` gauges, so they are exported with
+    the other metrics.
+    """
+    dataset_usage, indexes = {}, {}
+    for key, df, _, _ in get_dataset_cache().items():
+        kind, version = key[0], df.attrs.get('dataset_version')
+        label = f'{kind}.{version}'
+        dataset_usage[label] = get_dataset_memory(version, df)
+        indexes[f'prefix.{label}'] = {'bytes': get_prefix_index_memory(kind, version, df)}
+        edition_map = df.attrs.get('editions')
+        if edition_map is not None:
+            indexes[f'editions.{label}'] = {'bytes': edition_map.nbytes}
+        ranges = get_range_indexes(kind, version, df)
+        if ranges:
+            indexes[f'ranges.{label}'] = {'bytes': sum(index.nbytes for index in ranges.values())}
+        table = get_neighbour_table(kind, version, len(df))
+        if table is not None:
+            indexes[f'neighbours.{label}'] = {'mapped_bytes': memory_report.mapped_nbytes(table)}
+    dataset_stats = get_dataset_cache().stats()
+    image_stats = get_image_cache().stats()
+    caches = {
+        'datasets': {'bytes': dataset_stats['bytes'], 'max_bytes': dataset_stats['max_bytes']},
+        'images': {'bytes': image_stats['bytes'], 'max_bytes': image_stats['max_bytes']},
+        'activity': {'bytes': get_activity_tracker().nbytes},
+        'sessions': {'bytes': get_session_memory_tracker().stats()['bytes'],
+                     'max_bytes': session_memory.SESSION_MAX_BYTES},
+    }
+    report = memory_report.memory_report(dataset_usage, indexes, caches)
+    memory_report.publish(report, REGISTRY)
+    return report
+
+
+def _toggle_tracing():
+    if st.session_state.admin_tracemalloc:
+        memory_report.start_tracing()
+    else:
+        memory_report.stop_tracing()
+
+
+def _mb(nbytes):
+    return round(nbytes / 2**20, 2) if nbytes is not None else None
+
+
+def render_memory_panel():
+    """Admin expander: memory by dataset, column, index and cache, RSS and top allocators."""
+    panel = st.expander("🛠️ Admin: Memory", key='admin_memory', on_change='rerun')
+    if not panel.open:
+        return
+    with panel:
+        report = collect_memory_report()
+        process = report['process']
+        if process['rss_bytes'] is not None:
+            st.markdown(f"**Process RSS{' (peak)' if process['rss_is_peak'] else ''}:** "
+                        f"{_mb(process['rss_bytes']):,.1f} MB")
+
+        if report['datasets']:
+            st.markdown("**Datasets**")
+            st.dataframe(pd.DataFrame([
+                {'dataset': label, 'rows': usage['rows'], 'MB': _mb(usage['bytes']),
+                 'search columns MB': _mb(usage['search_bytes'])}
+                for label, usage in report['datasets'].items()
+            ]), hide_index=True, width='stretch')
+            label = st.selectbox("Columns of", list(report['datasets']), key='admin_memory_dataset')
+            st.dataframe(pd.DataFrame(
+                [{'column': column, 'MB': _mb(nbytes)} for column, nbytes in report['datasets'][label]['columns'].items()]
+            ), hide_index=True, width='stretch')
+
+        st.markdown("**Indexes & caches**")
+        rows = [{'name': f'{section}: {name}', 'MB': _mb(usage.get('bytes')),
+                 'mapped MB': _mb(usage.get('mapped_bytes')), 'budget MB': _mb(usage.get('max_bytes'))}
+                for section in ('indexes', 'caches') for name, usage in report[section].items()]
+        st.dataframe(pd.DataFrame(rows), hide_index=True, width='stretch')
+
+        # Tracing is process-wide: show its actual state, which another admin may have changed
+        st.session_state.admin_tracemalloc = report['tracemalloc']['tracing']
+        st.toggle("🔬 Trace allocations", key='admin_tracemalloc', on_change=_toggle_tracing,
+                  help="Process-wide tracemalloc; slows every allocation while on")
+        if report['tracemalloc']['tracing']:
+            st.caption(f"Traced: {_mb(report['tracemalloc']['traced_bytes']):,.1f} MB "
+                       f"(peak {_mb(report['tracemalloc']['peak_bytes']):,.1f} MB)")
+            allocators = memory_report.top_allocators()
+            if allocators:
+                st.dataframe(pd.DataFrame(
+                    [{'location': a['location'], 'MB': _mb(a['bytes']), 'blocks': a['blocks']} for a in allocators]
+                ), hide_index=True, width='stretch')
+
+        st.download_button("📈 Download metrics (JSON)", json.dumps(REGISTRY.snapshot(), indent=2, default=str),
+                           file_name='metrics.json', mime='application/json', key='admin_metrics_download')
+
+
+# ============================================================================
+# SEARCH ACTIVITY (TRENDING & PEOPLE ALSO SEARCHED)
+# ============================================================================
+
+@st.cache_resource
+def get_activity_tracker():
+    """Process-wide, fixed-memory tracker of search/click events across sessions."""
+    return CooccurrenceTracker()
+
+
+def record_search(catalog, *queries):
+    """Record the non-empty text fields of a search as search events."""
+    tracker = get_activity_tracker()
+    for query in queries:
+        if query:
+            tracker.record(catalog, st.session_state.session_id, query, event='search')
+
+
+def _apply_suggestion(catalog, pills_key, input_key):
+    """Pills callback: copy the clicked suggestion into the search box and record the click."""
+    choice = st.session_state.get(pills_key)
+    if choice:
+        st.session_state[input_key] = choice
+        get_activity_tracker().record(catalog, st.session_state.session_id, choice, event='click')
+    st.session_state[pills_key] = None
+
+
+def display_search_activity(catalog, input_key, query=''):
+    """Show "trending now" and "people also searched" suggestions for a tab."""
+    tracker = get_activity_tracker()
+
+    trending = [item for item, _ in tracker.trending(catalog, k=5)]
+    if trending:
+        st.pills(
+            "🔥 Trending now",
+            trending,
+            key=f'{catalog}_trending_pills',
+            on_change=_apply_suggestion,
+            args=(catalog, f'{catalog}_trending_pills', input_key)
+        )
+
+    if query:
+        also = [item for item, _ in tracker.also_searched(catalog, query, k=5)]
+        if also:
+            st.pills(
+                "👥 People also searched",
+                also,
+                key=f'{catalog}_also_pills',
+                on_change=_apply_suggestion,
+                args=(catalog, f'{catalog}_also_pills', input_key)
+            )
+
+
+# ============================================================================
+# SEARCH EXECUTION (COALESCING, DEADLINES, LOAD SHEDDING & SHARDING)
+# ============================================================================
+
+@st.cache_resource
+def get_search_flights():
+    """Process-wide single-flight group shared by every session's searches."""
+    return single_flight.SingleFlight('search.flights', REGISTRY)
+
+
+@st.cache_resource
+def get_search_pool():
+    """Process-wide bounded worker pool that runs searches under a deadline (see search_pool.py)."""
+    return search_pool.SearchPool(registry=REGISTRY)
+
+
+@st.cache_resource
+def get_shard_pool():
+    """Thread pool running the per-shard tasks of scatter-gather searches."""
+    return ThreadPoolExecutor(max_workers=sharding.SHARD_WORKERS, thread_name_prefix='search-shard')
+
+
+@st.cache_resource(max_entries=8)
+def get_sharded_catalog(kind, dataset_version, _df):
+    """Shards of a dataset version for scatter-gather search, or None if it stays unsharded."""
+    return sharding.build_sharded_catalog(kind, _df, executor=get_shard_pool())
+
+
+@st.cache_resource
+def get_query_log():
+    """Process-wide sampled query log, or None unless ``RECOMMENDER_QUERY_LOG`` is set (see query_log.py)."""
+    if not query_log.QUERY_LOG_PATH:
+        return None
+    return query_log.QueryLog(query_log.QUERY_LOG_PATH, registry=REGISTRY)
+
+
+@st.cache_resource
+def get_shadow():
+    """Process-wide shadow runner, or None unless ``RECOMMENDER_SHADOW_ENGINE`` names a candidate (see shadow.py)."""
+    if not shadow.SHADOW_ENGINE:
+        return None
+    return shadow.ShadowRunner(shadow.load_engine(shadow.SHADOW_ENGINE), registry=REGISTRY)
+
+
+@st.cache_resource(max_entries=8)
+def get_range_indexes(kind, dataset_version, _df):
+    """Sorted indexes of a dataset version's numeric filter columns, built when first needed."""
+    return range_index.build_range_indexes(kind, _df)
+
+
+def coalesced_search(kind, df, params, bounded=True, **options):
+    """Run a catalog search, sharing the computation with identical in-flight searches.
+    
+    Large catalogs are searched shard by shard in parallel when
+    ``RECOMMENDER_SEARCH_SHARDS`` is above 1 (see sharding.py). Searches the
+    startup warm-up already ranked are answered from it (see warmup.py).
+    
+    Args:
+        kind: 'books', 'courses' or 'movies'
+        df: Catalog DataFrame
+        params: Text parameters of the search (normalized by search_engine.search)
+        bounded: Run on the search pool under its deadline (may be degraded or rejected)
+        **options: top_n, max_results, ranges, on_stage and poll, passed to search_engine.search
+    
+    Returns:
+        SearchCursor owned by the caller
+    
+    Raises:
+        search_pool.SearchRejected: If a bounded search is shed or abandoned
+    """
+    version = None if df is None else df.attrs.get('dataset_version')
+    if search_engine.normalize_ranges(options.get('ranges')):
+        options['range_index'] = get_range_indexes(kind, version, df)
+    pool = get_search_pool() if bounded else None
+    shards = None if df is None else get_sharded_catalog(kind, version, df)
+    return search_engine.search(kind, df, params, flights=get_search_flights(), pool=pool, shards=shards,
+                                query_log=get_query_log(), shadow=get_shadow(), warm=get_warmup(), **options)
+
+
+def _render_partial_results(kind, df, cursor, page_size):
+    """First page of an early search stage, shown while the fuzzy stage still runs."""
+    st.markdown(f"### ⚡ {cursor.total:,} Quick Matches So Far...")
+    render_recommendations(kind, df, cursor.page(df, 0, page_size))
+    st.caption("🔎 Still looking for close spellings...")
+
+
+def run_tab_search(kind, df, params, page_size, slot=None, ranges=None):
+    """Search for a catalog tab, showing a message instead of failing when the search is shed.
+    
+    With ``slot`` (an ``st.empty``), the first page of the substring stage is
+    shown there as soon as it is ranked, while the fuzzy stage continues on
+    the search pool; the caller then renders the final results in the same
+    slot, replacing it in place. ``ranges`` are the tab's numeric filters.
+    
+    Returns:
+        SearchCursor, or None if the search was rejected
+    """
+    started = time.perf_counter()
+    stages = queue.SimpleQueue()
+    shown = []
+    
+    def show_stages():
+        cursor = None
+        while not stages.empty():
+            cursor = stages.get()
+        # An early stage without matches has nothing to show yet
+        if cursor is not None and len(cursor) and slot is not None:
+            with slot.container():
+                _render_partial_results(kind, df, cursor, page_size)
+            shown.append((time.perf_counter() - started) * 1000)
+    
+    try:
+        cursor = coalesced_search(kind, df, params, top_n=page_size, ranges=ranges, on_stage=stages.put,
+                                  poll=show_stages)
+    except search_pool.SearchRejected as e:
+        st.warning(f"🚦 The server is busy: {e.reason}.")
+        return None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    REGISTRY.observe('search.first_results_ms', shown[0] if shown else elapsed_ms)
+    REGISTRY.observe('search.final_results_ms', elapsed_ms)
+    return cursor
+
+
+# ============================================================================
+# UNIFIED CROSS-CATALOG SEARCH
 # ============================================================================
 
-def export_recommendations_to_csv(recommendations_dict):
-    """Export current recommendations to CSV format."""
-    output = BytesIO()
+# Weight of title match quality vs. normalised rating in the merged ranking
+UNIFIED_MATCH_WEIGHT = 0.7
+
+
+@st.cache_resource
+def get_catalog_search_pool():
+    """Shared thread pool running one search per catalog (RapidFuzz releases the GIL)."""
+    return ThreadPoolExecutor(max_workers=len(datasets.CATALOGS), thread_name_prefix='catalog-search')
+
+
+def search_all_catalogs(query, books_df=None, courses_df=None, movies_df=None, top_n=10):
+    """
+    Search books, courses and movies concurrently and merge into one ranking.
+    
+    Each catalog runs its own (coalesced) search on the shared thread pool, so
+    latency is that of the slowest catalog rather than the sum. Results are
+    scored on a common 0-1 scale: title match quality (RapidFuzz partial ratio)
+    blended with the rating divided by the catalog's rating scale.
+    
+    Args:
+        query: Free-text title query
+        books_df, courses_df, movies_df: Loaded datasets (None to skip a catalog)
+        top_n: Number of merged results to return
     
-    # Combine all recommendations into sheets or single file
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        for name, df in recommendations_dict.items():
-            if df is not None and not df.empty:
-                df.to_excel(writer, sheet_name=name, index=False)
+    Returns:
+        UnifiedCursor of (catalog, row position, score), best first; degraded
+        if a catalog's search was cut short or shed
+    """
+    from rapidfuzz import fuzz
+
+    pool = get_catalog_search_pool()
+    dataframes = {'books': books_df, 'courses': courses_df, 'movies': movies_df}
+    jobs = {kind: pool.submit(coalesced_search, kind, df, (query,), top_n=top_n, max_results=top_n)
+            for kind, df in dataframes.items() if df is not None}
+    
+    kinds = list(datasets.CATALOGS)
+    query_lower = query.lower()
+    codes, positions, scores = [], [], []
+    degraded = False
+    for kind, job in jobs.items():
+        try:
+            cursor = job.result()
+        except search_pool.SearchRejected:
+            # Leave the catalog out of the merged ranking rather than failing the whole search
+            degraded = True
+            continue
+        degraded |= cursor.degraded
+        if not len(cursor):
+            continue
+        meta = datasets.CATALOGS[kind]
+        results = cursor.slice(dataframes[kind], 0, len(cursor))
+        titles = results[meta['title_col']].astype(str)
+        match = titles.str.lower().map(lambda title: fuzz.partial_ratio(query_lower, title) / 100.0).to_numpy()
+        rating = results[meta['rating_col']].astype(float).to_numpy()
+        codes.append(np.full(len(cursor), kinds.index(kind)))
+        positions.append(cursor.positions)
+        scores.append(UNIFIED_MATCH_WEIGHT * match + (1 - UNIFIED_MATCH_WEIGHT) * (rating / meta['rating_scale']))
+    
+    versions = {kind: dataframes[kind].attrs.get('dataset_version') for kind in jobs}
+    if not scores:
+        return search_engine.UnifiedCursor(kinds, versions, [], [], [], degraded)
+    
+    scores = np.concatenate(scores)
+    order = np.argsort(-scores, kind='stable')[:top_n]
+    return search_engine.UnifiedCursor(kinds, versions, np.concatenate(codes)[order],
+                                       np.concatenate(positions)[order], scores[order], degraded)
+
+
+def build_unified_cards(results, dataframes):
+    """Pre-render cards for a merged ranking, each in its own catalog's style.
     
-    output.seek(0)
-    return output
+    Args:
+        results: UnifiedCursor from search_all_catalogs
+        dataframes: Dict mapping catalog kind to its loaded DataFrame
+    
+    Returns:
+        List of card HTML strings in ranking order
+    """
+    cards = [None] * len(results)
+    for kind in results.dataset_versions:
+        ranks = results.ranks(kind)
+        if not len(ranks):
+            continue
+        df = dataframes[kind]
+        for rank, card in zip(ranks, build_cards_html(kind, df, df.iloc[results.positions[ranks]])):
+            cards[rank] = card
+    return cards
+
+
+# ============================================================================
+# EXPORT FUNCTIONALITY
+# ============================================================================
+
+EXPORT_SCOPES = ['Shown results', 'All matches', 'Entire catalog']
+
+
+def _export_file(df, positions, fmt, compression):
+    """Write an export to a temporary file chunk by chunk and return it, rewound.
+
+    The file is handed back as a read-only BufferedReader, one of the file
+    types st.download_button accepts from a deferred callable.
+    """
+    out = tempfile.TemporaryFile()
+    export.write_export(out, df, positions, fmt, compression)
+    out.seek(0)
+    return BufferedReader(out.detach())
+
+
+def render_export_controls(kind, df, shown_positions, params, page_size, ranges=None):
+    """
+    Export controls for a catalog tab.
+
+    The file is only generated when the download button is clicked, and is
+    encoded in chunks (see export.py). "All matches" re-runs the search
+    without the browsing cap; "Entire catalog" exports every row.
+
+    Args:
+        kind: 'books', 'courses' or 'movies'
+        df: Catalog DataFrame
+        shown_positions: Row positions of the results currently displayed
+        params: Search inputs the results were produced from
+        page_size: Results per page (decides the fuzzy fallback, as in the search)
+        ranges: Numeric range filters the results were produced with
+    """
+    with st.expander("💾 Export Recommendations"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            scope = st.selectbox("Rows", EXPORT_SCOPES, key=f'{kind}_export_scope')
+        with col2:
+            fmt = st.selectbox("Format", export.available_formats(), format_func=str.upper,
+                               key=f'{kind}_export_format')
+        with col3:
+            compression = st.selectbox("Compression", export.available_compressions(fmt),
+                                       format_func=lambda option: option or 'none',
+                                       key=f'{kind}_export_compression')
+
+        def build_file():
+            if scope == 'Shown results':
+                positions = shown_positions
+            elif scope == 'All matches':
+                # Exports must be complete, so they skip the deadline-bound pool
+                cursor = coalesced_search(kind, df, params, bounded=False, top_n=page_size, max_results=None,
+                                          ranges=ranges)
+                positions = cursor.positions
+            else:
+                positions = None
+            return _export_file(df, positions, fmt, compression)
+
+        st.download_button(
+            label=f"⬇️ Download {fmt.upper()}",
+            data=build_file,
+            file_name=export.export_filename(f"{kind[:-1]}_recommendations_{int(time.time())}",
+                                      fmt, compression),
+            mime=export.export_mime(fmt, compression),
+            on_click='ignore',
+            key=f'{kind}_export_download'
+        )
+
+
+# ============================================================================
+# STARTUP WARM-UP
+# ============================================================================
+
+def _warm_catalog(kind):
+    """Load a bundled default catalog and its autocomplete index."""
+    df = _cached_dataset(kind)
+    warm_prefix_index(kind, df)
+    return df
+
+
+def _warm_search(kind, df, params):
+    """Complete (unbounded) search for the warm-up, sharded like the tabs' searches."""
+    shards = get_sharded_catalog(kind, df.attrs.get('dataset_version'), df)
+    return search_engine.search(kind, df, params, flights=get_search_flights(), shards=shards)
+
+
+def _warm_image_tasks(kind, df, positions):
+    """One task per distinct card image of the given rows, filling the image cache."""
+    _, _, image_col, image_size, placeholder, _ = CARD_SPECS[kind]
+    if not image_col:
+        return []
+    cache = get_image_cache()
+    urls = dict.fromkeys(df[image_col].iloc[positions].fillna('').tolist())
+    return [lambda url=url: len(_image_data_uri(url, image_size, placeholder, cache)) for url in urls]
+
+
+class _WarmUpContextFilter(logging.Filter):
+    """Drop Streamlit's missing-ScriptRunContext warning for the warm-up's threads.
+
+    They call cached resources outside any session on purpose; the warning
+    would otherwise be logged once per call.
+    """
+
+    def filter(self, record):
+        return not (threading.current_thread().name.startswith('warmup')
+                    and 'missing ScriptRunContext' in record.getMessage())
+
+
+@st.cache_resource
+def get_warmup():
+    """Process-wide warm-up, started by the first script run (see warmup.py).
+
+    ``streamlit run`` offers no hook before the first session, so the first
+    run starts it on a background thread and never waits for it.
+    """
+    warm = warmup.WarmUp(
+        list(CARD_SPECS), _warm_catalog, _warm_search, _warm_image_tasks,
+        max_image_bytes=min(warmup.WARMUP_IMAGE_BYTES, IMAGE_CACHE_BYTES // 2), registry=REGISTRY
+    )
+    if warmup.WARMUP_ENABLED:
+        logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').addFilter(
+            _WarmUpContextFilter())
+        warm.start()
+    return warm
+
+
+# ============================================================================
+# STARTUP TIMING
+# ============================================================================
+
+def record_startup_timings():
+    """Record this run's import and first-paint times; the first run in the process is the cold start."""
+    first_paint_ms = (time.perf_counter() - _SCRIPT_START) * 1000
+    REGISTRY.observe('run.import_ms', _IMPORT_MS)
+    REGISTRY.observe('run.first_paint_ms', first_paint_ms)
+    REGISTRY.set_gauge_once('startup.import_ms', _IMPORT_MS)
+    REGISTRY.set_gauge_once('startup.first_paint_ms', first_paint_ms)
+
+
+def startup_summary():
+    """One-line cold-start report against the configured budgets."""
+    measurements = {name: REGISTRY.gauge(name) for name in BUDGETS_MS}
+    if any(value is None for value in measurements.values()):
+        return ""
+    status = "⚠️ over budget" if over_budget(measurements) else "✅ within budget"
+    return (f"⏱️ Cold start: import {measurements['startup.import_ms']:,.0f} ms · "
+            f"first paint {measurements['startup.first_paint_ms']:,.0f} ms · {status}")
 
 
 # ============================================================================
@@ -817,6 +1431,11 @@ def main():
         courses_file = st.file_uploader("Upload courses.csv", type=['csv'], key='courses_upload')
         movies_file = st.file_uploader("Upload movies.csv", type=['csv'], key='movies_upload')
         
+        # Filled in once the datasets below have been loaded
+        cache_caption = st.empty()
+        session_caption = st.empty()
+        startup_caption = st.empty()
+        
         st.markdown("---")
         
         # Recommendation count settings
@@ -862,12 +1481,12 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.button("▶️ Start", width='stretch'):
+            if st.button("▶️ Start", key='start_refresh_btn', width='stretch'):
                 st.session_state.running = True
                 st.rerun()
         
         with col2:
-            if st.button("⏸️ Stop", width='stretch'):
+            if st.button("⏸️ Stop", key='stop_refresh_btn', width='stretch'):
                 st.session_state.running = False
                 st.rerun()
         
@@ -892,7 +1511,7 @@ def main():
             - 🎨 Modern dark theme with neon accents
             - 📊 Detailed ratings and metadata
             - 🔄 Auto-refresh mode
-            - 💾 Export recommendations to CSV
+            - 💾 Export recommendations to CSV, JSONL or Parquet
             
             **Tips:**
             - Leave fields empty for top-rated items
@@ -900,228 +1519,346 @@ def main():
             - Combine filters for precise results
             """)
     
-    # Load datasets
-    books_df = load_books_dataset(uploaded_file=books_file)
-    courses_df = load_courses_dataset(uploaded_file=courses_file)
-    movies_df = load_movies_dataset(uploaded_file=movies_file)
+    # Filled in after the open tab has loaded its dataset
+    preview_container = st.container()
     
-    # Show dataset preview
-    if books_df is not None or courses_df is not None or movies_df is not None:
-        with st.expander("👀 Preview Loaded Datasets (First 3 Rows)"):
-            if books_df is not None:
-                st.markdown("**Books Dataset:**")
-                st.dataframe(books_df.head(3), width='stretch')
-            if courses_df is not None:
-                st.markdown("**Courses Dataset:**")
-                st.dataframe(courses_df.head(3), width='stretch')
-            if movies_df is not None:
-                st.markdown("**Movies Dataset:**")
-                st.dataframe(movies_df.head(3), width='stretch')
-    
-    # Tabs for different recommenders
-    tab1, tab2, tab3 = st.tabs([
+    # Tabs for different recommenders. Only the open tab runs, so each dataset
+    # (with its indexes) is loaded the first time its tab is used.
+    tab1, tab2, tab3, tab4 = st.tabs([
         "📚 Book Recommender",
         "🎓 Course Recommender",
-        "🎬 Movie Recommender"
-    ])
+        "🎬 Movie Recommender",
+        "🔎 Search Everything"
+    ], key='active_tab', on_change='rerun')
+    
+    # Header, sidebar and tab bar are on screen: nothing heavy has run yet
+    record_startup_timings()
+    get_warmup()
+    
+    books_df = courses_df = movies_df = None
     
     # ========================================================================
     # BOOK RECOMMENDER TAB
     # ========================================================================
     with tab1:
-        st.markdown(f"### 📚 Tell me a book, genre, or author — I'll fetch {num_books} glowing picks ✨")
-        
-        if books_df is None:
-            st.warning("⚠️ Please upload or provide books.csv to use this feature.")
-        else:
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                book_name = st.text_input(
-                    "Book Title",
-                    placeholder="e.g., Harry Potter, 1984...",
-                    key='book_name_input'
-                )
+        if tab1.open:
+            books_df = load_books_dataset(uploaded_file=books_file)
+            warm_prefix_index('books', books_df)
             
-            with col2:
-                genre = st.text_input(
-                    "Genre",
-                    placeholder="e.g., Fantasy, Science Fiction...",
-                    key='genre_input'
-                )
+            st.markdown(f"### 📚 Tell me a book, genre, or author — I'll fetch {num_books} glowing picks ✨")
             
-            with col3:
-                publisher = st.text_input(
-                    "Author/Publisher",
-                    placeholder="e.g., J.K. Rowling...",
-                    key='publisher_input'
-                )
-            
-            if st.button("🔍 Find Books", key='find_books_btn', width='stretch'):
-                with st.spinner("Searching for perfect book matches..."):
-                    recommendations = recommend_books(
-                        books_df,
-                        book_name=book_name,
-                        genre=genre,
-                        publisher=publisher,
-                        top_n=num_books
+            if books_df is None:
+                st.warning("⚠️ Please upload or provide books.csv to use this feature.")
+            else:
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    book_name = title_input_with_suggestions(
+                        "Book Title",
+                        "e.g., Harry Potter, 1984...",
+                        'book_name_input',
+                        'books',
+                        books_df
                     )
-                    
-                    st.session_state.last_recommendations = {
-                        'books': recommendations,
-                        'params': (book_name, genre, publisher)
-                    }
-            
-            # Display recommendations
-            if st.session_state.last_recommendations and 'books' in st.session_state.last_recommendations:
-                recommendations = st.session_state.last_recommendations['books']
                 
-                if not recommendations.empty:
-                    st.markdown(f"### 🎉 Found {len(recommendations)} Amazing Books for You!")
-                    
-                    # Display in grid layout
-                    cols = st.columns(min(len(recommendations), 3))
-                    for idx, (_, book) in enumerate(recommendations.iterrows()):
-                        display_book_card(book, cols[idx % 3])
-                    
-                    # Export button
-                    if st.button("💾 Export Book Recommendations", key='export_books'):
-                        csv_data = recommendations.to_csv(index=False)
-                        st.download_button(
-                            label="⬇️ Download CSV",
-                            data=csv_data,
-                            file_name=f"book_recommendations_{int(time.time())}.csv",
-                            mime="text/csv"
-                        )
-                else:
-                    st.info("🤔 No books found matching your criteria. Try different keywords!")
+                with col2:
+                    genre = st.text_input(
+                        "Genre",
+                        placeholder="e.g., Fantasy, Science Fiction...",
+                        key='genre_input'
+                    )
+                
+                with col3:
+                    publisher = st.text_input(
+                        "Author/Publisher",
+                        placeholder="e.g., J.K. Rowling...",
+                        key='publisher_input'
+                    )
+                
+                # Numeric ranges (left empty = no limit), answered from sorted indexes
+                col4, col5, col6 = st.columns(3)
+                with col4:
+                    year_from = st.number_input("📅 Published From", value=None, step=1, format="%d",
+                                                placeholder="Any year", key='year_from_input')
+                with col5:
+                    year_to = st.number_input("📅 Published To", value=None, step=1, format="%d",
+                                              placeholder="Any year", key='year_to_input')
+                with col6:
+                    min_rating = st.number_input("⭐ Minimum Rating", value=None, min_value=0.0, max_value=5.0,
+                                                 step=0.1, placeholder="Any rating", key='min_rating_input')
+                book_ranges = {'original_publication_year': (year_from, year_to),
+                               'average_rating': (min_rating, None)}
+                
+                search_clicked = st.button("🔍 Find Books", key='find_books_btn', width='stretch')
+                if search_clicked:
+                    record_search('books', book_name, genre, publisher)
+                
+                display_search_activity('books', 'book_name_input', book_name)
+                
+                # A new search shows its first stage here, then its final results
+                results_slot = st.empty()
+                
+                if search_clicked:
+                    with st.spinner("Searching for perfect book matches..."):
+                        params = search_engine.normalize_params((book_name, genre, publisher))
+                        recommendations = run_tab_search('books', books_df, params, num_books, results_slot,
+                                                         book_ranges)
+                        
+                        if recommendations is not None:
+                            _reset_result_window('books')
+                            st.session_state.last_recommendations = {
+                                'books': recommendations,
+                                'params': params,
+                                'ranges': book_ranges
+                            }
+                
+                # Display recommendations
+                with results_slot.container():
+                    if st.session_state.last_recommendations and 'books' in st.session_state.last_recommendations:
+                        cursor = st.session_state.last_recommendations['books']
+                        
+                        if len(cursor):
+                            st.markdown(f"### 🎉 Found {cursor.total:,} Amazing Books for You!")
+                            
+                            # Display the current window of the ranked results
+                            shown_positions = render_result_window('books', books_df, cursor, num_books)
+                            
+                            # Export (generated in chunks when the download is clicked)
+                            if shown_positions is not None:
+                                render_export_controls('books', books_df, shown_positions,
+                                                       st.session_state.last_recommendations['params'], num_books,
+                                                       st.session_state.last_recommendations.get('ranges'))
+                        else:
+                            st.info("🤔 No books found matching your criteria. Try different keywords!")
     
     # ========================================================================
     # COURSE RECOMMENDER TAB
     # ========================================================================
     with tab2:
-        st.markdown(f"### 🎓 Discover {num_courses} courses that match your learning goals ✨")
-        
-        if courses_df is None:
-            st.warning("⚠️ Please upload or provide courses.csv to use this feature.")
-        else:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                course_title = st.text_input(
-                    "Course Title",
-                    placeholder="e.g., Python, Machine Learning...",
-                    key='course_title_input'
-                )
+        if tab2.open:
+            courses_df = load_courses_dataset(uploaded_file=courses_file)
+            warm_prefix_index('courses', courses_df)
             
-            with col2:
-                difficulty_options = ['', 'Beginner', 'Intermediate', 'Advanced', 'Mixed']
-                difficulty = st.selectbox(
-                    "Difficulty Level",
-                    options=difficulty_options,
-                    key='difficulty_select'
-                )
+            st.markdown(f"### 🎓 Discover {num_courses} courses that match your learning goals ✨")
             
-            if st.button("🔍 Find Courses", key='find_courses_btn', width='stretch'):
-                with st.spinner("Searching for perfect course matches..."):
-                    recommendations = recommend_courses(
-                        courses_df,
-                        course_title=course_title,
-                        difficulty=difficulty,
-                        top_n=num_courses
+            if courses_df is None:
+                st.warning("⚠️ Please upload or provide courses.csv to use this feature.")
+            else:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    course_title = title_input_with_suggestions(
+                        "Course Title",
+                        "e.g., Python, Machine Learning...",
+                        'course_title_input',
+                        'courses',
+                        courses_df
                     )
-                    
-                    st.session_state.last_recommendations = {
-                        'courses': recommendations,
-                        'params': (course_title, difficulty)
-                    }
-            
-            # Display recommendations
-            if st.session_state.last_recommendations and 'courses' in st.session_state.last_recommendations:
-                recommendations = st.session_state.last_recommendations['courses']
                 
-                if not recommendations.empty:
-                    st.markdown(f"### 🎉 Found {len(recommendations)} Outstanding Courses for You!")
-                    
-                    # Display in grid layout
-                    cols = st.columns(min(len(recommendations), 2))
-                    for idx, (_, course) in enumerate(recommendations.iterrows()):
-                        display_course_card(course, cols[idx % 2])
-                    
-                    # Export button
-                    if st.button("💾 Export Course Recommendations", key='export_courses'):
-                        csv_data = recommendations.to_csv(index=False)
-                        st.download_button(
-                            label="⬇️ Download CSV",
-                            data=csv_data,
-                            file_name=f"course_recommendations_{int(time.time())}.csv",
-                            mime="text/csv"
-                        )
-                else:
-                    st.info("🤔 No courses found matching your criteria. Try different keywords!")
+                with col2:
+                    difficulty_options = ['', 'Beginner', 'Intermediate', 'Advanced', 'Mixed']
+                    difficulty = st.selectbox(
+                        "Difficulty Level",
+                        options=difficulty_options,
+                        key='difficulty_select'
+                    )
+                
+                min_students = st.number_input("👥 Minimum Students Enrolled", value=None, min_value=0, step=10_000,
+                                               placeholder="Any enrollment", key='min_students_input')
+                course_ranges = {'course_students_enrolled': (min_students, None)}
+                
+                search_clicked = st.button("🔍 Find Courses", key='find_courses_btn', width='stretch')
+                if search_clicked:
+                    record_search('courses', course_title, difficulty)
+                
+                display_search_activity('courses', 'course_title_input', course_title)
+                
+                # A new search shows its first stage here, then its final results
+                results_slot = st.empty()
+                
+                if search_clicked:
+                    with st.spinner("Searching for perfect course matches..."):
+                        params = search_engine.normalize_params((course_title, difficulty))
+                        recommendations = run_tab_search('courses', courses_df, params, num_courses, results_slot,
+                                                         course_ranges)
+                        
+                        if recommendations is not None:
+                            _reset_result_window('courses')
+                            st.session_state.last_recommendations = {
+                                'courses': recommendations,
+                                'params': params,
+                                'ranges': course_ranges
+                            }
+                
+                # Display recommendations
+                with results_slot.container():
+                    if st.session_state.last_recommendations and 'courses' in st.session_state.last_recommendations:
+                        cursor = st.session_state.last_recommendations['courses']
+                        
+                        if len(cursor):
+                            st.markdown(f"### 🎉 Found {cursor.total:,} Outstanding Courses for You!")
+                            
+                            # Display the current window of the ranked results
+                            shown_positions = render_result_window('courses', courses_df, cursor, num_courses)
+                            
+                            # Export (generated in chunks when the download is clicked)
+                            if shown_positions is not None:
+                                render_export_controls('courses', courses_df, shown_positions,
+                                                       st.session_state.last_recommendations['params'], num_courses,
+                                                       st.session_state.last_recommendations.get('ranges'))
+                        else:
+                            st.info("🤔 No courses found matching your criteria. Try different keywords!")
     
     # ========================================================================
     # MOVIE RECOMMENDER TAB
     # ========================================================================
     with tab3:
-        st.markdown(f"### 🎬 Find your next {num_movies} favorite movies — lights, camera, action! ✨")
-        
-        if movies_df is None:
-            st.warning("⚠️ Please upload or provide movies.csv to use this feature.")
-        else:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                movie_name = st.text_input(
-                    "Movie Title",
-                    placeholder="e.g., Inception, The Matrix...",
-                    key='movie_name_input'
-                )
+        if tab3.open:
+            movies_df = load_movies_dataset(uploaded_file=movies_file)
+            warm_prefix_index('movies', movies_df)
             
-            with col2:
-                genre_movie = st.text_input(
-                    "Genre",
-                    placeholder="e.g., Action, Drama, Comedy...",
-                    key='genre_movie_input'
-                )
+            st.markdown(f"### 🎬 Find your next {num_movies} favorite movies — lights, camera, action! ✨")
             
-            if st.button("🔍 Find Movies", key='find_movies_btn', width='stretch'):
-                with st.spinner("Searching for perfect movie matches..."):
-                    recommendations = recommend_movies(
-                        movies_df,
-                        movie_name=movie_name,
-                        genre=genre_movie,
-                        top_n=num_movies
+            if movies_df is None:
+                st.warning("⚠️ Please upload or provide movies.csv to use this feature.")
+            else:
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    movie_name = title_input_with_suggestions(
+                        "Movie Title",
+                        "e.g., Inception, The Matrix...",
+                        'movie_name_input',
+                        'movies',
+                        movies_df
                     )
-                    
-                    st.session_state.last_recommendations = {
-                        'movies': recommendations,
-                        'params': (movie_name, genre_movie)
-                    }
+                
+                with col2:
+                    genre_movie = st.text_input(
+                        "Genre",
+                        placeholder="e.g., Action, Drama, Comedy...",
+                        key='genre_movie_input'
+                    )
+                
+                min_score = st.number_input("🌟 Minimum IMDB Score", value=None, min_value=0.0, max_value=10.0,
+                                            step=0.1, placeholder="Any score", key='min_imdb_input')
+                movie_ranges = {'IMDB Score': (min_score, None)}
+                
+                search_clicked = st.button("🔍 Find Movies", key='find_movies_btn', width='stretch')
+                if search_clicked:
+                    record_search('movies', movie_name, genre_movie)
+                
+                display_search_activity('movies', 'movie_name_input', movie_name)
+                
+                # A new search shows its first stage here, then its final results
+                results_slot = st.empty()
+                
+                if search_clicked:
+                    with st.spinner("Searching for perfect movie matches..."):
+                        params = search_engine.normalize_params((movie_name, genre_movie))
+                        recommendations = run_tab_search('movies', movies_df, params, num_movies, results_slot,
+                                                         movie_ranges)
+                        
+                        if recommendations is not None:
+                            _reset_result_window('movies')
+                            st.session_state.last_recommendations = {
+                                'movies': recommendations,
+                                'params': params,
+                                'ranges': movie_ranges
+                            }
+                
+                # Display recommendations
+                with results_slot.container():
+                    if st.session_state.last_recommendations and 'movies' in st.session_state.last_recommendations:
+                        cursor = st.session_state.last_recommendations['movies']
+                        
+                        if len(cursor):
+                            st.markdown(f"### 🎉 Found {cursor.total:,} Incredible Movies for You!")
+                            
+                            # Display the current window of the ranked results
+                            shown_positions = render_result_window('movies', movies_df, cursor, num_movies)
+                            
+                            # Export (generated in chunks when the download is clicked)
+                            if shown_positions is not None:
+                                render_export_controls('movies', movies_df, shown_positions,
+                                                       st.session_state.last_recommendations['params'], num_movies,
+                                                       st.session_state.last_recommendations.get('ranges'))
+                        else:
+                            st.info("🤔 No movies found matching your criteria. Try different keywords!")
+    
+    # ========================================================================
+    # UNIFIED SEARCH TAB
+    # ========================================================================
+    with tab4:
+        if tab4.open:
+            books_df = load_books_dataset(uploaded_file=books_file)
+            courses_df = load_courses_dataset(uploaded_file=courses_file)
+            movies_df = load_movies_dataset(uploaded_file=movies_file)
             
-            # Display recommendations
-            if st.session_state.last_recommendations and 'movies' in st.session_state.last_recommendations:
-                recommendations = st.session_state.last_recommendations['movies']
+            st.markdown("### 🔎 One search box for books, courses and movies ✨")
+            
+            if books_df is None and courses_df is None and movies_df is None:
+                st.warning("⚠️ Please upload or provide at least one dataset to use this feature.")
+            else:
+                unified_query = st.text_input(
+                    "Search all catalogs",
+                    placeholder="e.g., Python, Harry Potter, Space...",
+                    key='unified_query_input'
+                )
                 
-                if not recommendations.empty:
-                    st.markdown(f"### 🎉 Found {len(recommendations)} Incredible Movies for You!")
-                    
-                    # Display in grid layout (4 columns for movies)
-                    cols = st.columns(min(len(recommendations), 4))
-                    for idx, (_, movie) in enumerate(recommendations.iterrows()):
-                        display_movie_card(movie, cols[idx % 4])
-                    
-                    # Export button
-                    if st.button("💾 Export Movie Recommendations", key='export_movies'):
-                        csv_data = recommendations.to_csv(index=False)
-                        st.download_button(
-                            label="⬇️ Download CSV",
-                            data=csv_data,
-                            file_name=f"movie_recommendations_{int(time.time())}.csv",
-                            mime="text/csv"
+                if st.button("🔍 Search Everything", key='find_all_btn', width='stretch') and unified_query:
+                    with st.spinner("Searching all catalogs in parallel..."):
+                        results = search_all_catalogs(
+                            unified_query,
+                            books_df=books_df,
+                            courses_df=courses_df,
+                            movies_df=movies_df,
+                            top_n=num_books + num_courses + num_movies
                         )
-                else:
-                    st.info("🤔 No movies found matching your criteria. Try different keywords!")
+                        
+                        st.session_state.last_recommendations = {
+                            'all': results,
+                            'params': (unified_query,)
+                        }
+                
+                # Display merged ranking
+                if st.session_state.last_recommendations and 'all' in st.session_state.last_recommendations:
+                    results = st.session_state.last_recommendations['all']
+                    
+                    dataframes = {'books': books_df, 'courses': courses_df, 'movies': movies_df}
+                    if not results.matches(dataframes):
+                        st.info("🔄 The dataset changed since this search. Please search again.")
+                    elif len(results):
+                        st.markdown(f"### 🎉 Found {len(results)} Matches Across Catalogs!")
+                        if results.degraded:
+                            st.caption("⏱️ Some catalogs were searched partially or skipped to answer in time.")
+                        render_card_grid(build_unified_cards(results, dataframes), 3)
+                    else:
+                        st.info("🤔 Nothing matched in any catalog. Try different keywords!")
+    
+    cache_stats = get_dataset_cache().stats()
+    cache_caption.caption(
+        f"🗄️ Dataset cache: {cache_stats['bytes'] / 2**20:,.1f} / "
+        f"{cache_stats['max_bytes'] / 2**20:,.0f} MB · {cache_stats['entries']} entries · "
+        f"{cache_stats['evictions']} evictions"
+    )
+    session_caption.caption(account_session_memory())
+    startup_caption.caption(startup_summary())
+    with st.sidebar:
+        render_memory_panel()
+    
+    # Show dataset preview
+    if books_df is not None or courses_df is not None or movies_df is not None:
+        with preview_container.expander("👀 Preview Loaded Datasets (First 3 Rows)"):
+            if books_df is not None:
+                st.markdown("**Books Dataset:**")
+                st.dataframe(preview_rows(books_df), width='stretch')
+            if courses_df is not None:
+                st.markdown("**Courses Dataset:**")
+                st.dataframe(preview_rows(courses_df), width='stretch')
+            if movies_df is not None:
+                st.markdown("**Movies Dataset:**")
+                st.dataframe(preview_rows(movies_df), width='stretch')
     
     # ========================================================================
     # AUTO-REFRESH LOGIC
@@ -1180,7 +1917,16 @@ def main():
        query_embedding = model.encode([query])
        similarities = cosine_similarity(query_embedding, dataset_embeddings)[0]
        top_indices = similarities.argsort()[-10:][::-1]
-    
+
+       This exact scan is O(N·d) per query. For large catalogs, save the embeddings
+       once and query the memory-mapped IVF index in ann_index.py instead:
+
+       from ann_index import IVFIndex, save_vectors, open_vectors
+
+       save_vectors('indexes/books/vectors.npy', embeddings)
+       index = IVFIndex.build(open_vectors('indexes/books/vectors.npy'), 'indexes/books')
+       top_indices, scores = IVFIndex.load('indexes/books').search(query_embedding[0], k=10, nprobe=8)
+
     5. This will provide semantic understanding, capturing meaning beyond exact words.
        Example: "space adventure" would match "interstellar journey" even without shared words.
     """
@@ -0,0 +1,280 @@
+"""
+Warm-Start Artifact Bundles
+===========================
+
+An offline build step compiles each catalog CSV into a bundle of derived
+state, so a new app process loads it instead of re-parsing and
+re-preprocessing the CSVs:
+
+    bundles/<kind>/<dataset_version>/
+        dataset.pkl        preprocessed DataFrame (lowercase columns, coerced numerics)
+        prefix_index.pkl   autocomplete PrefixIndex
+        manifest.json      versions and SHA-256 checksums of the files above
+    bundles/<kind>/current.json   pointer to the active version (replaced atomically)
+
+A bundle is only used if its source hash matches the CSV on disk, it was
+built by the current bundle format, preprocessing code and pandas/numpy
+versions, and every file matches its checksum and unpickles. Anything else raises ``StaleBundleError`` and the app
+falls back to the CSV.
+
+Usage:
+    python run_app.py build                # all catalogs
+    python bundle.py books courses         # selected catalogs
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from datasets import CATALOGS, catalog_version, default_path, file_version, load_catalog
+
+BUNDLE_DIR = os.environ.get('RECOMMENDER_BUNDLE_DIR', 'bundles')
+# Bump when the bundle layout changes
+BUNDLE_FORMAT_VERSION = 1
+# Versions kept per catalog (the current one plus older ones for rollback)
+KEEP_VERSIONS = 2
+
+# Modules whose code shapes the bundled artifacts
+_ARTIFACT_SOURCES = ['datasets.py', 'editions.py', 'prefix_index.py']
+
+
+class BundleError(RuntimeError):
+    """Raised when no usable bundle exists for a catalog."""
+
+
+class StaleBundleError(BundleError):
+    """Raised when a bundle no longer matches its source CSV or the current code."""
+
+
+def code_version():
+    """Hash of the modules that produce bundled artifacts and the pandas/numpy versions that pickle them."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in _ARTIFACT_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    # Pickles of pandas/numpy objects are only reliably readable by the versions that wrote them
+    digest.update(f'pandas={pd.__version__};numpy={np.__version__}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _catalog_dir(kind, bundle_dir=None):
+    return os.path.join(bundle_dir or BUNDLE_DIR, kind)
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_bundle(kind, csv_path=None, bundle_dir=None):
+    """
+    Compile one catalog CSV into a new bundle version and make it current.
+
+    Args:
+        kind: 'books', 'courses' or 'movies'
+        csv_path: Source CSV (defaults to the bundled dataset)
+        bundle_dir: Root bundle directory (defaults to BUNDLE_DIR)
+
+    Returns:
+        The manifest dict of the new bundle
+    """
+    from prefix_index import PrefixIndex
+
+    csv_path = csv_path or default_path(kind)
+    catalog_dir = _catalog_dir(kind, bundle_dir)
+    os.makedirs(catalog_dir, exist_ok=True)
+
+    df = load_catalog(kind, file_path=csv_path)
+    meta = CATALOGS[kind]
+    index = PrefixIndex(df[meta['title_col']].tolist(), df[meta['rating_col']].to_numpy())
+    artifacts = {
+        'dataset.pkl': pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL),
+        'prefix_index.pkl': pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL),
+    }
+
+    version = df.attrs['dataset_version']
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'kind': kind,
+        'dataset_version': version,
+        'code_version': code_version(),
+        'source_file': os.path.basename(csv_path),
+        'rows': len(df),
+        'built_at': time.time(),
+        'files': {name: {'sha256': _sha256(data), 'bytes': len(data)} for name, data in artifacts.items()},
+    }
+
+    # Write into a temporary directory, then move it into place in one step
+    staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=catalog_dir)
+    for name, data in artifacts.items():
+        with open(os.path.join(staging, name), 'wb') as f:
+            f.write(data)
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    target = os.path.join(catalog_dir, version)
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.replace(staging, target)
+
+    pointer = os.path.join(catalog_dir, 'current.json.tmp')
+    with open(pointer, 'w') as f:
+        json.dump({'version': version}, f)
+    os.replace(pointer, os.path.join(catalog_dir, 'current.json'))
+
+    _prune_versions(catalog_dir, keep=version)
+    return manifest
+
+
+def _prune_versions(catalog_dir, keep):
+    """Delete all but the newest KEEP_VERSIONS bundle versions (never ``keep``)."""
+    versions = [entry for entry in os.scandir(catalog_dir)
+                if entry.is_dir() and not entry.name.startswith('.')]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[KEEP_VERSIONS:]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def read_manifest(kind, bundle_dir=None):
+    """
+    Manifest of a catalog's current bundle.
+
+    Raises:
+        BundleError: If no bundle has been built
+    """
+    catalog_dir = _catalog_dir(kind, bundle_dir)
+    try:
+        with open(os.path.join(catalog_dir, 'current.json')) as f:
+            version = json.load(f)['version']
+        with open(os.path.join(catalog_dir, version, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        raise BundleError(f"No {kind} bundle in {catalog_dir}") from e
+    manifest['path'] = os.path.join(catalog_dir, version)
+    return manifest
+
+
+def check_manifest(manifest, source_path=None):
+    """
+    Refuse a bundle built from other data, another bundle format or other code.
+
+    Args:
+        manifest: Manifest from read_manifest
+        source_path: CSV the app would otherwise load (skipped if it does not exist)
+
+    Raises:
+        StaleBundleError: If the bundle is out of date
+    """
+    kind = manifest['kind']
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise StaleBundleError(f"{kind} bundle has format {manifest.get('format_version')}, "
+                               f"expected {BUNDLE_FORMAT_VERSION}")
+    if manifest.get('code_version') != code_version():
+        raise StaleBundleError(f"{kind} bundle was built by different preprocessing code")
+    collapsed = manifest['dataset_version'].endswith('-works')
+    if collapsed != catalog_version(kind, '').endswith('-works'):
+        raise StaleBundleError(f"{kind} bundle was built with edition collapsing {'on' if collapsed else 'off'}")
+    source_path = source_path or default_path(kind)
+    if os.path.exists(source_path):
+        source = catalog_version(kind, file_version(source_path))
+        if source != manifest['dataset_version']:
+            raise StaleBundleError(f"{kind} bundle was built from {manifest['dataset_version']}, "
+                                   f"but {os.path.basename(source_path)} is now {source}")
+
+
+def _read_artifact(manifest, name):
+    """Read one bundled file, verifying its checksum."""
+    with open(os.path.join(manifest['path'], name), 'rb') as f:
+        data = f.read()
+    if _sha256(data) != manifest['files'][name]['sha256']:
+        raise StaleBundleError(f"{manifest['kind']} bundle file {name} is corrupt (checksum mismatch)")
+    try:
+        return pickle.loads(data)
+    except (pickle.UnpicklingError, AttributeError, ImportError, EOFError) as e:
+        # Intact file, but written by library versions this process cannot read
+        raise StaleBundleError(f"{manifest['kind']} bundle file {name} cannot be unpickled ({e})") from e
+
+
+def load_bundled_dataset(kind, source_path=None, bundle_dir=None):
+    """
+    Preprocessed DataFrame from the current bundle.
+
+    Raises:
+        BundleError: If no bundle exists
+        StaleBundleError: If the bundle is stale or corrupt
+    """
+    manifest = read_manifest(kind, bundle_dir)
+    check_manifest(manifest, source_path)
+    return _read_artifact(manifest, 'dataset.pkl')
+
+
+def load_bundled_prefix_index(kind, dataset_version, bundle_dir=None):
+    """Bundled PrefixIndex if the current bundle was built for ``dataset_version``, else None."""
+    try:
+        manifest = read_manifest(kind, bundle_dir)
+        if manifest['dataset_version'] != dataset_version or manifest.get('code_version') != code_version():
+            return None
+        return _read_artifact(manifest, 'prefix_index.pkl')
+    except BundleError:
+        return None
+
+
+# ============================================================================
+# COMMAND-LINE INTERFACE
+# ============================================================================
+
+def build_all(kinds=None, bundle_dir=None, out=sys.stdout):
+    """Build bundles for the given catalogs (all by default), skipping missing CSVs.
+
+    Returns:
+        Number of catalogs that failed to build
+    """
+    failures = 0
+    for kind in kinds or list(CATALOGS):
+        path = default_path(kind)
+        if not os.path.exists(path):
+            print(f"⚠️  {kind}: {path} not found, skipped", file=out)
+            continue
+        start = time.perf_counter()
+        try:
+            manifest = build_bundle(kind, path, bundle_dir)
+        except Exception as e:
+            print(f"❌ {kind}: {e}", file=out)
+            failures += 1
+            continue
+        size = sum(entry['bytes'] for entry in manifest['files'].values())
+        print(f"✅ {kind}: {manifest['rows']:,} rows, version {manifest['dataset_version']}, "
+              f"{size / 2**20:,.1f} MB in {time.perf_counter() - start:.1f}s", file=out)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build warm-start artifact bundles from the catalog CSVs")
+    parser.add_argument('kinds', nargs='*', metavar='KIND', help=f"Catalogs to build: {', '.join(CATALOGS)} (default: all)")
+    parser.add_argument('--out', default=None, help=f"Bundle directory (default: {BUNDLE_DIR})")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.kinds) - set(CATALOGS))
+    if unknown:
+        parser.error(f"unknown catalog(s): {', '.join(unknown)}")
+    sys.exit(1 if build_all(args.kinds or None, args.out) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Bounded-Memory Streaming Co-occurrence & Trending
+=================================================
+
+Ingests search/click events from the book, course and movie tabs and answers
+"trending now" and "people also searched" queries. Memory is fixed no matter
+how much traffic arrives:
+
+- Count-min sketches estimate decayed counts of items and item pairs.
+- Space-Saving summaries remember *which* items and pairs are heavy hitters.
+- Each session keeps only its last few events (and only the most recently
+  active sessions are tracked) to form co-occurrence pairs.
+
+Time decay uses forward decay: an event at time t adds exp((t - L) / tau) for
+a landmark L, and reads divide by exp((now - L) / tau). Stored values never
+need to be touched on read; they are rescaled only when the landmark moves.
+"""
+
+import heapq
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+
+DEFAULT_HALF_LIFE_S = 3600.0
+DEFAULT_QUERY_TTL_S = 1.0
+QUERY_CACHE_ENTRIES = 1024
+# Rescale stored weights before exp() grows past this exponent
+_MAX_DECAY_EXPONENT = 50.0
+
+
+class CountMinSketch:
+    """Count-min sketch with float counters (supports decayed weights).
+
+    Estimates never undercount; the overestimate is at most e/width of the
+    total weight with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        # One flat array of doubles per row: compact and fast to index from Python
+        self.rows = [array('d', bytes(8 * width)) for _ in range(depth)]
+
+    def add(self, key, weight=1.0):
+        for i, row in enumerate(self.rows):
+            row[hash((i, key)) % self.width] += weight
+
+    def estimate(self, key):
+        return min(row[hash((i, key)) % self.width] for i, row in enumerate(self.rows))
+
+    def scale(self, factor):
+        for i, row in enumerate(self.rows):
+            self.rows[i] = array('d', (value * factor for value in row))
+
+    @property
+    def nbytes(self):
+        return sum(row.itemsize * len(row) for row in self.rows)
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter summary holding at most ``capacity`` keys.
+
+    A lazy min-heap finds the eviction victim in O(log capacity); stale heap
+    entries are skipped on pop and the heap is rebuilt when it grows too large.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.counts = {}
+        self._heap = []
+
+    def add(self, key, weight=1.0):
+        """Add weight to a key; returns the evicted key, if any."""
+        evicted = None
+        if key in self.counts:
+            weight += self.counts[key]
+        elif len(self.counts) >= self.capacity:
+            evicted = self._pop_min()
+            # The newcomer inherits the evicted count (classic Space-Saving bound)
+            weight += self.counts.pop(evicted)
+        self.counts[key] = weight
+        heapq.heappush(self._heap, (weight, id(key), key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+        return evicted
+
+    def _pop_min(self):
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key
+
+    def _rebuild(self):
+        self._heap = [(count, id(key), key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k):
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+    def scale(self, factor):
+        for key in self.counts:
+            self.counts[key] *= factor
+        self._rebuild()
+
+
+class CooccurrenceTracker:
+    """Thread-safe streaming tracker of trending items and co-searched pairs.
+
+    Items are namespaced by catalog ('books', 'courses', 'movies'); an item is
+    any normalised key, e.g. a search query or a clicked title.
+    """
+
+    def __init__(self, half_life_s=DEFAULT_HALF_LIFE_S, sketch_width=4096, sketch_depth=4,
+                 item_capacity=256, pair_capacity=1024, session_window=5, max_sessions=10_000,
+                 query_ttl_s=DEFAULT_QUERY_TTL_S):
+        self.tau = half_life_s / math.log(2)
+        self.item_sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.pair_sketch = CountMinSketch(sketch_width, sketch_depth)
+        self.items = {}
+        self.item_capacity = item_capacity
+        self.pairs = SpaceSaving(pair_capacity)
+        self.partners = {}
+        self.session_window = session_window
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.landmark = None
+        self.events = 0
+        # Query results are reused for query_ttl_s; stored undecayed so reads stay exact in time
+        self.query_ttl_s = query_ttl_s
+        self._query_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Decay helpers
+    # ------------------------------------------------------------------
+
+    def _weight(self, now):
+        """Forward-decay weight of an event at ``now``, moving the landmark if needed."""
+        if self.landmark is None:
+            self.landmark = now
+        exponent = (now - self.landmark) / self.tau
+        if exponent > _MAX_DECAY_EXPONENT:
+            factor = math.exp(-exponent)
+            self.item_sketch.scale(factor)
+            self.pair_sketch.scale(factor)
+            for summary in self.items.values():
+                summary.scale(factor)
+            self.pairs.scale(factor)
+            self._query_cache.clear()
+            self.landmark = now
+            exponent = 0.0
+        return math.exp(exponent)
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def record(self, catalog, session_id, item, event='search', now=None):
+        """Ingest one search or click event.
+
+        Args:
+            catalog: 'books', 'courses' or 'movies'
+            session_id: Opaque id of the user session
+            item: Normalised item key (query text or clicked title)
+            event: 'search' or 'click' (clicks count double)
+            now: Event timestamp (defaults to time.time())
+        """
+        item = item.strip().lower()
+        if not item:
+            return
+        now = time.time() if now is None else now
+        key = (catalog, item)
+
+        with self._lock:
+            weight = self._weight(now) * (2.0 if event == 'click' else 1.0)
+            self.events += 1
+
+            self.item_sketch.add(key, weight)
+            summary = self.items.setdefault(catalog, SpaceSaving(self.item_capacity))
+            summary.add(item, weight)
+
+            recent = self._session_window(session_id)
+            for other in set(recent):
+                if other != key and other[0] == catalog:
+                    self._add_pair(key, other, weight)
+            if key in recent:
+                recent.remove(key)
+            recent.append(key)
+
+    def _session_window(self, session_id):
+        """Recent events of a session, tracking at most ``max_sessions`` sessions."""
+        recent = self.sessions.get(session_id)
+        if recent is None:
+            if len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+            recent = self.sessions[session_id] = deque(maxlen=self.session_window)
+        else:
+            self.sessions.move_to_end(session_id)
+        return recent
+
+    def _add_pair(self, a, b, weight):
+        pair = (a, b) if a < b else (b, a)
+        self.pair_sketch.add(pair, weight)
+        evicted = self.pairs.add(pair, weight)
+        if evicted is not None:
+            for x, y in (evicted, evicted[::-1]):
+                partners = self.partners.get(x)
+                if partners is not None:
+                    partners.discard(y)
+                    if not partners:
+                        del self.partners[x]
+        self.partners.setdefault(a, set()).add(b)
+        self.partners.setdefault(b, set()).add(a)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _cached(self, cache_key, compute, now):
+        """Return decayed results for cache_key, recomputing at most every query_ttl_s."""
+        with self._lock:
+            entry = self._query_cache.get(cache_key)
+            if entry is None or entry[0] <= now:
+                entry = (now + self.query_ttl_s, compute())
+                self._query_cache[cache_key] = entry
+                if len(self._query_cache) > QUERY_CACHE_ENTRIES:
+                    self._query_cache.popitem(last=False)
+            if self.landmark is None:
+                return []
+            decay = math.exp(-(now - self.landmark) / self.tau)
+            return [(item, count * decay) for item, count in entry[1]]
+
+    def trending(self, catalog, k=5, now=None):
+        """Top-k items of a catalog by decayed count, as [(item, score)]."""
+        def compute():
+            summary = self.items.get(catalog)
+            if summary is None:
+                return []
+            return [(item, min(count, self.item_sketch.estimate((catalog, item))))
+                    for item, count in summary.top(k)]
+
+        return self._cached(('trending', catalog, k), compute, time.time() if now is None else now)
+
+    def also_searched(self, catalog, item, k=5, now=None):
+        """Items most often searched in the same sessions as ``item``."""
+        key = (catalog, item.strip().lower())
+
+        def compute():
+            scored = []
+            for other in self.partners.get(key, ()):
+                pair = (key, other) if key < other else (other, key)
+                count = min(self.pairs.counts.get(pair, 0.0), self.pair_sketch.estimate(pair))
+                scored.append((other[1], count))
+            return heapq.nlargest(k, scored, key=lambda entry: entry[1])
+
+        return self._cached(('also', key, k), compute, time.time() if now is None else now)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the sketches (the dominant, fixed cost)."""
+        return self.item_sketch.nbytes + self.pair_sketch.nbytes
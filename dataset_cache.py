@@ -0,0 +1,128 @@
+"""
+Byte-Budgeted LRU Cache
+=======================
+
+Holds loaded datasets (bundled CSVs and user uploads) under a total byte
+budget. Every entry is measured when inserted; when the budget is exceeded,
+least-recently-used entries are evicted. Pinned entries (the bundled default
+datasets) count towards the total but are never evicted.
+
+Cached DataFrames are shared by every session and thread without copying,
+so they are frozen before they are cached (see frozen_frame.py). A reloaded
+dataset is a new object that replaces the old entry in one step; callers
+still holding the old object keep a consistent (if stale) view.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def dataframe_nbytes(df):
+    """Deep in-memory size of a DataFrame, including Python string objects."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class ByteBudgetCache:
+    """Thread-safe LRU cache bounded by the total size of its values.
+
+    Args:
+        max_bytes: Total byte budget for unpinned and pinned entries together
+        sizeof: Function returning the size of a value in bytes
+    """
+
+    def __init__(self, max_bytes, sizeof=dataframe_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, nbytes, pinned)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, pinned=False, replaces=None):
+        """Insert a value, evicting LRU unpinned entries to stay within budget.
+
+        An unpinned value larger than the whole budget is not cached.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            pinned: Never evict this entry
+            replaces: Optional predicate on keys; matching entries (pinned or
+                not) are dropped in the same locked step, so readers see either
+                the old entries or the new one, never neither
+
+        Returns:
+            True if the value was cached
+        """
+        nbytes = self.sizeof(value)
+        with self._lock:
+            self._remove(key)
+            if replaces is not None:
+                for stale in [k for k in self._entries if replaces(k)]:
+                    self._remove(stale)
+            if not pinned and nbytes > self.max_bytes:
+                return False
+            self._entries[key] = (value, nbytes, pinned)
+            self._bytes += nbytes
+            self._evict()
+            return key in self._entries
+
+    def discard(self, predicate):
+        """Drop every entry (pinned or not) whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self):
+        for key in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if not self._entries[key][2]:
+                self._remove(key)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def items(self):
+        """Snapshot of (key, value, nbytes, pinned) for every entry, without touching LRU order."""
+        with self._lock:
+            return [(key, value, nbytes, pinned) for key, (value, nbytes, pinned) in self._entries.items()]
+
+    def stats(self):
+        """Snapshot of cache usage for display and metrics."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'pinned_bytes': sum(nbytes for _, nbytes, pinned in self._entries.values() if pinned),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,234 @@
+"""
+Dataset Loading & Preprocessing
+===============================
+
+Streamlit-free loading of the three catalogs (books, courses, movies), shared
+by the app and by offline jobs such as the neighbour table builder.
+
+Each loaded DataFrame carries ``df.attrs['dataset_version']``, a short hash of
+the source bytes, so derived artifacts can tell which data they were built from.
+With ``RECOMMENDER_COLLAPSE_EDITIONS=1`` the books catalog is collapsed to one
+row per work (see editions.py); its version then ends in ``-works`` and its
+``df.attrs['editions']`` holds the EditionMap.
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+import pandas as pd
+
+DATA_DIR = os.environ.get('RECOMMENDER_DATA_DIR', '.')
+# Collapse books to one row per work_id at load time
+COLLAPSE_EDITIONS = os.environ.get('RECOMMENDER_COLLAPSE_EDITIONS', '0') == '1'
+
+# Per-catalog metadata shared by the loaders, validators and offline jobs
+CATALOGS = {
+    'books': {
+        'file': 'books.csv',
+        'required_cols': ['title', 'authors', 'average_rating', 'image_url'],
+        'title_col': 'title',
+        'rating_col': 'average_rating',
+        'rating_scale': 5.0,
+    },
+    'courses': {
+        'file': 'courses.csv',
+        'required_cols': ['course_title', 'course_rating', 'course_difficulty'],
+        'title_col': 'course_title',
+        'rating_col': 'course_rating',
+        'rating_scale': 5.0,
+    },
+    'movies': {
+        'file': 'movies.csv',
+        'required_cols': ['Title', 'IMDB Score', 'Genre', 'Poster'],
+        'title_col': 'Title',
+        'rating_col': 'IMDB Score',
+        'rating_scale': 10.0,
+    },
+}
+
+
+class MissingColumnsError(ValueError):
+    """Raised when a catalog CSV lacks one of its required columns."""
+
+    def __init__(self, kind, missing_cols):
+        self.kind = kind
+        self.missing_cols = missing_cols
+        super().__init__(f"{kind.capitalize()} dataset missing required columns: {missing_cols}")
+
+
+def default_path(kind):
+    """Return the bundled CSV path for a catalog kind."""
+    return os.path.join(DATA_DIR, CATALOGS[kind]['file'])
+
+
+def source_version(data):
+    """Short, stable version id for a dataset's raw source bytes."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def file_version(path):
+    """Version id of a file on disk, hashed in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+# ============================================================================
+# PREPROCESSING
+# ============================================================================
+
+def _convert_enrollment_to_numeric(value):
+    """Convert enrollment strings like '5.3k', '17k', '130k' to numeric values.
+
+    Args:
+        value: String or numeric value
+
+    Returns:
+        Numeric value (e.g., '5.3k' -> 5300, '17k' -> 17000)
+    """
+    if pd.isna(value):
+        return 0
+
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    # Convert string like '5.3k' or '17k' to numeric
+    value_str = str(value).strip().lower()
+
+    if 'k' in value_str:
+        try:
+            num = float(value_str.replace('k', ''))
+            return int(num * 1000)
+        except ValueError:
+            return 0
+    elif 'm' in value_str:
+        try:
+            num = float(value_str.replace('m', ''))
+            return int(num * 1000000)
+        except ValueError:
+            return 0
+    else:
+        try:
+            return int(float(value_str))
+        except ValueError:
+            return 0
+
+
+def preprocess_books(df):
+    """Handle missing values, coerce types and add lowercase search columns."""
+    df['title'] = df['title'].fillna('Unknown Title')
+    df['authors'] = df['authors'].fillna('Unknown Author')
+    df['average_rating'] = pd.to_numeric(df['average_rating'], errors='coerce').fillna(0)
+    df['original_publication_year'] = pd.to_numeric(df['original_publication_year'], errors='coerce').fillna(0)
+    df['image_url'] = df['image_url'].fillna('')
+    df['original_title'] = df['original_title'].fillna(df['title'])
+    df['language_code'] = df['language_code'].fillna('en')
+
+    # Create lowercase search columns
+    df['title_lower'] = df['title'].str.lower()
+    df['authors_lower'] = df['authors'].str.lower()
+    df['original_title_lower'] = df['original_title'].str.lower()
+    return df
+
+
+def preprocess_courses(df):
+    """Handle missing values, parse enrollment counts and add lowercase search columns."""
+    df['course_title'] = df['course_title'].fillna('Unknown Course')
+    df['course_organization'] = df['course_organization'].fillna('Unknown')
+    df['course_rating'] = pd.to_numeric(df['course_rating'], errors='coerce').fillna(0)
+    df['course_difficulty'] = df['course_difficulty'].fillna('Unknown')
+    # Convert enrollment strings like '5.3k', '17k' to proper numbers
+    df['course_students_enrolled'] = df['course_students_enrolled'].apply(_convert_enrollment_to_numeric)
+    df['course_Certificate_type'] = df['course_Certificate_type'].fillna('N/A')
+
+    # Create lowercase search columns
+    df['course_title_lower'] = df['course_title'].str.lower()
+    df['course_difficulty_lower'] = df['course_difficulty'].str.lower()
+    return df
+
+
+def preprocess_movies(df):
+    """Handle missing values, coerce scores and add lowercase search columns."""
+    df['Title'] = df['Title'].fillna('Unknown Movie')
+    df['IMDB Score'] = pd.to_numeric(df['IMDB Score'], errors='coerce').fillna(0)
+    df['Genre'] = df['Genre'].fillna('Unknown')
+    df['Poster'] = df['Poster'].fillna('')
+    df['Imdb Link'] = df['Imdb Link'].fillna('')
+
+    # Create lowercase search columns
+    df['Title_lower'] = df['Title'].str.lower()
+    df['Genre_lower'] = df['Genre'].str.lower()
+    return df
+
+
+PREPROCESSORS = {
+    'books': preprocess_books,
+    'courses': preprocess_courses,
+    'movies': preprocess_movies,
+}
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def _read_csv_with_fallback(path, **kwargs):
+    """Read a CSV trying utf-8, then latin-1, then ISO-8859-1 (``kwargs`` go to ``pd.read_csv``)."""
+    try:
+        return pd.read_csv(path, encoding='utf-8', **kwargs)
+    except UnicodeDecodeError:
+        try:
+            return pd.read_csv(path, encoding='latin-1', **kwargs)
+        except UnicodeDecodeError:
+            return pd.read_csv(path, encoding='ISO-8859-1', **kwargs)
+
+
+def catalog_version(kind, source, collapse_editions=None):
+    """Dataset version of a catalog loaded from source bytes with version ``source``."""
+    collapse_editions = COLLAPSE_EDITIONS if collapse_editions is None else collapse_editions
+    return f'{source}-works' if kind == 'books' and collapse_editions else source
+
+
+def load_catalog(kind, file_path=None, uploaded_file=None, collapse_editions=None):
+    """Read, validate and preprocess one catalog.
+
+    Args:
+        kind: 'books', 'courses' or 'movies'
+        file_path: CSV path (defaults to the bundled file in DATA_DIR)
+        uploaded_file: File-like upload; takes precedence over file_path
+        collapse_editions: Collapse books to one row per work (defaults to
+            COLLAPSE_EDITIONS)
+
+    Returns:
+        Preprocessed DataFrame with ``attrs['dataset_version']`` set
+
+    Raises:
+        FileNotFoundError: If the CSV does not exist
+        MissingColumnsError: If required columns are missing
+    """
+    if uploaded_file is not None:
+        raw = uploaded_file.getvalue() if hasattr(uploaded_file, 'getvalue') else uploaded_file.read()
+        df = pd.read_csv(BytesIO(raw), encoding='latin-1')
+        version = source_version(raw)
+    else:
+        path = file_path if file_path else default_path(kind)
+        df = _read_csv_with_fallback(path)
+        version = file_version(path)
+
+    missing_cols = [col for col in CATALOGS[kind]['required_cols'] if col not in df.columns]
+    if missing_cols:
+        raise MissingColumnsError(kind, missing_cols)
+
+    df = PREPROCESSORS[kind](df)
+    version = catalog_version(kind, version, collapse_editions)
+    if version.endswith('-works'):
+        from editions import collapse_editions as collapse
+
+        df, edition_map = collapse(df)
+        if edition_map is not None:
+            df.attrs['editions'] = edition_map
+    df.attrs['dataset_version'] = version
+    return df
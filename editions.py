@@ -0,0 +1,120 @@
+"""
+Edition-Collapsed Book Catalog
+==============================
+
+books.csv can list several editions of one work (rows sharing ``work_id``).
+Collapsing keeps one representative row per work, so searching, fuzzy
+matching, ranking and every index built from the catalog only see works,
+and a work fills one result slot however many editions it has.
+
+The representative is the work's ``best_book_id`` edition when present,
+otherwise its most-rated edition (then the first). Works keep the order of
+their representatives in the file. Rows without a ``work_id`` stay works of
+their own.
+
+The editions of each work are kept in an ``EditionMap``: two flat arrays in
+CSR layout (per-work offsets into one array of edition ids), a few bytes per
+edition instead of a full row.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class EditionMap:
+    """Edition ids of each work of a collapsed catalog (CSR layout, read-only).
+
+    Attributes:
+        offsets: int64 array; the editions of work ``i`` are ``ids[offsets[i]:offsets[i + 1]]``
+        ids: Edition ids (``book_id`` values, or source row positions if the
+            file has no ``book_id`` column), grouped by work in file order
+        id_column: Name of the column the ids come from (None for row positions)
+    """
+
+    def __init__(self, offsets, ids, id_column=None):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = np.asarray(ids)
+        self.id_column = id_column
+        self.offsets.flags.writeable = False
+        self.ids.flags.writeable = False
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __deepcopy__(self, memo):
+        # pandas deep-copies ``attrs`` into every derived frame; the map is immutable, so share it
+        return self
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.ids.nbytes
+
+    @property
+    def n_editions(self):
+        return len(self.ids)
+
+    def counts(self):
+        """Number of editions of each work."""
+        return np.diff(self.offsets)
+
+    def editions(self, position):
+        """Edition ids of the work at row ``position`` of the collapsed catalog."""
+        return self.ids[self.offsets[position]:self.offsets[position + 1]]
+
+
+def collapse_editions(df):
+    """
+    Collapse a books DataFrame to one representative row per ``work_id``.
+
+    Args:
+        df: Preprocessed books DataFrame (one row per edition)
+
+    Returns:
+        Tuple (works, edition_map): ``works`` has one row per work, a fresh
+        RangeIndex and an int32 ``editions`` column; ``edition_map`` is None
+        (and ``works`` is ``df``) if the file has no ``work_id`` column
+    """
+    if 'work_id' not in df.columns:
+        return df, None
+
+    n_rows = len(df)
+    rows = np.arange(n_rows)
+    codes, _ = pd.factorize(df['work_id'], use_na_sentinel=True)
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = codes.max() + 1 + np.arange(np.count_nonzero(missing))
+    n_works = int(codes.max()) + 1 if n_rows else 0
+
+    # Representative of each work: its best edition, then its most-rated, then its first row
+    is_best = np.zeros(n_rows, dtype=bool)
+    if 'book_id' in df.columns and 'best_book_id' in df.columns:
+        is_best = (df['book_id'] == df['best_book_id']).to_numpy(dtype=bool, na_value=False)
+    ratings = np.zeros(n_rows)
+    if 'ratings_count' in df.columns:
+        ratings = pd.to_numeric(df['ratings_count'], errors='coerce').fillna(0).to_numpy()
+    preferred = np.lexsort((rows, -ratings, ~is_best, codes))
+    group_starts = np.flatnonzero(np.r_[True, codes[preferred][1:] != codes[preferred][:-1]])
+    representatives = preferred[group_starts]
+
+    # Works in the order of their representatives in the file
+    work_order = np.argsort(representatives, kind='stable')
+    works = df.iloc[representatives[work_order]].reset_index(drop=True)
+
+    # Editions grouped by work (in file order), regrouped into the works' order
+    by_work = np.lexsort((rows, codes))
+    counts = np.bincount(codes, minlength=n_works)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    new_counts = counts[work_order]
+    offsets = np.concatenate([[0], np.cumsum(new_counts)])
+    gather = np.repeat(starts[work_order] - offsets[:-1], new_counts) + np.arange(n_rows)
+
+    if 'book_id' in df.columns:
+        ids, id_column = pd.to_numeric(df['book_id'], errors='coerce').fillna(-1).to_numpy(np.int64), 'book_id'
+    else:
+        ids, id_column = rows, None
+    ids = ids[by_work][gather]
+    if len(ids) and ids.max() < 2**31 and ids.min() >= -2**31:
+        ids = ids.astype(np.int32)
+
+    works['editions'] = new_counts.astype(np.int32)
+    return works, EditionMap(offsets, ids, id_column)
@@ -0,0 +1,299 @@
+"""
+Streaming Export of Recommendation Sets
+=======================================
+
+Writes rows of a catalog DataFrame, selected by row positions, as CSV, JSONL
+or Parquet. Rows are encoded ``CHUNK_ROWS`` at a time and yielded as byte
+chunks, so memory stays constant whether exporting one page of results or an
+entire filtered catalog with millions of rows.
+
+CSV and JSONL streams can be gzip (stdlib) or zstd (``pip install zstandard``)
+compressed. Parquet is written with pyarrow and compresses its column chunks
+internally, so the file stays a valid Parquet file.
+
+Usage:
+    python export.py books --format parquet --compression zstd --out books.parquet
+    python export.py movies --genre drama --format jsonl --compression gzip --out drama.jsonl.gz
+"""
+
+import argparse
+import io
+import sys
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Rows encoded per chunk
+CHUNK_ROWS = 50_000
+
+# Format -> (MIME type, file extension)
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+# Compression -> file extension suffix for CSV/JSONL streams
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+class ExportUnavailable(RuntimeError):
+    """Raised when a format or compression needs an optional package that is missing."""
+
+
+def _parquet_module():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailable("Parquet export requires pyarrow (pip install pyarrow)") from None
+    return pyarrow, pyarrow.parquet
+
+
+def available_formats():
+    """Export formats usable in this environment (Parquet needs pyarrow)."""
+    try:
+        _parquet_module()
+    except ExportUnavailable:
+        return [fmt for fmt in FORMATS if fmt != 'parquet']
+    return list(FORMATS)
+
+
+def available_compressions(fmt):
+    """Compression options usable for ``fmt`` in this environment."""
+    if fmt == 'parquet' or zstandard is not None:
+        return [None, 'gzip', 'zstd']
+    return [None, 'gzip']
+
+
+def export_columns(df):
+    """Columns worth exporting: everything except the lowercase search helpers."""
+    return [column for column in df.columns if not str(column).endswith('_lower')]
+
+
+def export_filename(stem, fmt, compression=None):
+    """File name for an export, e.g. ``books.csv.gz``."""
+    name = stem + FORMATS[fmt][1]
+    return name if fmt == 'parquet' else name + COMPRESSION_SUFFIXES[compression]
+
+
+def export_mime(fmt, compression=None):
+    if compression and fmt != 'parquet':
+        return 'application/gzip' if compression == 'gzip' else 'application/zstd'
+    return FORMATS[fmt][0]
+
+
+# ============================================================================
+# CHUNKING & ENCODING
+# ============================================================================
+
+def iter_row_chunks(df, positions=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yield DataFrame chunks of the selected rows and columns.
+
+    Args:
+        df: Catalog DataFrame
+        positions: Row positions to export in order (None for every row)
+        columns: Columns to export (None for export_columns(df))
+        chunk_rows: Rows per chunk
+    """
+    columns = export_columns(df) if columns is None else columns
+    n_rows = len(df) if positions is None else len(positions)
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        rows = slice(start, stop) if positions is None else np.asarray(positions[start:stop])
+        yield df.iloc[rows][columns]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back what was written since the last drain.
+
+    Tracks the absolute position so Parquet footers get correct offsets.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _encode_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+def _encode_jsonl(chunks):
+    for chunk in chunks:
+        if len(chunk):
+            # Each chunk already ends with a newline; another would leave a blank (invalid) line
+            yield chunk.to_json(orient='records', lines=True, force_ascii=False).encode('utf-8')
+
+
+def _encode_parquet(chunks, compression):
+    pa, pq = _parquet_module()
+    sink = _ChunkSink()
+    writer = None
+    schema = None
+    for chunk in chunks:
+        if writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            schema = table.schema
+            writer = pq.ParquetWriter(sink, schema, compression=compression or 'none')
+        else:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def _compress(stream, compression):
+    """Compress a byte stream incrementally."""
+    if compression is None:
+        yield from stream
+        return
+    if compression == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ExportUnavailable("zstd compression requires zstandard (pip install zstandard)")
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def check_export(fmt, compression=None):
+    """
+    Check that an export format and compression can be produced here.
+
+    Raises:
+        ValueError: If the format or compression is unknown
+        ExportUnavailable: If the format or compression needs a missing package
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    if fmt == 'parquet':
+        _parquet_module()
+    elif compression == 'zstd' and zstandard is None:
+        raise ExportUnavailable("zstd compression requires zstandard (pip install zstandard)")
+
+
+def export_rows(df, positions=None, fmt='csv', compression=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Stream selected rows of a catalog as encoded (and optionally compressed) bytes.
+
+    Args:
+        df: Catalog DataFrame
+        positions: Row positions to export in order (None for the whole catalog)
+        fmt: 'csv', 'jsonl' or 'parquet'
+        compression: None, 'gzip' or 'zstd'
+        columns: Columns to export (None for export_columns(df))
+        chunk_rows: Rows encoded per chunk
+
+    Returns:
+        Generator of byte chunks
+
+    Raises:
+        ExportUnavailable: If the format or compression needs a missing package
+    """
+    # Fail before the first chunk rather than midway through a download
+    check_export(fmt, compression)
+
+    chunks = iter_row_chunks(df, positions, columns, chunk_rows)
+    if fmt == 'parquet':
+        return _encode_parquet(chunks, compression)
+    stream = _encode_csv(chunks) if fmt == 'csv' else _encode_jsonl(chunks)
+    return _compress(stream, compression)
+
+
+def write_export(fileobj, df, positions=None, fmt='csv', compression=None, columns=None,
+                 chunk_rows=CHUNK_ROWS):
+    """
+    Write an export to a binary file object chunk by chunk.
+
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    for data in export_rows(df, positions, fmt, compression, columns, chunk_rows):
+        fileobj.write(data)
+        written += len(data)
+    return written
+
+
+# ============================================================================
+# COMMAND-LINE INTERFACE
+# ============================================================================
+
+def main(argv=None):
+    from datasets import CATALOGS, load_catalog
+    from search_engine import recommend_books, recommend_courses, recommend_movies
+
+    parser = argparse.ArgumentParser(description="Export a catalog (or its filtered matches) in chunks")
+    parser.add_argument('kind', choices=sorted(CATALOGS))
+    parser.add_argument('--csv', help="Source CSV (defaults to the bundled dataset)")
+    parser.add_argument('--title', default='', help="Only export matches for this title")
+    parser.add_argument('--genre', default='', help="Genre filter (books, movies)")
+    parser.add_argument('--author', default='', help="Author/publisher filter (books)")
+    parser.add_argument('--difficulty', default='', help="Difficulty filter (courses)")
+    parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--compression', choices=['gzip', 'zstd'])
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args(argv)
+    # Before loading anything or creating --out, so a missing package leaves no empty file behind
+    try:
+        check_export(args.fmt, args.compression)
+    except ExportUnavailable as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    df = load_catalog(args.kind, file_path=args.csv)
+    positions = None
+    if args.title or args.genre or args.author or args.difficulty:
+        if args.kind == 'books':
+            cursor = recommend_books(df, args.title, args.genre, args.author, as_cursor=True, max_results=None)
+        elif args.kind == 'courses':
+            cursor = recommend_courses(df, args.title, args.difficulty, as_cursor=True, max_results=None)
+        else:
+            cursor = recommend_movies(df, args.title, args.genre, as_cursor=True, max_results=None)
+        positions = cursor.positions
+
+    with open(args.out, 'wb') as out:
+        written = write_export(out, df, positions, args.fmt, args.compression, chunk_rows=args.chunk_rows)
+    n_rows = len(df) if positions is None else len(positions)
+    print(f"Wrote {n_rows:,} rows ({written / 2**20:,.1f} MB) to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
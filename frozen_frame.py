@@ -0,0 +1,108 @@
+"""
+Read-Only Shared Datasets
+=========================
+
+Loaded catalogs are cached once per process and handed to every session
+and thread as the same object, without copying (see dataset_cache.py). A
+write by one session would therefore change what every other session sees.
+``freeze`` wraps a catalog in a ``FrozenDataFrame``, which shares its data
+but refuses writes with ``FrozenDatasetError``:
+
+- ``df[col] = ...``, ``del df[col]``, ``insert``, ``pop`` and ``update``
+- assignment through ``.loc``, ``.iloc``, ``.at`` and ``.iat``
+- every ``inplace=True`` method and in-place operator (``drop``, ``fillna``,
+  ``sort_values``, ``reset_index``, ``+=``, ...), and replacing
+  ``columns``, ``index`` or ``attrs``
+
+Everything derived from it (selections, ``head``, ``copy``, computed
+frames and columns) is an ordinary DataFrame or Series; with copy-on-write
+(pandas >= 3, or ``mode.copy_on_write``), writing to one never reaches the
+shared data.
+
+Limits: the ``attrs`` dict itself is shared and not locked (metadata such
+as ``dataset_version`` must be set before freezing), and code that reaches
+into pandas internals can still get around the checks.
+"""
+
+import pandas as pd
+
+
+class FrozenDatasetError(TypeError):
+    """Raised when code tries to modify a shared, read-only dataset."""
+
+
+def _refuse(*args, **kwargs):
+    raise FrozenDatasetError("shared datasets are read-only; modify a copy() instead")
+
+
+class _ReadOnlyIndexer:
+    """An indexer (``.loc``, ``.iloc``, ...) that reads but never assigns."""
+
+    __slots__ = ('_indexer',)
+
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    __setitem__ = _refuse
+
+    def __call__(self, *args, **kwargs):
+        return _ReadOnlyIndexer(self._indexer(*args, **kwargs))
+
+
+class FrozenDataFrame(pd.DataFrame):
+    """A DataFrame whose data, columns, index and attrs cannot be changed (see freeze)."""
+
+    @property
+    def _constructor(self):
+        # Results derived from a frozen frame are ordinary, writable frames
+        return pd.DataFrame
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat)
+
+    __setitem__ = __delitem__ = _refuse
+    insert = pop = update = _refuse
+
+    def __setattr__(self, name, value):
+        # In-place methods and operators all end by swapping the frame's internals through here
+        if self.__dict__.get('_frozen'):
+            _refuse()
+        super().__setattr__(name, value)
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        object.__setattr__(self, '_frozen', True)
+
+
+def freeze(df):
+    """
+    Read-only view of a DataFrame, sharing its data and ``attrs``.
+
+    Args:
+        df: DataFrame to share (no longer modified by the caller afterwards)
+
+    Returns:
+        FrozenDataFrame (``df`` itself if it is frozen already)
+    """
+    if isinstance(df, FrozenDataFrame):
+        return df
+    frozen = FrozenDataFrame(df)
+    frozen.attrs = df.attrs
+    object.__setattr__(frozen, '_frozen', True)
+    return frozen
@@ -0,0 +1,676 @@
+"""
+End-to-End Load Harness
+=======================
+
+Starts app.py under a real ``streamlit run`` server and replays session
+scripts against it with N concurrent headless clients. Each client speaks
+Streamlit's websocket protocol the way a browser tab does: it sends
+``rerun_script`` messages carrying its widget states, waits for the run to
+finish, and reads widget ids, errors and download handles from the deltas.
+
+Image hosts are replaced by a local stub HTTP server: the catalog CSVs are
+copied to a scratch data directory with their image URLs rewritten to point
+at it, so card rendering fetches (and caches) images over real HTTP without
+touching the network.
+
+The report gives rerun latency percentiles per action, plus the server
+process's CPU use and RSS sampled over the run.
+
+Session scripts are JSON lists of steps:
+
+    [{"action": "search", "kind": "books", "query": ["harry", "dune"], "genre": ""},
+     {"action": "page", "kind": "books", "button": "next"},
+     {"action": "refresh"},
+     {"action": "auto_refresh", "seconds": 6},
+     {"action": "export", "kind": "books", "scope": "All matches", "fmt": "csv", "compression": "gzip"},
+     {"action": "think", "ms": 250}]
+
+A list value gives each user a different entry (user i takes item i mod n).
+``refresh`` is a rerun without input (the cost of one auto-refresh tick);
+``auto_refresh`` presses Start, lets the app refresh itself, then presses
+Stop. ``export`` sets the export options, presses the download button and
+downloads the generated file.
+
+Usage:
+    python load_test.py --users 20 --iterations 3
+    python load_test.py --users 50 --script sessions.json --report load.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlsplit
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TAB_LABELS = {
+    'books': "📚 Book Recommender",
+    'courses': "🎓 Course Recommender",
+    'movies': "🎬 Movie Recommender",
+    'all': "🔎 Search Everything",
+}
+
+# Widget keys of each tab's search form: search button, then (param, widget key) pairs
+SEARCH_FORMS = {
+    'books': ('find_books_btn', [('query', 'book_name_input'), ('genre', 'genre_input'),
+                                 ('author', 'publisher_input')]),
+    'courses': ('find_courses_btn', [('query', 'course_title_input'), ('difficulty', 'difficulty_select')]),
+    'movies': ('find_movies_btn', [('query', 'movie_name_input'), ('genre', 'genre_movie_input')]),
+    'all': ('find_all_btn', [('query', 'unified_query_input')]),
+}
+
+PAGE_BUTTONS = {'next': 'next_page', 'prev': 'prev_page', 'load_more': 'load_more'}
+
+# Columns holding image URLs that are redirected to the stub server
+IMAGE_COLUMNS = {'books': ['image_url', 'small_image_url'], 'movies': ['Poster']}
+
+DEFAULT_SCRIPT = [
+    {"action": "search", "kind": "books", "query": ["harry", "potter", "hobbit", "hunger games", "dune"]},
+    {"action": "think", "ms": 100},
+    {"action": "page", "kind": "books", "button": "next"},
+    {"action": "page", "kind": "books", "button": "load_more"},
+    {"action": "refresh"},
+    {"action": "export", "kind": "books", "scope": "All matches", "fmt": "csv", "compression": "gzip"},
+    {"action": "search", "kind": "courses", "query": ["python", "data", "machine learning"],
+     "difficulty": ["", "Beginner"]},
+    {"action": "search", "kind": "all", "query": ["python", "harry", "space"]},
+]
+
+# Seconds to wait for the server to come up and for any single rerun
+SERVER_START_TIMEOUT_S = 60
+RUN_TIMEOUT_S = 120
+# Deferred export downloads requested per export before giving up
+EXPORT_ATTEMPTS = 3
+
+
+# ============================================================================
+# STUB IMAGE SERVER
+# ============================================================================
+
+def _placeholder_jpeg(size=(98, 147)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', size, (30, 60, 90)).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class StubImageServer:
+    """Local HTTP server answering every GET with the same small JPEG.
+
+    Args:
+        latency_ms: Delay added to every response (simulates a remote host)
+    """
+
+    def __init__(self, latency_ms=0.0):
+        body = _placeholder_jpeg()
+        delay = latency_ms / 1000.0
+        stats = self.stats = {'requests': 0}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    stats['requests'] += 1
+                if delay:
+                    time.sleep(delay)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-images', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def rewrite(self, url):
+        """Point an image URL at this server, keeping host and path for uniqueness."""
+        if not url:
+            return url
+        parts = urlsplit(url)
+        return f"{self.base_url}/{parts.netloc}{parts.path}"
+
+
+def prepare_data_dir(source_dir, target_dir, server):
+    """Copy the catalog CSVs into ``target_dir`` with image URLs pointing at the stub server.
+
+    Returns:
+        Catalog kinds whose CSV was found
+    """
+    from datasets import CATALOGS
+
+    found = []
+    for kind, meta in CATALOGS.items():
+        source = os.path.join(source_dir, meta['file'])
+        if not os.path.exists(source):
+            continue
+        target = os.path.join(target_dir, meta['file'])
+        columns = IMAGE_COLUMNS.get(kind, [])
+        if not columns:
+            shutil.copyfile(source, target)
+        else:
+            with open(source, newline='', encoding='utf-8', errors='replace') as src, \
+                    open(target, 'w', newline='', encoding='utf-8') as dst:
+                reader = csv.DictReader(src)
+                writer = csv.DictWriter(dst, fieldnames=reader.fieldnames)
+                writer.writeheader()
+                for row in reader:
+                    for column in columns:
+                        if row.get(column):
+                            row[column] = server.rewrite(row[column])
+                    writer.writerow(row)
+        found.append(kind)
+    return found
+
+
+# ============================================================================
+# APP SERVER
+# ============================================================================
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """``streamlit run app.py`` in a child process on a free local port.
+
+    Args:
+        env: Extra environment variables for the server (data and bundle dirs)
+        log_path: File receiving the server's stdout/stderr
+    """
+
+    def __init__(self, env, log_path):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._env = dict(os.environ, **env)
+        self._log_path = log_path
+        self.process = None
+
+    def __enter__(self):
+        command = [sys.executable, '-m', 'streamlit', 'run', 'app.py',
+                   '--server.headless', 'true', '--server.address', '127.0.0.1',
+                   '--server.port', str(self.port), '--browser.gatherUsageStats', 'false',
+                   '--server.fileWatcherType', 'none']
+        self._log = open(self._log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=APP_DIR, env=self._env,
+                                        stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_S
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {self.process.returncode}; see {self._log_path}")
+            try:
+                with urllib.request.urlopen(f"{self.base_url}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"streamlit did not become healthy within {SERVER_START_TIMEOUT_S}s")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+# ============================================================================
+# RESOURCE SAMPLING
+# ============================================================================
+
+def _process_usage(pid):
+    """(CPU seconds, RSS bytes) of a process, from /proc (Linux)."""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu_s = (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+    with open(f'/proc/{pid}/statm') as f:
+        rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return cpu_s, rss
+
+
+class ResourceSampler(threading.Thread):
+    """Samples a process's CPU utilisation and RSS at a fixed interval."""
+
+    def __init__(self, pid, interval_s=1.0):
+        super().__init__(name='resource-sampler', daemon=True)
+        self.pid = pid
+        self.interval_s = interval_s
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            last_cpu, _ = _process_usage(self.pid)
+        except (OSError, ValueError):
+            return  # /proc not available: report no samples
+        start = last_wall = time.monotonic()
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                cpu, rss = _process_usage(self.pid)
+            except (OSError, ValueError):
+                return
+            wall = time.monotonic()
+            self.samples.append({
+                't_s': round(wall - start, 2),
+                'cpu_pct': round(100.0 * (cpu - last_cpu) / max(wall - last_wall, 1e-9), 1),
+                'rss_mb': round(rss / 2**20, 1),
+            })
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ============================================================================
+# HEADLESS SESSION CLIENT
+# ============================================================================
+
+def _element_ids(message, found):
+    """Collect keyed widget/element protos by user key from a delta."""
+    from google.protobuf.message import Message
+
+    for field, value in message.ListFields():
+        if field.message_type is not None:
+            for item in ([value] if isinstance(value, Message) else value):
+                _element_ids(item, found)
+        elif field.name == 'id' and isinstance(value, str) and value.startswith('$$ID-'):
+            key = value.split('-', 2)[-1]
+            if key != 'None':
+                found[key] = message
+
+
+class SessionClient:
+    """One browser tab: a websocket session that sends widget states and awaits runs.
+
+    Widget values persist between reruns like in the browser; button presses
+    are one-shot triggers.
+    """
+
+    def __init__(self, base_url):
+        from websockets.sync.client import connect
+
+        ws_url = base_url.replace('http://', 'ws://') + '/_stcore/stream'
+        self.base_url = base_url
+        self._connection = connect(ws_url, subprotocols=['streamlit'], max_size=None, open_timeout=30)
+        self._ws = None
+        self.elements = {}
+        self.errors = []
+        self._values = {}
+        self._page_hash = ''
+        self._request_id = 0
+        self.session_id = None
+
+    def __enter__(self):
+        self._ws = self._connection.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._connection.__exit__(*exc)
+
+    def send_rerun(self, **triggers):
+        """Send a rerun with the current widget values plus one-shot trigger keys."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        back = BackMsg()
+        back.rerun_script.query_string = ''
+        back.rerun_script.page_script_hash = self._page_hash
+        for key, (field, value) in self._values.items():
+            # Like the browser, only widgets on the current page report their state
+            if key in self.elements:
+                self._add_state(back, key, field, value)
+        for key in triggers:
+            if key not in self.elements:
+                raise KeyError(f"widget {key!r} is not on the page")
+            self._add_state(back, key, 'trigger_value', True)
+        self._ws.send(back.SerializeToString())
+
+    def receive(self, timeout=RUN_TIMEOUT_S):
+        """Receive and apply one ForwardMsg (raises TimeoutError if none arrives)."""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = ForwardMsg()
+        msg.ParseFromString(self._ws.recv(timeout=timeout))
+        kind = msg.WhichOneof('type')
+        if kind == 'new_session':
+            self._page_hash = msg.new_session.page_script_hash
+            self.session_id = msg.new_session.initialize.session_id or self.session_id
+            self.elements = {}
+        elif kind == 'delta':
+            delta = msg.delta
+            if delta.WhichOneof('type') == 'new_element' and delta.new_element.WhichOneof('type') == 'exception':
+                self.errors.append(delta.new_element.exception.message)
+            _element_ids(delta, self.elements)
+        return msg
+
+    def rerun(self, **triggers):
+        """
+        Rerun the script and wait until the page settles.
+
+        Returns:
+            Number of script runs completed (more than one when the script
+            called st.rerun)
+        """
+        self.send_rerun(**triggers)
+        runs = 0
+        while True:
+            msg = self.receive()
+            if msg.WhichOneof('type') == 'script_finished':
+                runs += 1
+                if msg.script_finished != msg.FINISHED_EARLY_FOR_RERUN:
+                    return runs
+
+    def _add_state(self, back, key, field, value):
+        state = back.rerun_script.widget_states.widgets.add()
+        state.id = self.elements[key].id
+        setattr(state, field, value)
+
+    def set_value(self, key, value, field='string_value'):
+        self._values[key] = (field, value)
+
+    def has(self, key):
+        return key in self.elements
+
+    def request_deferred_file(self, key):
+        """Press a deferred download button and return the generated file's URL."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        self._request_id += 1
+        back = BackMsg()
+        back.backend_operation_request.request_id = str(self._request_id)
+        back.backend_operation_request.session_id = self.session_id
+        back.backend_operation_request.deferred_file.file_id = self.elements[key].deferred_file_id
+        self._ws.send(back.SerializeToString())
+        while True:
+            msg = self.receive()
+            if msg.WhichOneof('type') == 'backend_operation_response':
+                response = msg.backend_operation_response
+                if response.request_id == str(self._request_id):
+                    if response.error_msg:
+                        raise RuntimeError(response.error_msg)
+                    return response.deferred_file.url
+
+
+def _pick(value, user):
+    return value[user % len(value)] if isinstance(value, list) else value
+
+
+class SimulatedUser:
+    """Replays a session script through its own SessionClient, timing each action."""
+
+    def __init__(self, user, script, latencies, base_url, catalogs):
+        self.user = user
+        self.script = script
+        self.latencies = latencies
+        self.base_url = base_url
+        self.catalogs = catalogs
+        self.errors = []
+        self.client = None
+
+    def _timed(self, name, fn):
+        start = time.perf_counter()
+        seen_errors = len(self.client.errors)
+        try:
+            fn()
+        except Exception as e:
+            self.errors.append(f"user {self.user} {name}: {type(e).__name__}: {e}")
+            return
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        self.errors.extend(f"user {self.user} {name}: {error}" for error in self.client.errors[seen_errors:])
+
+    def _open_tab(self, kind):
+        current = self.client._values.get('active_tab', (None, TAB_LABELS['books']))[1]
+        if current != TAB_LABELS[kind]:
+            self.client.set_value('active_tab', TAB_LABELS[kind])
+            self._timed(f'tab:{kind}', self.client.rerun)
+
+    def step(self, step):
+        client = self.client
+        action = step['action']
+        kind = step.get('kind')
+        if kind and kind != 'all' and kind not in self.catalogs:
+            return
+        if action == 'think':
+            time.sleep(_pick(step.get('ms', 0), self.user) / 1000.0)
+        elif action == 'refresh':
+            self._timed('refresh', client.rerun)
+        elif action == 'auto_refresh':
+            self._auto_refresh(_pick(step.get('seconds', 5), self.user))
+        elif action == 'tab':
+            self._open_tab(kind)
+        elif action == 'search':
+            self._open_tab(kind)
+            button, fields = SEARCH_FORMS[kind]
+            for param, key in fields:
+                client.set_value(key, _pick(step.get(param, ''), self.user))
+            self._timed(f'search:{kind}', lambda: client.rerun(**{button: True}))
+        elif action == 'page':
+            self._open_tab(kind)
+            button = step.get('button', 'next')
+            key = f"{kind}_{PAGE_BUTTONS[button]}"
+            if client.has(key) and not client.elements[key].disabled:
+                self._timed(f'page:{button}', lambda: client.rerun(**{key: True}))
+        elif action == 'export':
+            self._open_tab(kind)
+            if client.has(f'{kind}_export_download'):
+                self._timed(f'export:{kind}', lambda: self._export(kind, step))
+        else:
+            raise ValueError(f"Unknown action: {action}")
+
+    def _auto_refresh(self, seconds):
+        """Press Start, let the app rerun itself for ``seconds``, then press Stop."""
+        client = self.client
+        if not client.has('start_refresh_btn'):
+            return
+        client.send_rerun(start_refresh_btn=True)
+        # The Start click and every tick end with st.rerun(); count the ticks
+        finished = 0
+        end = time.monotonic() + seconds
+        while (remaining := end - time.monotonic()) > 0:
+            try:
+                msg = client.receive(timeout=remaining)
+            except TimeoutError:
+                break
+            if msg.WhichOneof('type') == 'script_finished':
+                finished += 1
+        self.latencies['auto_refresh:ticks'].extend([0.0] * max(finished - 1, 0))
+        self._timed('auto_refresh:stop', lambda: client.rerun(stop_refresh_btn=True))
+
+    def _export(self, kind, step):
+        client = self.client
+        client.set_value(f'{kind}_export_scope', step.get('scope', 'Shown results'))
+        # Select boxes report the displayed label of the chosen option
+        client.set_value(f'{kind}_export_format', step.get('fmt', 'csv').upper())
+        compression = step.get('compression')
+        client.set_value(f'{kind}_export_compression', compression or 'none')
+        client.rerun()
+        # Generated files belong to no session, so another session's finished
+        # run can garbage-collect one before it is fetched: ask for a new one
+        for attempt in range(EXPORT_ATTEMPTS):
+            url = client.request_deferred_file(f'{kind}_export_download')
+            try:
+                size = 0
+                with urllib.request.urlopen(self.base_url + url, timeout=RUN_TIMEOUT_S) as response:
+                    while chunk := response.read(1 << 16):
+                        size += len(chunk)
+                break
+            except urllib.error.HTTPError as e:
+                if e.code != 404 or attempt == EXPORT_ATTEMPTS - 1:
+                    raise
+        self.latencies[f'export_bytes:{kind}'].append(float(size))
+
+    def run(self, iterations):
+        try:
+            with SessionClient(self.base_url) as self.client:
+                self._timed('first_load', self.client.rerun)
+                for _ in range(iterations):
+                    for step in self.script:
+                        self.step(step)
+        except OSError as e:
+            self.errors.append(f"user {self.user} connection: {type(e).__name__}: {e}")
+        return self.errors
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _percentiles(values):
+    from metrics import _percentile
+
+    ordered = sorted(values)
+    return {'count': len(ordered), 'p50': _percentile(ordered, 50), 'p95': _percentile(ordered, 95),
+            'p99': _percentile(ordered, 99), 'max': ordered[-1] if ordered else None}
+
+
+def summarize(latencies, samples, errors, elapsed_s, users, image_requests):
+    rss = [sample['rss_mb'] for sample in samples]
+    return {
+        'users': users,
+        'elapsed_s': round(elapsed_s, 2),
+        'latency_ms': {name: _percentiles(values) for name, values in sorted(latencies.items())
+                       if not name.startswith(('export_bytes:', 'auto_refresh:ticks'))},
+        'auto_refresh_ticks': len(latencies.get('auto_refresh:ticks', [])),
+        'export_bytes': {name.split(':', 1)[1]: _percentiles(values) for name, values in latencies.items()
+                         if name.startswith('export_bytes:')},
+        'server': {
+            'samples': samples,
+            'rss_start_mb': rss[0] if rss else None,
+            'rss_end_mb': rss[-1] if rss else None,
+            'rss_peak_mb': max(rss) if rss else None,
+            'cpu_mean_pct': round(sum(s['cpu_pct'] for s in samples) / len(samples), 1) if samples else None,
+        },
+        'image_requests': image_requests,
+        'errors': errors[:50],
+        'error_count': len(errors),
+    }
+
+
+def print_report(report, out=sys.stdout):
+    print(f"\n{report['users']} users, {report['elapsed_s']}s, {report['image_requests']} stub image requests, "
+          f"{report['auto_refresh_ticks']} auto-refresh ticks, {report['error_count']} errors", file=out)
+    print(f"{'action':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=out)
+    for name, stats in report['latency_ms'].items():
+        row = [f"{stats[q]:,.0f}" if stats[q] is not None else '-' for q in ('p50', 'p95', 'p99', 'max')]
+        print(f"{name:<22}{stats['count']:>7}" + ''.join(f"{value:>10}" for value in row), file=out)
+    server = report['server']
+    if server['samples']:
+        print(f"Server CPU mean {server['cpu_mean_pct']}% · RSS {server['rss_start_mb']} → "
+              f"{server['rss_end_mb']} MB (peak {server['rss_peak_mb']} MB)", file=out)
+        for sample in server['samples']:
+            print(f"  t={sample['t_s']:>7}s  cpu {sample['cpu_pct']:>6}%  rss {sample['rss_mb']:>8} MB", file=out)
+    for error in report['errors'][:10]:
+        print(f"⚠️  {error}", file=out)
+
+
+# ============================================================================
+# COMMAND-LINE INTERFACE
+# ============================================================================
+
+def run_load_test(users=10, iterations=1, script=None, ramp_s=0.0, image_latency_ms=50.0,
+                  sample_interval_s=1.0, data_dir=None, server_env=None, server_log=None):
+    """
+    Run the load test and return its report dict.
+
+    Args:
+        users: Concurrent simulated sessions
+        iterations: Times each user replays the script
+        script: List of steps (defaults to DEFAULT_SCRIPT)
+        ramp_s: Spread session starts over this many seconds
+        image_latency_ms: Delay of each stub image response
+        sample_interval_s: Server CPU/RSS sampling interval
+        data_dir: Directory with the source CSVs (defaults to RECOMMENDER_DATA_DIR or '.')
+        server_env: Extra environment variables for the app server (e.g. budgets)
+        server_log: Keep the server's output in this file (default: discarded)
+    """
+    script = script or DEFAULT_SCRIPT
+    source_dir = os.path.abspath(data_dir or os.environ.get('RECOMMENDER_DATA_DIR', APP_DIR))
+    scratch = tempfile.mkdtemp(prefix='recommender-load-')
+    try:
+        with StubImageServer(image_latency_ms) as images:
+            catalogs = prepare_data_dir(source_dir, scratch, images)
+            env = {'RECOMMENDER_DATA_DIR': scratch, 'RECOMMENDER_BUNDLE_DIR': os.path.join(scratch, 'bundles')}
+            env.update(server_env or {})
+            with AppServer(env, server_log or os.path.join(scratch, 'server.log')) as server:
+                latencies = defaultdict(list)
+                sampler = ResourceSampler(server.process.pid, sample_interval_s)
+                sampler.start()
+                start = time.monotonic()
+
+                def session(user):
+                    if ramp_s:
+                        time.sleep(random.uniform(0, ramp_s))
+                    return SimulatedUser(user, script, latencies, server.base_url, catalogs).run(iterations)
+
+                with ThreadPoolExecutor(max_workers=users, thread_name_prefix='load-user') as pool:
+                    errors = [error for result in pool.map(session, range(users)) for error in result]
+                elapsed = time.monotonic() - start
+                sampler.stop()
+            return summarize(latencies, sampler.samples, errors, elapsed, users, images.stats['requests'])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay concurrent sessions against app.py under streamlit run")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent sessions (default: 10)")
+    parser.add_argument('--iterations', type=int, default=1, help="Script replays per session (default: 1)")
+    parser.add_argument('--script', help="JSON file with the session script (default: built-in)")
+    parser.add_argument('--ramp', type=float, default=0.0, help="Spread session starts over N seconds")
+    parser.add_argument('--image-latency-ms', type=float, default=50.0, help="Stub image server delay")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="CPU/RSS sampling interval (s)")
+    parser.add_argument('--data-dir', help="Directory with the catalog CSVs")
+    parser.add_argument('--report', help="Also write the report as JSON to this path")
+    parser.add_argument('--server-log', help="Keep the app server's output in this file")
+    args = parser.parse_args(argv)
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    report = run_load_test(args.users, args.iterations, script, args.ramp, args.image_latency_ms,
+                           args.sample_interval, data_dir=args.data_dir, server_log=args.server_log)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report['error_count'] else 0)
+
+
+if __name__ == '__main__':
+    main()
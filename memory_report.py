@@ -0,0 +1,206 @@
+"""
+Process Memory Accounting
+=========================
+
+Where the process's memory goes, for the admin panel and capacity planning:
+
+- Datasets: deep bytes per DataFrame and per column (Python string objects
+  included), with the derived lowercase search columns totalled separately.
+- Indexes and caches: deep size of in-memory structures; memory-mapped arrays
+  (neighbour tables) are reported as mapped bytes, since only the pages
+  actually read are resident.
+- Process: resident set size from ``/proc`` (peak RSS where that is missing).
+- Allocations: tracemalloc's top allocating source lines, on demand. Tracing
+  costs CPU and memory for every allocation, so it is off until started.
+
+``publish`` copies the totals into the metrics registry as ``memory.*``
+gauges so they are exported with every other metric.
+"""
+
+import array
+import os
+import sys
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from metrics import REGISTRY
+
+# Suffix of the lowercase copies of text columns made for searching
+SEARCH_COLUMN_SUFFIX = '_lower'
+# Stack frames kept per traced allocation
+TRACEMALLOC_FRAMES = 1
+
+
+def dataset_memory(df):
+    """
+    Deep memory use of a DataFrame, per column.
+
+    Args:
+        df: DataFrame to measure
+
+    Returns:
+        Dict with rows, bytes (including the index), search_bytes (lowercase
+        search columns) and columns (column name -> bytes, largest first)
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    columns = {str(name): int(nbytes) for name, nbytes in usage.items() if name != 'Index'}
+    return {
+        'rows': len(df),
+        'bytes': int(usage.sum()),
+        'search_bytes': sum(nbytes for name, nbytes in columns.items() if name.endswith(SEARCH_COLUMN_SUFFIX)),
+        'columns': dict(sorted(columns.items(), key=lambda item: -item[1])),
+    }
+
+
+def deep_nbytes(value):
+    """
+    Approximate deep size of an in-memory structure (an index, a tracker).
+
+    Containers, instance attributes and slots are walked; objects reachable
+    more than once are counted once. Memory-mapped arrays count as zero (see
+    ``mapped_nbytes``).
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.memmap):
+            continue
+        if isinstance(obj, np.ndarray):
+            if obj.base is None:
+                total += sys.getsizeof(obj)
+            else:
+                total += obj.nbytes
+                if obj.dtype == object:
+                    stack.extend(obj.ravel())
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, complex, bool, array.array, type)) or obj is None:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(vars(obj))
+            for name in getattr(type(obj), '__slots__', ()):
+                if name != '__weakref__' and hasattr(obj, name):
+                    stack.append(getattr(obj, name))
+    return total
+
+
+def mapped_nbytes(value):
+    """Total size of the memory-mapped arrays held as attributes of ``value``."""
+    return sum(attr.nbytes for attr in vars(value).values() if isinstance(attr, np.memmap))
+
+
+def process_rss_bytes():
+    """
+    Resident set size of this process.
+
+    Returns:
+        Tuple (bytes, is_peak): is_peak is True when only the peak RSS is
+        available (no /proc); bytes is None if neither can be read
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'), False
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None, False
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return (peak if sys.platform == 'darwin' else peak * 1024), True
+
+
+# ============================================================================
+# TRACEMALLOC
+# ============================================================================
+
+def start_tracing(frames=TRACEMALLOC_FRAMES):
+    """Start tracing allocations (process-wide) if not already tracing."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """Stop tracing and free the traces."""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def top_allocators(limit=10):
+    """
+    Source lines holding the most memory allocated since tracing started.
+
+    Args:
+        limit: Number of lines to return
+
+    Returns:
+        List of dicts (location, bytes, blocks), largest first; empty when
+        not tracing
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    allocators = []
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        allocators.append({'location': f'{frame.filename}:{frame.lineno}', 'bytes': stat.size, 'blocks': stat.count})
+    return allocators
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def memory_report(datasets=None, indexes=None, caches=None):
+    """
+    Assemble a memory report.
+
+    Args:
+        datasets: Dict label -> ``dataset_memory`` result
+        indexes: Dict name -> {'bytes': ..., 'mapped_bytes': ...}
+        caches: Dict name -> {'bytes': ..., optional 'max_bytes': ...}
+
+    Returns:
+        Dict with process, datasets, indexes, caches and tracemalloc sections
+    """
+    rss, is_peak = process_rss_bytes()
+    traced, traced_peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return {
+        'process': {'rss_bytes': rss, 'rss_is_peak': is_peak},
+        'datasets': datasets or {},
+        'indexes': indexes or {},
+        'caches': caches or {},
+        'tracemalloc': {'tracing': tracemalloc.is_tracing(), 'traced_bytes': traced, 'peak_bytes': traced_peak},
+    }
+
+
+def publish(report, registry=REGISTRY):
+    """Store a report's totals as ``memory.*`` gauges in the metrics registry."""
+    registry.set_gauge('memory.rss_bytes', report['process']['rss_bytes'])
+    for label, usage in report['datasets'].items():
+        registry.set_gauge(f'memory.dataset.{label}.bytes', usage['bytes'])
+        registry.set_gauge(f'memory.dataset.{label}.search_bytes', usage['search_bytes'])
+    for section, prefix in (('indexes', 'memory.index'), ('caches', 'memory.cache')):
+        for name, usage in report[section].items():
+            for field, value in usage.items():
+                registry.set_gauge(f'{prefix}.{name}.{field}', value)
+    if report['tracemalloc']['tracing']:
+        registry.set_gauge('memory.tracemalloc.traced_bytes', report['tracemalloc']['traced_bytes'])
@@ -0,0 +1,93 @@
+"""
+Process-Wide Metrics
+====================
+
+A small thread-safe registry shared by every Streamlit session in the
+process. Gauges hold the latest value of something (bytes cached, cold-start
+time); timings keep a bounded window of recent observations and report
+percentiles.
+
+    from metrics import REGISTRY
+
+    REGISTRY.set_gauge('startup.import_ms', 42.0)
+    REGISTRY.observe('run.first_paint_ms', 120.0)
+    REGISTRY.snapshot()
+"""
+
+import threading
+from collections import deque
+
+# Observations kept per timing (older ones are dropped)
+TIMING_WINDOW = 1024
+
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class MetricsRegistry:
+    """Thread-safe gauges and windowed timings."""
+
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self._gauges = {}
+        self._timings = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def set_gauge_once(self, name, value):
+        """Set a gauge only if it has no value yet (e.g. cold-start measurements).
+
+        Returns:
+            True if the value was stored
+        """
+        with self._lock:
+            if name in self._gauges:
+                return False
+            self._gauges[name] = value
+            return True
+
+    def gauge(self, name, default=None):
+        with self._lock:
+            return self._gauges.get(name, default)
+
+    def observe(self, name, value):
+        """Record one observation of a timing (or any distribution)."""
+        with self._lock:
+            values = self._timings.get(name)
+            if values is None:
+                values = self._timings[name] = deque(maxlen=self.window)
+            values.append(value)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self, name):
+        """Count, last value and p50/p95/max of a timing's recent window."""
+        with self._lock:
+            values = list(self._timings.get(name, ()))
+            count = self._counts.get(name, 0)
+        ordered = sorted(values)
+        return {
+            'count': count,
+            'last': values[-1] if values else None,
+            'p50': _percentile(ordered, 50),
+            'p95': _percentile(ordered, 95),
+            'max': ordered[-1] if ordered else None,
+        }
+
+    def snapshot(self):
+        """All gauges and timing summaries as plain dicts."""
+        with self._lock:
+            gauges = dict(self._gauges)
+            names = list(self._timings)
+        return {'gauges': gauges, 'timings': {name: self.summary(name) for name in names}}
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,362 @@
+"""
+Item-to-Item "More Like This" Neighbour Tables
+==============================================
+
+Offline batch job that precomputes the top-K most similar items for every row
+of a catalog, so product pages can show "similar books/courses/movies" with a
+constant-time array slice instead of a fuzzy search per request.
+
+Similarity blends hashed text vectors of the title, author/organisation and
+genre/difficulty fields with the candidate's normalised rating. The catalog is
+split into row chunks that are scored in parallel worker processes. Workers
+share the input vectors through memory-mapped files and write straight into
+the memory-mapped output arrays:
+
+    <out>/<build>/ids.npy     int32   (N, K)  neighbour row positions, -1 padded
+    <out>/<build>/scores.npy  float16 (N, K)  blended similarity scores
+    <out>/<build>/meta.json           dataset version, K and build parameters
+    <out>/current.json                pointer to the active build (replaced atomically)
+
+Each build is written into its own directory, and only then does
+``current.json`` switch to it, so readers always find a complete table and
+running apps that memory-map the previous one never see its files
+rewritten under them. The previous build is kept until the next one
+replaces it.
+
+Small catalogs are scored exactly (blocked matrix products). Above
+``EXACT_MAX_ITEMS`` rows, candidates come from the IVF index in ann_index.py
+and only those are re-ranked.
+
+USAGE:
+------
+    python neighbours.py books --k 20
+    python neighbours.py movies --csv movies.csv --workers 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ann_index import IVFIndex, hashed_text_vectors, open_vectors, save_vectors
+from datasets import CATALOGS, load_catalog
+
+INDEX_DIR = os.environ.get('RECOMMENDER_INDEX_DIR', 'indexes')
+DEFAULT_K = 20
+DEFAULT_RATING_WEIGHT = 0.1
+FIELD_VECTOR_DIM = 128
+EXACT_MAX_ITEMS = 200_000
+CHUNK_ROWS = 2048
+BLOCK_ROWS = 16384
+ANN_CANDIDATE_FACTOR = 4
+
+# Text fields and weights that define item similarity per catalog
+SIMILARITY_FIELDS = {
+    'books': [('title', 0.7), ('authors', 0.3)],
+    'courses': [('course_title', 0.6), ('course_organization', 0.2), ('course_difficulty', 0.2)],
+    'movies': [('Title', 0.5), ('Genre', 0.5)],
+}
+
+
+def default_table_dir(kind):
+    """Directory where the neighbour table builds for a catalog kind are stored."""
+    return os.path.join(INDEX_DIR, kind, 'neighbours')
+
+
+def current_table_dir(out_dir):
+    """Directory of the active build under ``out_dir``, or None if nothing was built."""
+    try:
+        with open(os.path.join(out_dir, 'current.json'), encoding='utf-8') as f:
+            build = json.load(f)['build']
+    except (OSError, ValueError, KeyError):
+        # Tables built before current.json existed were written into out_dir itself
+        return out_dir if os.path.exists(os.path.join(out_dir, 'meta.json')) else None
+    return os.path.join(out_dir, build)
+
+
+# ============================================================================
+# FEATURES
+# ============================================================================
+
+def item_vectors(df, kind, dim=FIELD_VECTOR_DIM):
+    """Concatenate per-field hashed vectors, each scaled by sqrt(weight).
+
+    The dot product of two such vectors is the weighted sum of the per-field
+    cosine similarities.
+    """
+    fields = [(col, weight) for col, weight in SIMILARITY_FIELDS[kind] if col in df.columns]
+    total = sum(weight for _, weight in fields)
+    blocks = [hashed_text_vectors(df[col].tolist(), dim=dim) * np.sqrt(weight / total)
+              for col, weight in fields]
+    return np.hstack(blocks).astype(np.float32)
+
+
+def normalized_ratings(df, kind):
+    """Ratings scaled to [0, 1] by the catalog's rating scale."""
+    meta = CATALOGS[kind]
+    ratings = df[meta['rating_col']].to_numpy(dtype=np.float32) / meta['rating_scale']
+    return np.clip(ratings, 0.0, 1.0)
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def _merge_top_k(best_ids, best_scores, cand_ids, cand_scores, k):
+    """Keep the k best (id, score) pairs per row out of current best + candidates."""
+    ids = np.concatenate([best_ids, cand_ids], axis=1)
+    scores = np.concatenate([best_scores, cand_scores], axis=1)
+    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(ids, keep, axis=1), np.take_along_axis(scores, keep, axis=1)
+
+
+def _score_chunk_exact(args):
+    """Score rows [start, end) against the whole catalog in blocks."""
+    work_dir, start, end, k, rating_weight = args
+    vectors = open_vectors(os.path.join(work_dir, 'vectors.npy'))
+    ratings = np.load(os.path.join(work_dir, 'ratings.npy'), mmap_mode='r')
+    n = len(vectors)
+
+    queries = np.asarray(vectors[start:end])
+    rows = np.arange(start, end)
+    best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+    for block_start in range(0, n, BLOCK_ROWS):
+        block_end = min(block_start + BLOCK_ROWS, n)
+        sims = queries @ np.asarray(vectors[block_start:block_end]).T
+        scores = (1 - rating_weight) * sims + rating_weight * np.asarray(ratings[block_start:block_end])
+        cand_ids = np.broadcast_to(np.arange(block_start, block_end), scores.shape)
+        # An item is never its own neighbour
+        self_hit = (rows >= block_start) & (rows < block_end)
+        scores[self_hit, rows[self_hit] - block_start] = -np.inf
+        best_ids, best_scores = _merge_top_k(best_ids, best_scores, cand_ids, scores, k)
+
+    _write_chunk(work_dir, start, best_ids, best_scores)
+    return end - start
+
+
+def _score_chunk_ann(args):
+    """Score rows [start, end) by re-ranking IVF index candidates."""
+    work_dir, start, end, k, rating_weight = args
+    vectors = open_vectors(os.path.join(work_dir, 'vectors.npy'))
+    ratings = np.load(os.path.join(work_dir, 'ratings.npy'), mmap_mode='r')
+    index = IVFIndex.load(os.path.join(work_dir, 'ivf'))
+
+    best_ids = np.full((end - start, k), -1, dtype=np.int64)
+    best_scores = np.full((end - start, k), -np.inf, dtype=np.float32)
+
+    for i, row in enumerate(range(start, end)):
+        cand, sims = index.search(vectors[row], k=k * ANN_CANDIDATE_FACTOR, exclude=row)
+        if len(cand) == 0:
+            continue
+        scores = (1 - rating_weight) * sims + rating_weight * ratings[cand]
+        top = np.argsort(-scores, kind='stable')[:k]
+        best_ids[i, :len(top)] = cand[top]
+        best_scores[i, :len(top)] = scores[top]
+
+    _write_chunk(work_dir, start, best_ids, best_scores)
+    return end - start
+
+
+def _write_chunk(work_dir, start, best_ids, best_scores):
+    """Sort each row best-first and write it into the shared output memmaps."""
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best_ids = np.take_along_axis(best_ids, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_ids[~np.isfinite(best_scores)] = -1
+    best_scores[~np.isfinite(best_scores)] = 0
+
+    ids_out = np.load(os.path.join(work_dir, 'ids.npy'), mmap_mode='r+')
+    scores_out = np.load(os.path.join(work_dir, 'scores.npy'), mmap_mode='r+')
+    ids_out[start:start + len(best_ids)] = best_ids.astype(np.int32)
+    scores_out[start:start + len(best_scores)] = best_scores.astype(np.float16)
+    ids_out.flush()
+    scores_out.flush()
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _build_into(work_dir, df, kind, n, k, rating_weight, workers, method):
+    """Write every file of a table into ``work_dir``, meta.json last."""
+    save_vectors(os.path.join(work_dir, 'vectors.npy'), item_vectors(df, kind))
+    np.save(os.path.join(work_dir, 'ratings.npy'), normalized_ratings(df, kind))
+    np.lib.format.open_memmap(os.path.join(work_dir, 'ids.npy'), mode='w+', dtype=np.int32, shape=(n, k)).flush()
+    np.lib.format.open_memmap(os.path.join(work_dir, 'scores.npy'), mode='w+', dtype=np.float16, shape=(n, k)).flush()
+
+    if method == 'ann':
+        IVFIndex.build(open_vectors(os.path.join(work_dir, 'vectors.npy')), os.path.join(work_dir, 'ivf'))
+        worker_fn = _score_chunk_ann
+    else:
+        worker_fn = _score_chunk_exact
+
+    chunks = [(work_dir, start, min(start + CHUNK_ROWS, n), k, rating_weight)
+              for start in range(0, n, CHUNK_ROWS)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for _ in pool.map(worker_fn, chunks):
+            pass
+
+    meta = {
+        'kind': kind,
+        'k': int(k),
+        'n_items': int(n),
+        'dataset_version': df.attrs.get('dataset_version'),
+        'rating_weight': rating_weight,
+        'method': method,
+        'built_at': int(time.time()),
+    }
+    with open(os.path.join(work_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+def _swap_in(staging, out_dir):
+    """Make the finished ``staging`` build the current table of ``out_dir``.
+
+    ``out_dir/current.json`` is replaced in one step, so readers see either
+    the previous build or the new one, never a missing table. The previous
+    build stays on disk (for readers that resolved the pointer just before
+    the swap); older builds are deleted.
+
+    Returns:
+        Directory of the new build
+    """
+    previous = current_table_dir(out_dir)
+    build = os.path.basename(staging).lstrip('.')
+    table_dir = os.path.join(out_dir, build)
+    os.replace(staging, table_dir)
+
+    pointer = os.path.join(out_dir, '.current.json.tmp')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        json.dump({'build': build}, f)
+    os.replace(pointer, os.path.join(out_dir, 'current.json'))
+
+    if previous == out_dir:
+        # A table from before current.json: its files are the previous build, left for the next one to delete
+        return table_dir
+    keep = {build, 'current.json'}
+    if previous is not None:
+        keep.add(os.path.basename(previous))
+    for entry in os.scandir(out_dir):
+        # Dot-entries are builds still being written by other processes
+        if entry.name in keep or entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            os.remove(entry.path)
+    return table_dir
+
+
+def build_neighbour_table(df, kind, out_dir, k=DEFAULT_K, rating_weight=DEFAULT_RATING_WEIGHT,
+                          workers=None, method='auto'):
+    """Compute the top-K neighbour table for a preprocessed catalog.
+
+    Args:
+        df: Preprocessed catalog DataFrame (row positions index the table)
+        kind: 'books', 'courses' or 'movies'
+        out_dir: Output directory (each build goes into a subdirectory)
+        k: Neighbours per item
+        rating_weight: Weight of the candidate's rating vs. text similarity
+        workers: Worker processes (defaults to all cores)
+        method: 'exact', 'ann' or 'auto' (exact up to EXACT_MAX_ITEMS rows)
+
+    Returns:
+        The NeighbourTable opened from ``out_dir``
+    """
+    n = len(df)
+    if n < 2:
+        raise ValueError("Need at least two items to compute neighbours")
+    k = min(k, n - 1)
+    if method == 'auto':
+        method = 'exact' if n <= EXACT_MAX_ITEMS else 'ann'
+
+    # Build in a staging directory, then point current.json at it in one step
+    os.makedirs(out_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f'.{time.strftime("%Y%m%d-%H%M%S")}-', dir=out_dir)
+    try:
+        _build_into(staging, df, kind, n, k, rating_weight, workers, method)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return NeighbourTable.load(_swap_in(staging, out_dir))
+
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+class NeighbourTable:
+    """Read-only, memory-mapped top-K neighbour table indexed by row position."""
+
+    def __init__(self, ids, scores, meta):
+        self.ids = ids
+        self.scores = scores
+        self.meta = meta
+
+    @classmethod
+    def load(cls, path):
+        """Open a table directory written by build_neighbour_table."""
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(
+            ids=np.load(os.path.join(path, 'ids.npy'), mmap_mode='r'),
+            scores=np.load(os.path.join(path, 'scores.npy'), mmap_mode='r'),
+            meta=meta,
+        )
+
+    def matches(self, dataset_version, n_items):
+        """True if the table was built from exactly this dataset."""
+        return self.meta.get('dataset_version') == dataset_version and self.meta.get('n_items') == n_items
+
+    def neighbours(self, position, k=None):
+        """Return (row_positions, scores) of the item's neighbours, best first."""
+        ids = self.ids[position, :k]
+        valid = ids >= 0
+        return np.asarray(ids[valid]), np.asarray(self.scores[position, :k][valid])
+
+
+def load_neighbour_table(kind, dataset_version, n_items, path=None):
+    """Open the current table for a catalog, or None if missing or built from other data."""
+    path = current_table_dir(path or default_table_dir(kind))
+    if path is None or not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    table = NeighbourTable.load(path)
+    return table if table.matches(dataset_version, n_items) else None
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    """Build a neighbour table from the command line."""
+    parser = argparse.ArgumentParser(description="Precompute 'more like this' neighbour tables.")
+    parser.add_argument('kind', choices=sorted(CATALOGS), help="Catalog to process")
+    parser.add_argument('--csv', default=None, help="Catalog CSV (defaults to the bundled file)")
+    parser.add_argument('--out', default=None, help="Output directory")
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help="Neighbours per item")
+    parser.add_argument('--rating-weight', type=float, default=DEFAULT_RATING_WEIGHT)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--method', choices=['auto', 'exact', 'ann'], default='auto')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    df = load_catalog(args.kind, file_path=args.csv)
+    table = build_neighbour_table(
+        df, args.kind, args.out or default_table_dir(args.kind),
+        k=args.k, rating_weight=args.rating_weight, workers=args.workers, method=args.method,
+    )
+    print(f"✅ {args.kind}: {table.meta['n_items']:,} items × {table.meta['k']} neighbours "
+          f"({table.meta['method']}) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
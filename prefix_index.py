@@ -0,0 +1,142 @@
+"""
+Prefix Index for Search-as-You-Type Autocomplete
+================================================
+
+Normalised titles are sorted once at load time. A prefix maps to a contiguous
+range of that sorted array (two ``bisect`` calls), and a max-segment tree over
+the ratings in sorted order returns the best-rated entries of any range in
+O(k log N) without scanning it. Even a one-letter prefix on a multi-million
+row catalog therefore answers in well under a millisecond.
+
+The tree and ratings are stored in ``array`` buffers: compact like numpy, but
+cheap to index one element at a time from Python.
+"""
+
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+# Sorts after any character that can appear in a normalised title
+_PREFIX_END = '\U0010ffff'
+
+
+def normalize_title(text):
+    """Lowercase and collapse whitespace so prefixes match regardless of spacing."""
+    if not isinstance(text, str):
+        return ''
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+class PrefixIndex:
+    """Sorted-array prefix index ranked by rating.
+
+    Attributes:
+        keys: Normalised titles in sorted order
+        positions: Row position (in the source DataFrame) of each sorted key
+    """
+
+    def __init__(self, titles, ratings):
+        """Build the index.
+
+        Args:
+            titles: Sequence of titles, one per DataFrame row
+            ratings: Sequence of numeric ratings aligned with ``titles``
+        """
+        keys = np.array([normalize_title(t) for t in titles], dtype=object)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order].tolist()
+        self.positions = array('i', order.astype(np.int32).tobytes())
+
+        n = len(self.keys)
+        size = 1
+        while size < max(n, 1):
+            size *= 2
+        self._size = size
+
+        values = np.full(size, -np.inf)
+        values[:n] = np.asarray(ratings, dtype=np.float64)[order]
+        values = np.nan_to_num(values, nan=-np.inf)
+
+        # tree[size + i] = i for the leaves, inner nodes hold the argmax of their children
+        tree = np.zeros(2 * size, dtype=np.int32)
+        tree[size:] = np.arange(size, dtype=np.int32)
+        level = size // 2
+        while level >= 1:
+            nodes = np.arange(level, 2 * level)
+            left, right = tree[2 * nodes], tree[2 * nodes + 1]
+            tree[nodes] = np.where(values[left] >= values[right], left, right)
+            level //= 2
+
+        self._tree = array('i', tree.tobytes())
+        self._values = array('d', values.tobytes())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_range(self, prefix):
+        """Half-open range [lo, hi) of sorted keys starting with ``prefix``."""
+        prefix = normalize_title(prefix)
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _PREFIX_END, lo)
+        return lo, hi
+
+    def _range_argmax(self, lo, hi):
+        """Sorted index of the highest rating in [lo, hi)."""
+        tree, values = self._tree, self._values
+        best = -1
+        lo += self._size
+        hi += self._size
+        while lo < hi:
+            if lo & 1:
+                cand = tree[lo]
+                if best < 0 or values[cand] > values[best] or (values[cand] == values[best] and cand < best):
+                    best = cand
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                cand = tree[hi]
+                if best < 0 or values[cand] > values[best] or (values[cand] == values[best] and cand < best):
+                    best = cand
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def suggest(self, prefix, k=8):
+        """Row positions of the k best-rated titles starting with ``prefix``.
+
+        Args:
+            prefix: Text typed so far
+            k: Maximum number of suggestions
+
+        Returns:
+            List of DataFrame row positions, best rating first
+        """
+        if not normalize_title(prefix):
+            return []
+        lo, hi = self.prefix_range(prefix)
+        if lo >= hi:
+            return []
+
+        # Best-first expansion: pop the range maximum, split the range around it
+        first = self._range_argmax(lo, hi)
+        heap = [(-self._values[first], first, lo, hi)]
+        results = []
+        while heap and len(results) < k:
+            _, best, start, end = heapq.heappop(heap)
+            results.append(self.positions[best])
+            for sub_lo, sub_hi in ((start, best), (best + 1, end)):
+                if sub_lo < sub_hi:
+                    cand = self._range_argmax(sub_lo, sub_hi)
+                    heapq.heappush(heap, (-self._values[cand], cand, sub_lo, sub_hi))
+        return results
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the index arrays (excluding the key strings)."""
+        return (self.positions.itemsize * len(self.positions)
+                + self._tree.itemsize * len(self._tree)
+                + self._values.itemsize * len(self._values))
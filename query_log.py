@@ -0,0 +1,146 @@
+"""
+Sampled Query Log
+=================
+
+Writes a sample of the searches the app runs to a size-rotated JSON Lines
+file, one object per search:
+
+    {"ts": 1760000000.123, "kind": "books", "params": ["dune", "", ""],
+     "ranges": [["average_rating", 4.2, null]], "top_n": 5,
+     "max_results": 1000, "dataset_version": "3f2a...",
+     "stages_ms": [12.4, 180.9], "latency_ms": 193.6, "total": 41,
+     "results": [812, 77, 1530, 6, 90], "degraded": false, "shared": false}
+
+``stages_ms`` holds the time at which each stage's ranking was ready (the
+substring stage, then the fuzzy stage when it ran), measured from the start
+of the computation; it is null for a search that shared another caller's
+computation or was answered by the startup warm-up (both logged as
+``"shared": true``). ``results`` are the row positions of the first page, so a
+replay of the log (replay.py) can check that another engine build returns
+the same results for the same dataset version.
+
+Enabled by setting ``RECOMMENDER_QUERY_LOG`` to the log's path; the sampled
+fraction is ``RECOMMENDER_QUERY_LOG_SAMPLE`` (default 0.1). The file is
+rotated at ``RECOMMENDER_QUERY_LOG_MB`` (default 64) keeping
+``RECOMMENDER_QUERY_LOG_BACKUPS`` old files (default 5).
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from metrics import REGISTRY
+
+QUERY_LOG_PATH = os.environ.get('RECOMMENDER_QUERY_LOG', '')
+QUERY_LOG_SAMPLE = float(os.environ.get('RECOMMENDER_QUERY_LOG_SAMPLE', 0.1))
+QUERY_LOG_BYTES = int(float(os.environ.get('RECOMMENDER_QUERY_LOG_MB', '64')) * 1024 * 1024)
+QUERY_LOG_BACKUPS = int(os.environ.get('RECOMMENDER_QUERY_LOG_BACKUPS', 5))
+
+
+class QueryLog:
+    """Sampled, size-rotated JSONL log of searches.
+
+    Args:
+        path: Log file path (rotated files get ``.1``, ``.2``, ... suffixes)
+        sample_rate: Fraction of searches recorded (0 to 1)
+        max_bytes: Rotate the file once it reaches this size
+        backups: Rotated files kept
+        registry: MetricsRegistry receiving the ``query_log.records`` gauge
+    """
+
+    def __init__(self, path, sample_rate=QUERY_LOG_SAMPLE, max_bytes=QUERY_LOG_BYTES,
+                 backups=QUERY_LOG_BACKUPS, registry=REGISTRY):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.registry = registry
+        self.records = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # A private logger, so the app's logging configuration never sees these records
+        self._logger = logging.Logger(f'query_log:{path}')
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._logger.addHandler(handler)
+
+    def sampled(self):
+        """Decide whether the next search is recorded."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, kind, dataset_version, params, top_n, max_results, cursor, latency_ms,
+               stages_ms=None, shared=False, ranges=()):
+        """
+        Append one search to the log.
+
+        Args:
+            kind: 'books', 'courses' or 'movies'
+            dataset_version: Version id of the dataset searched
+            params: Normalized search parameters
+            top_n: Page size of the search
+            max_results: Cap on ranked positions (None for all)
+            cursor: The search's final SearchCursor
+            latency_ms: Wall time the caller waited
+            stages_ms: Times at which each stage finished, or None if shared
+            shared: True if the result came from another caller's computation
+            ranges: Normalized numeric range filters
+        """
+        entry = {
+            'ts': round(time.time(), 3),
+            'kind': kind,
+            'params': list(params),
+            'ranges': [list(r) for r in ranges],
+            'top_n': top_n,
+            'max_results': max_results,
+            'dataset_version': dataset_version,
+            'stages_ms': None if stages_ms is None else [round(ms, 2) for ms in stages_ms],
+            'latency_ms': round(latency_ms, 2),
+            'total': int(cursor.total),
+            'results': cursor.positions[:top_n].tolist(),
+            'degraded': bool(cursor.degraded),
+            'shared': shared,
+        }
+        self._logger.info(json.dumps(entry, separators=(',', ':')))
+        with self._lock:
+            self.records += 1
+            records = self.records
+        self.registry.set_gauge('query_log.records', records)
+
+    def close(self):
+        for handler in self._logger.handlers:
+            handler.close()
+
+
+def log_files(path):
+    """A log and its rotated files, oldest first."""
+    rotated = []
+    index = 1
+    while os.path.exists(f'{path}.{index}'):
+        rotated.append(f'{path}.{index}')
+        index += 1
+    return rotated[::-1] + ([path] if os.path.exists(path) else [])
+
+
+def read_log(paths):
+    """
+    Entries of one or more query logs, in file order.
+
+    Blank lines and lines that are not valid JSON (e.g. cut short by a crash)
+    are skipped.
+
+    Yields:
+        Dict per logged search
+    """
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
@@ -0,0 +1,236 @@
+"""
+Query Log Replay
+================
+
+Replays a captured query log (see query_log.py) against the search engine
+in this checkout, so two engine builds can be compared on real traffic:
+
+- Entries are issued in log order on a fixed schedule (``--rate`` searches
+  per second, or back to back), by ``--concurrency`` workers. Searches run
+  to completion, without the app's deadline.
+- Each search's first page and match count are compared with the ones
+  logged. Results are only comparable for the same dataset version, so
+  entries logged against another version are replayed for timing only.
+- The report gives latency and per-stage timing percentiles per catalog,
+  next to the logged latencies, and lists the searches whose results differ
+  (``reordered``: same rows in another order; ``different``: other rows or
+  another match count).
+
+``--record`` writes the replay's own results as a query log, so a replay on
+one build can serve as the baseline for a replay on another.
+
+Usage:
+    python replay.py queries.jsonl --rate 20 --report replay.json
+    python replay.py queries.jsonl --record baseline.jsonl      # on build A
+    python replay.py baseline.jsonl --shards 4                  # on build B
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import _percentile
+from query_log import QueryLog, log_files, read_log
+
+
+class _Recorder:
+    """Query-log stand-in that keeps every search's timings (and optionally writes them to a log)."""
+
+    def __init__(self, log=None):
+        self.log = log
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def sampled(self):
+        return True
+
+    def record(self, kind, dataset_version, params, top_n, max_results, cursor, latency_ms,
+               stages_ms=None, shared=False, ranges=()):
+        with self._lock:
+            self.entries[threading.get_ident()] = (cursor, latency_ms, stages_ms)
+        if self.log is not None:
+            self.log.record(kind, dataset_version, params, top_n, max_results, cursor, latency_ms,
+                            stages_ms, shared, ranges)
+
+    def take(self):
+        with self._lock:
+            return self.entries.pop(threading.get_ident())
+
+
+# ============================================================================
+# CATALOGS
+# ============================================================================
+
+def load_catalogs(kinds, n_shards=1, executor=None):
+    """
+    Load each catalog the way the app does (bundle first, then CSV).
+
+    Returns:
+        Dict kind -> (DataFrame, ShardedCatalog or None, range indexes)
+    """
+    import bundle
+    import datasets
+    import range_index
+    import sharding
+    from frozen_frame import freeze
+
+    catalogs = {}
+    for kind in kinds:
+        try:
+            df = bundle.load_bundled_dataset(kind)
+        except bundle.BundleError:
+            df = datasets.load_catalog(kind)
+        df = freeze(df)
+        catalogs[kind] = (df, sharding.build_sharded_catalog(kind, df, n_shards, executor),
+                          range_index.build_range_indexes(kind, df))
+    return catalogs
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def compare(entry, cursor):
+    """'same', 'reordered' or 'different': the replayed first page and count against the logged ones."""
+    results = cursor.positions[:entry['top_n']].tolist()
+    if results == entry['results'] and cursor.total == entry['total']:
+        return 'same'
+    if sorted(results) == sorted(entry['results']) and cursor.total == entry['total']:
+        return 'reordered'
+    return 'different'
+
+
+def replay(entries, catalogs, rate=None, concurrency=1, recorder=None):
+    """
+    Replay log entries against the loaded catalogs.
+
+    Args:
+        entries: Logged searches, in the order they are issued
+        catalogs: Output of load_catalogs
+        rate: Searches issued per second (None issues them back to back)
+        concurrency: Searches run at once
+        recorder: _Recorder receiving the replayed searches
+
+    Returns:
+        List of (entry, outcome) pairs in log order; outcome is a dict with
+        ``latency_ms``, ``stages_ms`` and ``diff`` (None when the dataset
+        version differs from the logged one)
+    """
+    import search_engine
+
+    recorder = recorder or _Recorder()
+    start = time.perf_counter()
+
+    def run(item):
+        index, entry = item
+        if rate:
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        df, shards, ranges_index = catalogs[entry['kind']]
+        search_engine.search(entry['kind'], df, entry['params'], top_n=entry['top_n'],
+                             max_results=entry['max_results'], shards=shards, query_log=recorder,
+                             ranges=entry.get('ranges'), range_index=ranges_index)
+        cursor, latency_ms, stages_ms = recorder.take()
+        comparable = entry['dataset_version'] == df.attrs.get('dataset_version')
+        return entry, {'latency_ms': latency_ms, 'stages_ms': stages_ms,
+                       'diff': compare(entry, cursor) if comparable else None}
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='replay') as pool:
+        return list(pool.map(run, enumerate(entries)))
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def _percentiles(values):
+    ordered = sorted(values)
+    return {'count': len(ordered), 'p50': _percentile(ordered, 50), 'p95': _percentile(ordered, 95),
+            'p99': _percentile(ordered, 99), 'max': ordered[-1] if ordered else None}
+
+
+def summarize(results, elapsed_s, max_diffs=20):
+    latencies = defaultdict(list)
+    diffs = defaultdict(int)
+    examples = []
+    for entry, outcome in results:
+        kind = entry['kind']
+        latencies[f'{kind}:replay'].append(outcome['latency_ms'])
+        latencies[f'{kind}:logged'].append(entry['latency_ms'])
+        for stage, ms in enumerate(outcome['stages_ms'] or [], 1):
+            latencies[f'{kind}:stage{stage}'].append(ms)
+        diffs[outcome['diff'] or 'other_version'] += 1
+        if outcome['diff'] in ('reordered', 'different') and len(examples) < max_diffs:
+            examples.append({'kind': kind, 'params': entry['params'], 'ranges': entry.get('ranges'),
+                             'diff': outcome['diff'],
+                             'logged_total': entry['total'], 'logged_results': entry['results'],
+                             'logged_degraded': entry['degraded']})
+    return {
+        'searches': len(results),
+        'elapsed_s': round(elapsed_s, 2),
+        'latency_ms': {name: _percentiles(values) for name, values in sorted(latencies.items())},
+        'diffs': dict(diffs),
+        'diff_examples': examples,
+    }
+
+
+def print_report(report, out=sys.stdout):
+    diffs = report['diffs']
+    print(f"\n{report['searches']} searches replayed in {report['elapsed_s']}s · "
+          f"{diffs.get('same', 0)} same, {diffs.get('reordered', 0)} reordered, "
+          f"{diffs.get('different', 0)} different, {diffs.get('other_version', 0)} other dataset version",
+          file=out)
+    print(f"{'timing':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=out)
+    for name, stats in report['latency_ms'].items():
+        row = [f"{stats[q]:,.1f}" if stats[q] is not None else '-' for q in ('p50', 'p95', 'p99', 'max')]
+        print(f"{name:<22}{stats['count']:>7}" + ''.join(f"{value:>10}" for value in row), file=out)
+    for example in report['diff_examples'][:10]:
+        note = " (logged result was degraded)" if example['logged_degraded'] else ""
+        print(f"⚠️  {example['diff']}: {example['kind']} {example['params']}{note}", file=out)
+
+
+# ============================================================================
+# COMMAND-LINE INTERFACE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a query log against this engine build")
+    parser.add_argument('logs', nargs='+', help="Query log path(s); rotated files of each are included")
+    parser.add_argument('--rate', type=float, help="Searches issued per second (default: back to back)")
+    parser.add_argument('--concurrency', type=int, default=1, help="Searches run at once (default: 1)")
+    parser.add_argument('--limit', type=int, help="Replay only the first N entries")
+    parser.add_argument('--kind', choices=['books', 'courses', 'movies'], help="Replay one catalog only")
+    parser.add_argument('--shards', type=int, default=1, help="Shard catalogs K ways (see sharding.py)")
+    parser.add_argument('--record', help="Write the replayed results as a query log to this path")
+    parser.add_argument('--report', help="Also write the report as JSON to this path")
+    parser.add_argument('--max-diffs', type=int, default=20, help="Differing searches listed in the report")
+    args = parser.parse_args(argv)
+
+    paths = [path for log in args.logs for path in (log_files(log) or [log])]
+    entries = [entry for entry in read_log(paths) if args.kind in (None, entry['kind'])]
+    entries = entries[:args.limit] if args.limit else entries
+
+    with ThreadPoolExecutor(thread_name_prefix='replay-shard') as shard_pool:
+        catalogs = load_catalogs(sorted({entry['kind'] for entry in entries}), args.shards, shard_pool)
+        log = QueryLog(args.record, sample_rate=1) if args.record else None
+        start = time.perf_counter()
+        results = replay(entries, catalogs, args.rate, args.concurrency, _Recorder(log))
+        elapsed = time.perf_counter() - start
+        if log is not None:
+            log.close()
+
+    report = summarize(results, elapsed, args.max_diffs)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report['diffs'].get('different') else 0)
+
+
+if __name__ == '__main__':
+    main()
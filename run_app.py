@@ -1,6 +1,9 @@
 """
 Quick Launch Script for Smart Recommender System
 Run this script to automatically check setup and launch the app.
+
+    python run_app.py           # check setup and launch
+    python run_app.py build     # compile CSVs into warm-start bundles
 """
 
 import subprocess
@@ -79,10 +82,36 @@ def run_app():
         print("Try running directly: python -m streamlit run app.py")
 
 
+def build_bundles(kinds):
+    """Compile the catalog CSVs into warm-start bundles (see bundle.py)."""
+    print("\n🏗️  Building warm-start bundles...")
+    try:
+        from bundle import BUNDLE_DIR, CATALOGS, build_all
+    except ImportError as e:
+        print(f"❌ Missing dependency: {e}")
+        print("Please run: pip install -r requirements.txt")
+        return 1
+    unknown = [kind for kind in kinds if kind not in CATALOGS]
+    if unknown:
+        print(f"❌ Unknown catalog(s): {', '.join(unknown)}")
+        print(f"Choose from: {', '.join(CATALOGS)}")
+        return 2
+    failures = build_all(kinds or None)
+    if failures:
+        print(f"\n❌ {failures} bundle(s) failed to build.")
+        return 1
+    print(f"\n✅ Bundles written to {BUNDLE_DIR}/ — the app loads them at startup.")
+    return 0
+
+
 def main():
     """Main launcher function."""
     print_banner()
     
+    # `python run_app.py build [books courses movies]` compiles bundles and exits
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        sys.exit(build_bundles(sys.argv[2:]))
+    
     # Check if app.py exists
     if not check_app_file():
         input("\nPress Enter to exit...")
@@ -0,0 +1,650 @@
+"""
+Search Engine - Ranking & Cursors
+=================================
+
+Substring + fuzzy matching for the three catalogs. Each search ranks *all*
+matching rows once (up to ``MAX_RESULTS``) and keeps only their int32 row
+positions in a ``SearchCursor``. Any page of the result set is then an array
+slice plus ``df.iloc``, so paging never re-runs the substring or fuzzy stages.
+
+The recommend_* functions keep their original contract (a DataFrame of the
+top ``top_n`` rows) and return the cursor instead when ``as_cursor=True``.
+The iter_* generators behind them yield a ranking per stage: the cheap
+substring matches first, then (when they are too few) the ranking with
+fuzzy matches added, so the UI can show cards before the fuzzy stage ends.
+``search`` is the app's entry point: it normalizes the query parameters and
+can coalesce identical concurrent searches through a ``SingleFlight``.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+# Upper bound on ranked positions kept per query (browsable depth)
+MAX_RESULTS = 1000
+# Minimum RapidFuzz ratio for a fuzzy title match
+FUZZY_THRESHOLD = 60
+# Titles scored per fuzzy block when a deadline applies (checked between blocks)
+FUZZY_BLOCK_ROWS = 50_000
+
+
+class SearchCursor:
+    """Ranked row positions of one query over one dataset version.
+
+    Attributes:
+        kind: 'books', 'courses' or 'movies'
+        dataset_version: Version id of the dataset the positions refer to
+        positions: int32 array of row positions, best first
+        total: Number of matching rows before the ``MAX_RESULTS`` cap
+        degraded: True if the fuzzy stage was skipped or cut short by a deadline
+        partial: True if a later search stage will replace this ranking
+    """
+
+    __slots__ = ('kind', 'dataset_version', 'positions', 'total', 'degraded', 'partial')
+
+    def __init__(self, kind, dataset_version, positions, total=None, degraded=False, partial=False):
+        self.kind = kind
+        self.dataset_version = dataset_version
+        self.positions = np.asarray(positions, dtype=np.int32)
+        # Positions may be shared between sessions (see search), so never edit them in place
+        self.positions.flags.writeable = False
+        self.total = len(self.positions) if total is None else total
+        self.degraded = degraded
+        self.partial = partial
+
+    def __len__(self):
+        return len(self.positions)
+
+    def matches(self, df):
+        """True if the cursor was produced from this dataset."""
+        return df is not None and df.attrs.get('dataset_version') == self.dataset_version
+
+    def slice(self, df, start, stop):
+        """Rows ranked [start, stop) as a DataFrame."""
+        return df.iloc[self.positions[start:stop]]
+
+    def page(self, df, page, page_size):
+        """Rows of the zero-based page ``page``."""
+        start = page * page_size
+        return self.slice(df, start, start + page_size)
+
+    def n_pages(self, page_size):
+        return -(-len(self.positions) // page_size)
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes
+
+    def truncate(self, n_rows):
+        """Keep only the best ``n_rows`` positions (``total`` is unchanged)."""
+        self.positions = self.positions[:max(n_rows, 0)].copy()
+        self.positions.flags.writeable = False
+
+    def copy(self):
+        """A cursor of its own over the same (read-only) positions."""
+        return SearchCursor(self.kind, self.dataset_version, self.positions, self.total, self.degraded,
+                            self.partial)
+
+
+class UnifiedCursor:
+    """Merged ranking across catalogs, best first.
+
+    Each ranked row is a (catalog code, row position, score) triple held in
+    compact arrays; titles and ratings are read back from the shared datasets
+    when the ranking is rendered.
+
+    Attributes:
+        kinds: Catalog names indexed by ``catalogs`` codes
+        dataset_versions: Dict mapping each catalog to the dataset version searched
+        catalogs: int8 array of catalog codes
+        positions: int32 array of row positions in each row's catalog
+        scores: float32 array of merged scores
+        degraded: True if a catalog's search was cut short or skipped
+    """
+
+    __slots__ = ('kinds', 'dataset_versions', 'catalogs', 'positions', 'scores', 'degraded')
+
+    def __init__(self, kinds, dataset_versions, catalogs, positions, scores, degraded=False):
+        self.kinds = tuple(kinds)
+        self.dataset_versions = dict(dataset_versions)
+        self.catalogs = np.asarray(catalogs, dtype=np.int8)
+        self.positions = np.asarray(positions, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.degraded = degraded
+
+    def __len__(self):
+        return len(self.positions)
+
+    def matches(self, dataframes):
+        """True if every catalog in the ranking still has the dataset it was searched in."""
+        return all(dataframes.get(kind) is not None
+                   and dataframes[kind].attrs.get('dataset_version') == version
+                   for kind, version in self.dataset_versions.items())
+
+    def ranks(self, kind):
+        """Ranks (indices into this cursor) of the rows from catalog ``kind``."""
+        return np.flatnonzero(self.catalogs == self.kinds.index(kind))
+
+    @property
+    def nbytes(self):
+        return self.catalogs.nbytes + self.positions.nbytes + self.scores.nbytes
+
+    def truncate(self, n_rows):
+        """Keep only the best ``n_rows`` rows."""
+        n_rows = max(n_rows, 0)
+        self.catalogs = self.catalogs[:n_rows].copy()
+        self.positions = self.positions[:n_rows].copy()
+        self.scores = self.scores[:n_rows].copy()
+
+
+# ============================================================================
+# SHARED STAGES
+# ============================================================================
+
+def _contains(df, column, text, positions=None):
+    """Boolean mask of rows (optionally only ``positions``) whose column contains text."""
+    series = df[column] if positions is None else df[column].iloc[positions]
+    return series.str.contains(text, na=False, regex=False).to_numpy()
+
+
+def _fuzzy_positions(df, column, query, top_n, deadline=None, positions=None):
+    """
+    Row positions of the best fuzzy title matches above FUZZY_THRESHOLD.
+
+    Without a deadline all titles are scored in one call. With one, titles
+    are scored in FUZZY_BLOCK_ROWS blocks and scoring stops at the deadline.
+    With ``positions`` (ascending), only those rows are scored.
+
+    Returns:
+        Tuple (positions, complete): complete is False if scoring was cut short
+    """
+    from rapidfuzz import fuzz, process
+
+    if positions is not None:
+        matches, complete = _fuzzy_positions(df[[column]].iloc[positions], column, query, top_n, deadline)
+        return [int(positions[index]) for index in matches], complete
+
+    titles = df[column].tolist()
+    limit = top_n * 2
+    if deadline is None:
+        matches = process.extract(query, titles, scorer=fuzz.ratio, limit=limit)
+        return [index for _, score, index in matches if score > FUZZY_THRESHOLD], True
+
+    best = []
+    scored = 0
+    while scored < len(titles) and time.monotonic() < deadline:
+        block = process.extract(query, titles[scored:scored + FUZZY_BLOCK_ROWS], scorer=fuzz.ratio, limit=limit)
+        best.extend((score, scored + index) for _, score, index in block)
+        scored += FUZZY_BLOCK_ROWS
+    # Same order as a single extract: score descending, then row order
+    best.sort(key=lambda match: (-match[0], match[1]))
+    return [index for score, index in best[:limit] if score > FUZZY_THRESHOLD], scored >= len(titles)
+
+
+def _title_stages(df, query, top_n, substring_columns, fuzzy_column, deadline=None, shards=None, positions=None):
+    """
+    Title candidates stage by stage: substring matches in row order, then,
+    when there are few, the same matches followed by fuzzy matches.
+
+    With ``shards`` (a sharding.ShardedCatalog of ``df``) both stages fan
+    out across the shards. With ``positions`` (ascending, e.g. the rows
+    within a search's numeric ranges) only those rows are scanned, and
+    whether the fuzzy stage runs depends on the matches among them.
+
+    Yields:
+        Tuples (candidates, degraded, partial): degraded is True if the
+        deadline skipped or truncated the fuzzy stage, partial is True if
+        another stage follows
+    """
+    query_lower = query.lower()
+    if shards is None:
+        mask = np.zeros(len(df) if positions is None else len(positions), dtype=bool)
+        for column in substring_columns:
+            mask |= _contains(df, column, query_lower, positions)
+        candidates = np.flatnonzero(mask) if positions is None else positions[mask]
+    else:
+        candidates = shards.contains(substring_columns, query_lower, positions)
+
+    # If few results, add fuzzy matching (unless the deadline has already passed)
+    if len(candidates) >= top_n:
+        yield candidates, False, False
+        return
+    if deadline is not None and time.monotonic() >= deadline:
+        yield candidates, True, False
+        return
+    yield candidates, False, True
+    if shards is None:
+        fuzzy, complete = _fuzzy_positions(df, fuzzy_column, query, top_n, deadline, positions)
+    else:
+        fuzzy, complete = shards.fuzzy_positions(fuzzy_column, query, top_n * 2, deadline, positions)
+    combined = np.concatenate([candidates, np.asarray(fuzzy, dtype=np.int64)])
+    _, first = np.unique(combined, return_index=True)
+    yield combined[np.sort(first)], not complete, False
+
+
+def _filter(df, candidates, columns, text, shards=None):
+    """Keep candidates whose value in any of ``columns`` contains text."""
+    text_lower = text.lower()
+    # Filtering every row is a full scan: fan it out when sharded
+    if shards is not None and len(candidates) == len(df):
+        return shards.contains(columns, text_lower)
+    mask = np.zeros(len(candidates), dtype=bool)
+    for column in columns:
+        mask |= _contains(df, column, text_lower, candidates)
+    return candidates[mask]
+
+
+def _rank_by(df, candidates, *columns):
+    """Stable sort of candidates by the given columns, all descending."""
+    keys = [-df[column].to_numpy()[candidates] for column in reversed(columns)]
+    return candidates[np.lexsort(keys)]
+
+
+def _cursor(kind, df, positions, max_results, degraded=False, partial=False):
+    return SearchCursor(kind, df.attrs.get('dataset_version'), positions[:max_results], len(positions), degraded,
+                        partial)
+
+
+def _all_rows(df, allowed=None):
+    """A single stage whose candidates are every row, or every row within the ranges (no title query)."""
+    return [(np.arange(len(df)) if allowed is None else allowed, False, False)]
+
+
+def normalize_ranges(ranges):
+    """
+    Canonical form of a search's numeric range filters.
+
+    Args:
+        ranges: ``{column: (low, high)}`` or an iterable of ``(column, low, high)``;
+            bounds are inclusive and None leaves that end open
+
+    Returns:
+        Tuple of ``(column, low, high)`` sorted by column, with float bounds,
+        leaving out ranges open at both ends
+    """
+    if not ranges:
+        return ()
+    items = [(column, *bounds) for column, bounds in ranges.items()] if isinstance(ranges, dict) else ranges
+    normalized = []
+    for column, low, high in items:
+        if low is None and high is None:
+            continue
+        normalized.append((column, None if low is None else float(low), None if high is None else float(high)))
+    return tuple(sorted(normalized))
+
+
+def _range_positions(df, ranges, index=None):
+    """
+    Ascending row positions of the rows within every range.
+
+    With ``index`` (column -> range_index.RangeIndex of ``df``) only the most
+    selective range is looked up, and the others are checked on its rows;
+    without it, every row is compared.
+    """
+    if index is None or any(column not in index for column, _, _ in ranges):
+        mask = np.ones(len(df), dtype=bool)
+        for column, low, high in ranges:
+            values = df[column].to_numpy()
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return np.flatnonzero(mask)
+
+    ranges = sorted(ranges, key=lambda r: index[r[0]].count(r[1], r[2]))
+    column, low, high = ranges[0]
+    positions = np.sort(index[column].lookup(low, high))
+    for column, low, high in ranges[1:]:
+        values = df[column].to_numpy()[positions]
+        keep = np.ones(len(positions), dtype=bool)
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values <= high
+        positions = positions[keep]
+    return positions
+
+
+def _last(stages):
+    """The final cursor of a stage generator."""
+    cursor = None
+    for cursor in stages:
+        pass
+    return cursor
+
+
+def _recommend(kind, stages, df, top_n, as_cursor):
+    """Run every stage of a search and return the recommend_* result."""
+    if df is None or df.empty:
+        return SearchCursor(kind, None, []) if as_cursor else pd.DataFrame()
+    cursor = _last(stages)
+    return cursor if as_cursor else cursor.page(df, 0, top_n)
+
+
+# ============================================================================
+# BOOKS
+# ============================================================================
+
+def iter_books(df, book_name='', genre='', publisher='', top_n=5, max_results=MAX_RESULTS,
+               deadline=None, shards=None, ranges=None, range_index=None):
+    """
+    Book rankings stage by stage (see recommend_books for the arguments).
+
+    Substring matches are ranked and yielded first; when the fuzzy stage
+    runs, the ranking including fuzzy matches follows.
+
+    Yields:
+        SearchCursor per stage; only the last has ``partial`` False
+    """
+    if df is None or df.empty:
+        yield SearchCursor('books', None, [])
+        return
+    if shards is not None and not shards.matches(df):
+        shards = None
+
+    ranges = normalize_ranges(ranges)
+    allowed = _range_positions(df, ranges, range_index) if ranges else None
+
+    if book_name:
+        # Substring matching on title and original_title, fuzzy fallback on title
+        # Numeric ranges first: they are index lookups and shrink what the title stages scan
+        stages = _title_stages(df, book_name, top_n, ['title_lower', 'original_title_lower'], 'title',
+                               deadline, shards, allowed)
+    else:
+        # If no title provided, start from everything (ranked by rating)
+        stages = _all_rows(df, allowed)
+
+    for candidates, degraded, partial in stages:
+        # Apply filters independently (AND logic: all specified filters must match)
+        # Filter by genre if provided (search in title as proxy for genre keywords)
+        if genre:
+            candidates = _filter(df, candidates, ['title_lower', 'original_title_lower'], genre, shards)
+
+        # Filter by publisher/author if provided
+        if publisher:
+            candidates = _filter(df, candidates, ['authors_lower'], publisher, shards)
+
+        yield _cursor('books', df, _rank_by(df, candidates, 'average_rating'), max_results, degraded, partial)
+
+
+def recommend_books(df, book_name='', genre='', publisher='', top_n=5,
+                    as_cursor=False, max_results=MAX_RESULTS, deadline=None, shards=None, ranges=None,
+                    range_index=None):
+    """
+    Recommend books based on title, genre, and publisher using substring and fuzzy matching.
+
+    Args:
+        df: Books DataFrame
+        book_name: Book title to search for
+        genre: Genre to filter by
+        publisher: Publisher/author to filter by
+        top_n: Number of recommendations to return (also the page size that
+            decides whether the fuzzy stage runs)
+        as_cursor: Return a SearchCursor over all ranked matches instead
+        max_results: Maximum number of ranked positions kept in the cursor (None keeps all)
+        deadline: ``time.monotonic()`` value by which the fuzzy stage must stop
+            (the cursor is then marked degraded)
+        shards: Optional sharding.ShardedCatalog of ``df`` to scatter the scans over
+        ranges: Numeric range filters, e.g. ``{'original_publication_year': (1990, 2000),
+            'average_rating': (4.2, None)}`` (inclusive; None leaves an end open)
+        range_index: Optional dict column -> range_index.RangeIndex of ``df``
+            answering the ranges without a full scan
+
+    Returns:
+        DataFrame of recommended books, or a SearchCursor if as_cursor
+    """
+    stages = iter_books(df, book_name, genre, publisher, top_n, max_results, deadline, shards, ranges,
+                        range_index)
+    return _recommend('books', stages, df, top_n, as_cursor)
+
+
+# ============================================================================
+# COURSES
+# ============================================================================
+
+def iter_courses(df, course_title='', difficulty='', top_n=5, max_results=MAX_RESULTS,
+                 deadline=None, shards=None, ranges=None, range_index=None):
+    """
+    Course rankings stage by stage (see recommend_courses and iter_books).
+
+    Yields:
+        SearchCursor per stage; only the last has ``partial`` False
+    """
+    if df is None or df.empty:
+        yield SearchCursor('courses', None, [])
+        return
+    if shards is not None and not shards.matches(df):
+        shards = None
+
+    ranges = normalize_ranges(ranges)
+
+    # If no inputs, rank by rating only
+    if not course_title and not difficulty and not ranges:
+        yield _cursor('courses', df, _rank_by(df, np.arange(len(df)), 'course_rating'), max_results)
+        return
+
+    allowed = _range_positions(df, ranges, range_index) if ranges else None
+    if course_title:
+        stages = _title_stages(df, course_title, top_n, ['course_title_lower'], 'course_title', deadline, shards,
+                               allowed)
+    else:
+        stages = _all_rows(df, allowed)
+
+    for candidates, degraded, partial in stages:
+        if difficulty:
+            candidates = _filter(df, candidates, ['course_difficulty_lower'], difficulty, shards)
+
+        # Sort by rating, then by enrolled students
+        ranked = _rank_by(df, candidates, 'course_rating', 'course_students_enrolled')
+        yield _cursor('courses', df, ranked, max_results, degraded, partial)
+
+
+def recommend_courses(df, course_title='', difficulty='', top_n=5,
+                      as_cursor=False, max_results=MAX_RESULTS, deadline=None, shards=None, ranges=None,
+                      range_index=None):
+    """
+    Recommend courses based on title and difficulty using substring and fuzzy matching.
+
+    Args:
+        df: Courses DataFrame
+        course_title: Course title to search for
+        difficulty: Difficulty level to filter by
+        top_n: Number of recommendations to return
+        as_cursor: Return a SearchCursor over all ranked matches instead
+        max_results: Maximum number of ranked positions kept in the cursor (None keeps all)
+        deadline: ``time.monotonic()`` value by which the fuzzy stage must stop
+        shards: Optional sharding.ShardedCatalog of ``df`` to scatter the scans over
+        ranges: Numeric range filters, e.g. ``{'course_students_enrolled': (100_000, None)}``
+        range_index: Optional dict column -> range_index.RangeIndex of ``df``
+
+    Returns:
+        DataFrame of recommended courses, or a SearchCursor if as_cursor
+    """
+    stages = iter_courses(df, course_title, difficulty, top_n, max_results, deadline, shards, ranges,
+                          range_index)
+    return _recommend('courses', stages, df, top_n, as_cursor)
+
+
+# ============================================================================
+# MOVIES
+# ============================================================================
+
+def iter_movies(df, movie_name='', genre='', top_n=8, max_results=MAX_RESULTS, deadline=None, shards=None,
+                ranges=None, range_index=None):
+    """
+    Movie rankings stage by stage (see recommend_movies and iter_books).
+
+    Yields:
+        SearchCursor per stage; only the last has ``partial`` False
+    """
+    if df is None or df.empty:
+        yield SearchCursor('movies', None, [])
+        return
+    if shards is not None and not shards.matches(df):
+        shards = None
+
+    ranges = normalize_ranges(ranges)
+    allowed = _range_positions(df, ranges, range_index) if ranges else None
+
+    if movie_name:
+        stages = _title_stages(df, movie_name, top_n, ['Title_lower'], 'Title', deadline, shards, allowed)
+    else:
+        stages = _all_rows(df, allowed)
+
+    for candidates, degraded, partial in stages:
+        if genre:
+            candidates = _filter(df, candidates, ['Genre_lower'], genre, shards)
+
+        # Sort by IMDB score
+        yield _cursor('movies', df, _rank_by(df, candidates, 'IMDB Score'), max_results, degraded, partial)
+
+
+def recommend_movies(df, movie_name='', genre='', top_n=8,
+                     as_cursor=False, max_results=MAX_RESULTS, deadline=None, shards=None, ranges=None,
+                     range_index=None):
+    """
+    Recommend movies based on title and genre using substring and fuzzy matching.
+
+    Args:
+        df: Movies DataFrame
+        movie_name: Movie title to search for
+        genre: Genre to filter by
+        top_n: Number of recommendations to return
+        as_cursor: Return a SearchCursor over all ranked matches instead
+        max_results: Maximum number of ranked positions kept in the cursor (None keeps all)
+        deadline: ``time.monotonic()`` value by which the fuzzy stage must stop
+        shards: Optional sharding.ShardedCatalog of ``df`` to scatter the scans over
+        ranges: Numeric range filters, e.g. ``{'IMDB Score': (8.0, None)}``
+        range_index: Optional dict column -> range_index.RangeIndex of ``df``
+
+    Returns:
+        DataFrame of recommended movies, or a SearchCursor if as_cursor
+    """
+    stages = iter_movies(df, movie_name, genre, top_n, max_results, deadline, shards, ranges, range_index)
+    return _recommend('movies', stages, df, top_n, as_cursor)
+
+
+# ============================================================================
+# ENTRY POINT & REQUEST COALESCING
+# ============================================================================
+
+RECOMMENDERS = {
+    'books': recommend_books,
+    'courses': recommend_courses,
+    'movies': recommend_movies,
+}
+
+STAGES = {
+    'books': iter_books,
+    'courses': iter_courses,
+    'movies': iter_movies,
+}
+
+
+def normalize_params(params):
+    """
+    Canonical form of a search's text parameters.
+
+    Whitespace is trimmed and collapsed everywhere. The filters (every
+    parameter after the title) are lowercased, as they are only ever matched
+    lowercased; the title keeps its case because the fuzzy stage is
+    case-sensitive.
+    """
+    normalized = [' '.join(str(value or '').split()) for value in params]
+    return tuple(normalized[:1] + [value.lower() for value in normalized[1:]])
+
+
+def search(kind, df, params, top_n=5, max_results=MAX_RESULTS, flights=None, pool=None, shards=None,
+           on_stage=None, poll=None, query_log=None, shadow=None, ranges=None, range_index=None, warm=None):
+    """
+    Run one catalog search and return its cursor.
+
+    With ``flights`` (a single_flight.SingleFlight), identical concurrent
+    searches, keyed by dataset version plus normalized parameters, share one
+    computation; every caller gets its own cursor over the shared positions.
+    With ``pool`` (a search_pool.SearchPool), the computation runs on the
+    pool under its deadline and may come back degraded. With ``shards`` (a
+    sharding.ShardedCatalog of ``df``), its scans are scattered over the shards.
+
+    ``on_stage`` receives each partial ranking as soon as it exists. It runs
+    on the thread computing the search (a pool worker), so a UI should only
+    queue it there and render it from ``poll``, which is called on the
+    calling thread while it waits. Callers sharing another caller's flight
+    only receive the final cursor; ``poll`` is never run inside a shared
+    computation, so an exception it raises (e.g. Streamlit stopping the
+    session) only ends this caller's wait. With ``query_log`` (a query_log.QueryLog),
+    sampled searches are recorded with their stage timings. With ``shadow`` (a
+    shadow.ShadowRunner), a sample of complete results is handed to a
+    candidate engine to compare against, without waiting for it. ``ranges``
+    restricts numeric columns, answered from ``range_index`` when given.
+    With ``warm`` (a warmup.WarmUp), searches it precomputed are answered
+    from it, and logged and shadowed like shared results.
+
+    Args:
+        kind: 'books', 'courses' or 'movies'
+        df: Catalog DataFrame
+        params: Positional text parameters of the recommend_* function
+        top_n: Page size (decides whether the fuzzy stage runs)
+        max_results: Maximum number of ranked positions kept (None keeps all)
+        flights: Optional SingleFlight used to coalesce concurrent searches
+        pool: Optional SearchPool to execute on
+        shards: Optional ShardedCatalog of ``df``
+        on_stage: Optional callable receiving each partial SearchCursor
+        poll: Optional callable run on the calling thread while the search runs
+        query_log: Optional QueryLog recording a sample of searches
+        shadow: Optional ShadowRunner comparing a candidate engine on a sample
+        ranges: Optional numeric range filters (see recommend_books)
+        range_index: Optional dict column -> range_index.RangeIndex of ``df``
+        warm: Optional WarmUp holding precomputed results
+
+    Returns:
+        SearchCursor
+
+    Raises:
+        search_pool.SearchRejected: If the pool sheds or abandons the search
+    """
+    params = normalize_params(params)
+    ranges = normalize_ranges(ranges)
+    log = query_log if query_log is not None and query_log.sampled() else None
+    stages_ms = []
+
+    def run(deadline=None, inline_poll=None):
+        cursor = None
+        started = time.perf_counter()
+        for cursor in STAGES[kind](df, *params, top_n=top_n, max_results=max_results,
+                                   deadline=deadline, shards=shards, ranges=ranges, range_index=range_index):
+            stages_ms.append((time.perf_counter() - started) * 1000)
+            if cursor.partial and on_stage is not None:
+                on_stage(cursor)
+                # Running inline and unshared: the caller is this thread
+                if inline_poll is not None:
+                    inline_poll()
+        return cursor
+
+    version = None if df is None else df.attrs.get('dataset_version')
+    started = time.perf_counter()
+    # Default and common-facet searches may have been ranked by the startup warm-up
+    cursor = warm.lookup(kind, df, params, max_results) if warm is not None and not ranges else None
+    if cursor is not None:
+        shared = True
+    elif flights is None or version is None:
+        cursor = run(inline_poll=poll) if pool is None else pool.run(run, poll=poll)
+        shared = False
+    else:
+        # The shared computation never runs a caller's poll: each caller polls while it waits
+        key = (kind, version, params, ranges, top_n, max_results)
+        if pool is None:
+            cursor, shared = flights.do(key, run, poll=poll)
+        else:
+            future, shared = flights.do_future(key, lambda: pool.submit(run))
+            cursor = pool.wait(future, poll=poll)
+        cursor = cursor.copy()
+    latency_ms = (time.perf_counter() - started) * 1000
+    if log is not None:
+        log.record(kind, version, params, top_n, max_results, cursor, latency_ms,
+                   None if shared else stages_ms, shared, ranges)
+    # Degraded results are cut short by the deadline, so they are not compared
+    if shadow is not None and df is not None and not cursor.degraded and shadow.sampled():
+        shadow.submit(kind, df, params, top_n, max_results, cursor, latency_ms, ranges)
+    return cursor
@@ -0,0 +1,171 @@
+"""
+Bounded Search Execution
+========================
+
+Searches run on a fixed-size worker pool instead of the Streamlit script
+threads, with a bounded number of admitted requests:
+
+- At most ``workers`` searches run at once; up to ``queue_size`` more wait.
+- A request arriving when every slot is taken is rejected immediately with
+  ``SearchRejected`` instead of queueing behind the backlog.
+- Every request carries a deadline (``deadline_ms`` from admission, so time
+  spent queued counts). The recommend_* functions check it before and during
+  the fuzzy stage and return a partial result marked ``degraded`` rather
+  than overrun it. A request that still has no result shortly after its
+  deadline is abandoned with ``SearchRejected``.
+
+Configured with ``RECOMMENDER_SEARCH_WORKERS``, ``RECOMMENDER_SEARCH_QUEUE``
+and ``RECOMMENDER_SEARCH_DEADLINE_MS``.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import REGISTRY
+
+SEARCH_WORKERS = int(os.environ.get('RECOMMENDER_SEARCH_WORKERS', min(8, os.cpu_count() or 2)))
+SEARCH_QUEUE = int(os.environ.get('RECOMMENDER_SEARCH_QUEUE', 16))
+SEARCH_DEADLINE_MS = float(os.environ.get('RECOMMENDER_SEARCH_DEADLINE_MS', 2000))
+# Extra time a caller waits past the deadline before giving up on a result
+ABANDON_GRACE_MS = 1000
+# How often a waiting caller's poll callback runs
+POLL_INTERVAL_S = 0.05
+
+
+class SearchRejected(RuntimeError):
+    """Raised when a search is shed (pool saturated) or abandoned past its deadline."""
+
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class SearchPool:
+    """Fixed worker pool with admission control and per-request deadlines.
+
+    Args:
+        workers: Searches executed concurrently
+        queue_size: Admitted searches allowed to wait for a worker
+        deadline_ms: Default per-request deadline
+        registry: MetricsRegistry receiving latencies and counts
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, queue_size=SEARCH_QUEUE, deadline_ms=SEARCH_DEADLINE_MS,
+                 registry=REGISTRY):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline_ms = deadline_ms
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.degraded = 0
+
+    def run(self, fn, deadline_ms=None, poll=None):
+        """
+        Run ``fn(deadline)`` on the pool and wait for its result.
+
+        Args:
+            fn: Callable taking the absolute deadline (a ``time.monotonic()`` value)
+            deadline_ms: Per-request deadline (defaults to the pool's)
+            poll: Optional callable run on the waiting thread every
+                POLL_INTERVAL_S until the result arrives (e.g. to render progress)
+
+        Returns:
+            Whatever ``fn`` returns (results with ``degraded`` set are counted)
+
+        Raises:
+            SearchRejected: If the pool is saturated or the result is abandoned
+        """
+        return self.wait(self.submit(fn, deadline_ms), poll)
+
+    def submit(self, fn, deadline_ms=None):
+        """
+        Admit ``fn(deadline)`` and start it on the pool without waiting.
+
+        Several callers may wait on the returned future (see wait); its
+        ``give_up`` attribute is the time after which they abandon it.
+
+        Returns:
+            concurrent.futures.Future of ``fn``'s result
+
+        Raises:
+            SearchRejected: If the pool is saturated
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise SearchRejected("too many searches are running; please retry in a moment")
+        deadline_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+        start = time.monotonic()
+        deadline = start + deadline_ms / 1000.0
+        with self._lock:
+            self._admitted += 1
+            self.registry.set_gauge('search.pool.admitted', self._admitted)
+        try:
+            future = self._executor.submit(fn, deadline)
+        except BaseException:
+            self._release()
+            raise
+        future.give_up = deadline + ABANDON_GRACE_MS / 1000.0
+        future.abandoned = False
+        future.add_done_callback(lambda done: self._finished(done, start))
+        return future
+
+    def wait(self, future, poll=None):
+        """
+        Wait for a future from submit, on the calling thread.
+
+        Args:
+            future: Future returned by submit
+            poll: Optional callable run on this thread every POLL_INTERVAL_S
+                until the result arrives (e.g. to render progress)
+
+        Returns:
+            The future's result
+
+        Raises:
+            SearchRejected: If no result arrives by the future's ``give_up`` time
+        """
+        while True:
+            wait = max(future.give_up - time.monotonic(), 0)
+            try:
+                return future.result(timeout=wait if poll is None else min(wait, POLL_INTERVAL_S))
+            except FutureTimeout:
+                if time.monotonic() < future.give_up:
+                    poll()
+                    continue
+            except CancelledError:
+                pass
+            future.abandoned = True
+            future.cancel()
+            self._count('rejected')
+            raise SearchRejected("the search did not finish in time; please retry") from None
+
+    def _finished(self, future, start):
+        self._release()
+        if future.cancelled() or future.abandoned or future.exception() is not None:
+            return
+        self.registry.observe('search.latency_ms', (time.monotonic() - start) * 1000)
+        self._count('degraded' if getattr(future.result(), 'degraded', False) else 'completed')
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+            self.registry.set_gauge('search.pool.admitted', self._admitted)
+        self._slots.release()
+
+    def _count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            value = getattr(self, outcome)
+        self.registry.set_gauge(f'search.pool.{outcome}', value)
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.workers, 'queue_size': self.queue_size, 'admitted': self._admitted,
+                    'completed': self.completed, 'degraded': self.degraded, 'rejected': self.rejected}
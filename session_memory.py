@@ -0,0 +1,159 @@
+"""
+Per-Session Memory Accounting
+=============================
+
+Every connected browser tab has its own ``st.session_state``, so anything
+stored there is multiplied by the number of sessions. Search results are
+therefore kept as dataset version ids plus int32 row positions (see
+``SearchCursor`` and ``UnifiedCursor``) and rehydrated from the shared
+datasets on render.
+
+This module measures each session's state after every run, trims result
+cursors when a session exceeds ``SESSION_MAX_BYTES``
+(``RECOMMENDER_SESSION_MAX_BYTES``), and publishes totals over all live
+sessions to the metrics registry:
+
+- ``session.state_bytes``: total session-state bytes across sessions
+- ``session.count``: sessions currently alive
+- ``session.max_state_bytes``: largest single session
+"""
+
+import io
+import math
+import os
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+from metrics import REGISTRY
+
+SESSION_MAX_BYTES = int(os.environ.get('RECOMMENDER_SESSION_MAX_BYTES', 256 * 1024))
+# Cursors are never trimmed below this many rows (one generous page)
+MIN_KEPT_ROWS = 50
+
+
+def state_nbytes(value, _seen=None):
+    """
+    Approximate deep size of a session-state value in bytes.
+
+    Arrays and DataFrames report their buffers, containers are walked
+    recursively, and objects shared between keys are counted once. File-like
+    values (uploaded files) are skipped: their bytes are held by Streamlit's
+    upload manager, and a parsed upload is accounted in the dataset cache.
+    """
+    import pandas as pd
+
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, io.IOBase):
+        return 0
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) if value.base is None else value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(state_nbytes(k, seen) + state_nbytes(v, seen)
+                                          for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(state_nbytes(item, seen) for item in value)
+    slots = getattr(type(value), '__slots__', None)
+    if slots:
+        return sys.getsizeof(value) + sum(state_nbytes(getattr(value, name, None), seen) for name in slots)
+    return sys.getsizeof(value)
+
+
+def _cursors(state):
+    """Result cursors held in a session's ``last_recommendations``."""
+    results = state.get('last_recommendations') or {}
+    return [value for value in results.values() if hasattr(value, 'truncate')]
+
+
+def enforce_ceiling(state, max_bytes=None):
+    """
+    Trim result cursors, largest first, until the session fits ``max_bytes``.
+
+    Only the tail of each ranking is dropped, so the best results and the
+    reported match totals are unaffected. Cursors are kept at MIN_KEPT_ROWS
+    rows at least, so a session can remain over the ceiling.
+
+    Args:
+        state: The session's state mapping
+        max_bytes: Ceiling in bytes (defaults to SESSION_MAX_BYTES)
+
+    Returns:
+        Tuple (session bytes after trimming, number of rows dropped)
+    """
+    max_bytes = SESSION_MAX_BYTES if max_bytes is None else max_bytes
+    nbytes = state_nbytes(dict(state))
+    dropped = 0
+    while nbytes > max_bytes:
+        trimmable = [cursor for cursor in _cursors(state) if len(cursor) > MIN_KEPT_ROWS]
+        if not trimmable:
+            break
+        cursor = max(trimmable, key=lambda c: c.nbytes)
+        row_bytes = cursor.nbytes / len(cursor)
+        keep = max(MIN_KEPT_ROWS, len(cursor) - math.ceil((nbytes - max_bytes) / row_bytes))
+        dropped += len(cursor) - keep
+        cursor.truncate(keep)
+        nbytes = state_nbytes(dict(state))
+    return nbytes, dropped
+
+
+class SessionFootprint:
+    """Last measured size of one session, stored in that session's state.
+
+    It lives and dies with the session, so the tracker's weak references
+    drop sessions that Streamlit has discarded.
+    """
+
+    __slots__ = ('nbytes', 'dropped_rows', '__weakref__')
+
+    def __init__(self):
+        self.nbytes = 0
+        self.dropped_rows = 0
+
+
+class SessionMemoryTracker:
+    """Totals over the footprints of all live sessions."""
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        self._footprints = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def account(self, state, max_bytes=None):
+        """
+        Measure a session after its run, enforce the ceiling and update the gauges.
+
+        Args:
+            state: The session's state mapping (``st.session_state``)
+            max_bytes: Ceiling in bytes (defaults to SESSION_MAX_BYTES)
+
+        Returns:
+            The session's SessionFootprint
+        """
+        footprint = state.get('_memory_footprint')
+        if footprint is None:
+            footprint = state['_memory_footprint'] = SessionFootprint()
+        nbytes, dropped = enforce_ceiling(state, max_bytes)
+        footprint.nbytes = nbytes
+        footprint.dropped_rows += dropped
+        with self._lock:
+            self._footprints.add(footprint)
+            sizes = [f.nbytes for f in self._footprints]
+        self.registry.set_gauge('session.state_bytes', sum(sizes))
+        self.registry.set_gauge('session.count', len(sizes))
+        self.registry.set_gauge('session.max_state_bytes', max(sizes))
+        return footprint
+
+    def stats(self):
+        with self._lock:
+            sizes = [f.nbytes for f in self._footprints]
+        return {'sessions': len(sizes), 'bytes': sum(sizes), 'max_bytes': max(sizes, default=0)}
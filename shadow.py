@@ -0,0 +1,166 @@
+"""
+Shadow Search Engine
+====================
+
+Runs a candidate search engine on a sample of live searches, after the
+current engine has answered and off the request path, and records how the
+two compare. Users only ever see the current engine's results.
+
+- A sampled search is handed over with its primary result; the request
+  continues immediately. Hand-over never blocks: if the shadow is busy (its
+  queue is full), the sample is dropped and counted.
+- One low-priority daemon thread runs the candidate. After each run it
+  sleeps in proportion to the CPU time the run used, so its average CPU use
+  stays within ``cpu_budget`` (a fraction of one core), and drops new
+  samples while it is paying that time back.
+- Per run it records the candidate's latency and CPU time, errors, and the
+  overlap of its first ``top_n`` results with the primary's, as ``shadow.*``
+  metrics next to the primary's latency on the same searches.
+
+A candidate is named by ``RECOMMENDER_SHADOW_ENGINE`` as ``module`` or
+``module:function`` (default function ``search``), called as
+``fn(kind, df, params, top_n=..., max_results=...)`` (plus ``ranges=...``
+for searches with numeric range filters) and returning a SearchCursor or a
+sequence of row positions. ``search_engine`` itself is a
+valid candidate (every overlap should then be 100%).
+
+Configured with ``RECOMMENDER_SHADOW_SAMPLE`` (default 0.05),
+``RECOMMENDER_SHADOW_CPU_BUDGET`` (default 0.1 of one core) and
+``RECOMMENDER_SHADOW_QUEUE`` (default 2).
+"""
+
+import importlib
+import os
+import queue
+import random
+import threading
+import time
+
+from metrics import REGISTRY
+
+SHADOW_ENGINE = os.environ.get('RECOMMENDER_SHADOW_ENGINE', '')
+SHADOW_SAMPLE = float(os.environ.get('RECOMMENDER_SHADOW_SAMPLE', 0.05))
+SHADOW_CPU_BUDGET = float(os.environ.get('RECOMMENDER_SHADOW_CPU_BUDGET', 0.1))
+SHADOW_QUEUE = int(os.environ.get('RECOMMENDER_SHADOW_QUEUE', 2))
+# Niceness of the shadow thread where the OS supports per-thread priorities
+SHADOW_NICE = 19
+
+
+def load_engine(spec):
+    """Import a candidate engine from ``module`` or ``module:function``."""
+    module_name, _, function = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function or 'search')
+
+
+def overlap(primary, candidate, n):
+    """Fraction of the primary's first ``n`` results also in the candidate's first ``n`` (1.0 if both are empty)."""
+    primary, candidate = list(primary[:n]), list(candidate[:n])
+    if not primary and not candidate:
+        return 1.0
+    return len(set(primary) & set(candidate)) / max(len(primary), len(candidate))
+
+
+class ShadowRunner:
+    """Runs a candidate engine on sampled searches under a CPU budget.
+
+    Args:
+        engine: Candidate callable ``(kind, df, params, top_n=, max_results=)``
+        sample_rate: Fraction of searches shadowed (0 to 1)
+        cpu_budget: Average share of one core the candidate may use (0 to 1]
+        queue_size: Samples allowed to wait for the shadow thread
+        registry: MetricsRegistry receiving ``shadow.*`` metrics
+    """
+
+    def __init__(self, engine, sample_rate=SHADOW_SAMPLE, cpu_budget=SHADOW_CPU_BUDGET, queue_size=SHADOW_QUEUE,
+                 registry=REGISTRY):
+        if not 0 < cpu_budget <= 1:
+            raise ValueError(f"cpu_budget must be in (0, 1], got {cpu_budget}")
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.cpu_budget = cpu_budget
+        self.registry = registry
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.errors = 0
+        self.cpu_ms = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._cooling = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._work, name='shadow', daemon=True)
+        self._thread.start()
+
+    def sampled(self):
+        """Decide whether the next search is shadowed."""
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def submit(self, kind, df, params, top_n, max_results, cursor, latency_ms, ranges=()):
+        """
+        Hand a finished primary search to the shadow. Never blocks.
+
+        Args:
+            kind: 'books', 'courses' or 'movies'
+            df: Catalog DataFrame searched
+            params: Normalized search parameters
+            top_n: Page size of the search
+            max_results: Cap on ranked positions
+            cursor: The primary engine's SearchCursor
+            latency_ms: The primary engine's latency
+            ranges: Normalized numeric range filters of the search
+
+        Returns:
+            True if the sample was queued, False if it was dropped
+        """
+        if self._cooling.is_set():
+            self._count('dropped')
+            return False
+        try:
+            self._queue.put_nowait((kind, df, params, top_n, max_results, ranges, cursor.positions[:top_n],
+                                    latency_ms))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('submitted')
+        return True
+
+    def _work(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SHADOW_NICE)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            kind, df, params, top_n, max_results, ranges, primary, primary_ms = self._queue.get()
+            cpu_start = time.thread_time()
+            start = time.perf_counter()
+            try:
+                options = {'ranges': ranges} if ranges else {}
+                result = self.engine(kind, df, params, top_n=top_n, max_results=max_results, **options)
+                latency_ms = (time.perf_counter() - start) * 1000
+                positions = getattr(result, 'positions', result)
+                self.registry.observe('shadow.latency_ms', latency_ms)
+                self.registry.observe('shadow.primary_latency_ms', primary_ms)
+                self.registry.observe('shadow.overlap_pct', overlap(primary.tolist(), list(positions), top_n) * 100)
+                self._count('completed')
+            except Exception:
+                self._count('errors')
+            cpu_s = time.thread_time() - cpu_start
+            # Wall latency includes waiting at low priority; CPU time is comparable under load
+            self.registry.observe('shadow.cpu_time_ms', cpu_s * 1000)
+            with self._lock:
+                self.cpu_ms += cpu_s * 1000
+                self.registry.set_gauge('shadow.cpu_ms', self.cpu_ms)
+            # Idle long enough that this run's CPU time is ``cpu_budget`` of the elapsed time
+            self._cooling.set()
+            time.sleep(cpu_s * (1 - self.cpu_budget) / self.cpu_budget)
+            self._cooling.clear()
+
+    def _count(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            value = getattr(self, outcome)
+        self.registry.set_gauge(f'shadow.{outcome}', value)
+
+    def stats(self):
+        with self._lock:
+            return {'submitted': self.submitted, 'dropped': self.dropped, 'completed': self.completed,
+                    'errors': self.errors, 'cpu_ms': round(self.cpu_ms, 1), 'cpu_budget': self.cpu_budget}
@@ -0,0 +1,177 @@
+"""
+Partitioned Scatter-Gather Search
+=================================
+
+Splits a catalog into K contiguous row ranges (shards), each with its own
+search structures: slices of the lowercase search columns for substring
+scans, and title lists extracted once for fuzzy scoring. The expensive
+stages of a single query fan out over a thread pool, one task per shard:
+
+- Substring scans return each shard's matching row positions. Shards cover
+  consecutive rows, so concatenating them in shard order gives row order.
+- Fuzzy scoring returns each shard's local top-N as sorted
+  ``(-score, position)`` pairs. A k-way heap merge (``heapq.merge``) of those
+  lists yields the global top-N in exactly the order of one unsharded pass.
+
+Both stages run in native code that releases the GIL (Arrow string kernels
+and RapidFuzz ``cdist``), so a thread pool spreads one query across cores
+without copying the catalog into worker processes.
+
+Enabled with ``RECOMMENDER_SEARCH_SHARDS`` (K; the default 1 leaves searches
+unsharded) and ``RECOMMENDER_SHARD_WORKERS`` (pool size, default one per core).
+"""
+
+import heapq
+import os
+import time
+from itertools import islice
+
+import numpy as np
+
+from search_engine import FUZZY_BLOCK_ROWS, FUZZY_THRESHOLD
+
+SEARCH_SHARDS = int(os.environ.get('RECOMMENDER_SEARCH_SHARDS', 1))
+SHARD_WORKERS = int(os.environ.get('RECOMMENDER_SHARD_WORKERS', os.cpu_count() or 1))
+# Shards are never smaller than this (a task per tiny shard costs more than it saves)
+MIN_SHARD_ROWS = 50_000
+
+# Per catalog: lowercase columns scanned for substrings, columns scored fuzzily
+SHARD_COLUMNS = {
+    'books': (['title_lower', 'original_title_lower', 'authors_lower'], ['title']),
+    'courses': (['course_title_lower', 'course_difficulty_lower'], ['course_title']),
+    'movies': (['Title_lower', 'Genre_lower'], ['Title']),
+}
+
+
+def shard_count(n_rows, n_shards=SEARCH_SHARDS):
+    """Number of shards for a catalog of ``n_rows`` rows (1 means unsharded)."""
+    return max(1, min(n_shards, n_rows // MIN_SHARD_ROWS))
+
+
+class Shard:
+    """Search structures for the rows [offset, offset + n_rows) of a catalog."""
+
+    __slots__ = ('offset', 'n_rows', 'columns', 'titles')
+
+    def __init__(self, df, start, stop, search_columns, title_columns):
+        part = df.iloc[start:stop]
+        self.offset = start
+        self.n_rows = stop - start
+        self.columns = {column: part[column] for column in search_columns}
+        self.titles = {column: part[column].tolist() for column in title_columns}
+
+    def _local(self, positions):
+        """This shard's share of ascending catalog ``positions``, as local row numbers."""
+        start, stop = np.searchsorted(positions, [self.offset, self.offset + self.n_rows])
+        return positions[start:stop] - self.offset
+
+    def contains(self, columns, text, positions=None):
+        """Catalog positions of this shard's rows whose columns contain ``text``, in row order.
+
+        With ``positions`` (ascending catalog positions), only those rows are scanned.
+        """
+        local = None if positions is None else self._local(positions)
+        mask = np.zeros(self.n_rows if local is None else len(local), dtype=bool)
+        for column in columns:
+            values = self.columns[column] if local is None else self.columns[column].iloc[local]
+            mask |= values.str.contains(text, na=False, regex=False).to_numpy()
+        return (np.flatnonzero(mask) if local is None else local[mask]) + self.offset
+
+    def fuzzy_top(self, column, query, limit, deadline=None, positions=None):
+        """
+        This shard's best fuzzy matches above FUZZY_THRESHOLD.
+
+        With a deadline, titles are scored in FUZZY_BLOCK_ROWS blocks and
+        scoring stops when it passes. With ``positions`` (ascending catalog
+        positions), only those rows are scored.
+
+        Returns:
+            Tuple (pairs, complete): up to ``limit`` (-score, catalog position)
+            pairs in ascending order, and False if scoring was cut short
+        """
+        from rapidfuzz import fuzz, process
+
+        titles = self.titles[column]
+        local = None
+        if positions is not None:
+            local = self._local(positions)
+            titles = [titles[row] for row in local]
+        step = len(titles) if deadline is None else FUZZY_BLOCK_ROWS
+        blocks = []
+        scored = 0
+        while scored < len(titles) and (deadline is None or time.monotonic() < deadline):
+            blocks.append(process.cdist([query], titles[scored:scored + step], scorer=fuzz.ratio,
+                                        dtype=np.float64, workers=1)[0])
+            scored += step
+        scores = np.concatenate(blocks) if blocks else np.empty(0)
+        hits = np.flatnonzero(scores > FUZZY_THRESHOLD)
+        hits = hits[np.lexsort((hits, -scores[hits]))][:limit]
+        rows = hits if local is None else local[hits]
+        pairs = [(-float(scores[hit]), int(row) + self.offset) for hit, row in zip(hits, rows)]
+        return pairs, scored >= len(titles)
+
+
+class ShardedCatalog:
+    """A catalog split into contiguous shards, searched with scatter-gather.
+
+    Args:
+        df: Catalog DataFrame (its ``dataset_version`` is recorded)
+        n_shards: Number of shards
+        search_columns: Lowercase columns available to ``contains``
+        title_columns: Columns available to ``fuzzy_positions``
+        executor: concurrent.futures executor running the shard tasks (None
+            runs them in the calling thread)
+    """
+
+    def __init__(self, df, n_shards, search_columns, title_columns, executor=None):
+        self.dataset_version = df.attrs.get('dataset_version')
+        self.n_rows = len(df)
+        self.executor = executor
+        bounds = np.linspace(0, len(df), n_shards + 1).astype(int)
+        self.shards = [Shard(df, start, stop, search_columns, title_columns)
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def __len__(self):
+        return len(self.shards)
+
+    def matches(self, df):
+        """True if the shards were built from this dataset."""
+        return df is not None and df.attrs.get('dataset_version') == self.dataset_version
+
+    def _scatter(self, task):
+        if self.executor is None:
+            return [task(shard) for shard in self.shards]
+        return list(self.executor.map(task, self.shards))
+
+    def contains(self, columns, text, positions=None):
+        """Positions of all rows (or only ascending ``positions``) whose ``columns`` contain ``text``, in row order."""
+        return np.concatenate(self._scatter(lambda shard: shard.contains(columns, text, positions)))
+
+    def fuzzy_positions(self, column, query, limit, deadline=None, positions=None):
+        """
+        Positions of the ``limit`` best fuzzy matches above FUZZY_THRESHOLD
+        (optionally only among ascending ``positions``).
+
+        Returns:
+            Tuple (positions, complete): complete is False if any shard was cut short
+        """
+        results = self._scatter(lambda shard: shard.fuzzy_top(column, query, limit, deadline, positions))
+        merged = heapq.merge(*(pairs for pairs, _ in results))
+        return [position for _, position in islice(merged, limit)], all(complete for _, complete in results)
+
+
+def build_sharded_catalog(kind, df, n_shards=SEARCH_SHARDS, executor=None):
+    """
+    Shard a catalog for scatter-gather search.
+
+    Returns:
+        ShardedCatalog, or None if the catalog is too small to split into
+        more than one shard
+    """
+    if df is None:
+        return None
+    n_shards = shard_count(len(df), n_shards)
+    if n_shards < 2:
+        return None
+    search_columns, title_columns = SHARD_COLUMNS[kind]
+    return ShardedCatalog(df, n_shards, search_columns, title_columns, executor)
@@ -0,0 +1,163 @@
+"""
+Single-Flight Request Coalescing
+================================
+
+When many sessions issue the same search at the same moment (a promoted
+title, a shared link), only the first caller computes it; the others wait
+for that computation and share its result. A thundering herd then costs one
+query's worth of CPU.
+
+Calls are only coalesced while in flight: nothing is cached once the
+computation finishes, so results never outlive the request that produced
+them. Exceptions are shared the same way as results, but only ordinary
+``Exception``s: anything else (``KeyboardInterrupt``, or the exceptions
+Streamlit raises to stop or rerun the leader's session) only concerns the
+leader, and the waiters retry instead.
+
+Waiters never run the leader's callbacks; a caller that wants to show
+progress while it waits passes its own ``poll``. Computations that run
+elsewhere (e.g. on a worker pool) are coalesced with ``do_future``: every
+caller gets the same future and waits on it in its own loop.
+
+    flights = SingleFlight()
+    result, shared = flights.do(key, lambda: expensive(*args))
+    future, shared = flights.do_future(key, lambda: executor.submit(expensive, *args))
+"""
+
+import threading
+
+from metrics import REGISTRY
+
+
+# How often a waiter's poll callback runs
+POLL_INTERVAL_S = 0.05
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'abandoned', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one execution.
+
+    Args:
+        name: Metric prefix (gauges ``<name>.executed`` and ``<name>.shared``)
+        registry: MetricsRegistry receiving the counts
+    """
+
+    def __init__(self, name='search.flights', registry=REGISTRY):
+        self.name = name
+        self.registry = registry
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn, poll=None):
+        """
+        Run ``fn()`` unless a call with the same key is already in flight.
+
+        Args:
+            key: Hashable identity of the computation
+            fn: Zero-argument callable computing the result
+            poll: Optional callable run every POLL_INTERVAL_S while this caller
+                waits for another caller's computation (never by the leader)
+
+        Returns:
+            Tuple (result, shared): shared is True if another caller computed it
+
+        Raises:
+            Whatever ``Exception`` ``fn`` raised, in the leader and in every
+            waiter; other exceptions are raised in the leader only
+        """
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                self._lead(key, call, fn)
+            else:
+                while not call.done.wait(None if poll is None else POLL_INTERVAL_S):
+                    poll()
+                if call.abandoned:
+                    continue
+            if call.error is not None:
+                raise call.error
+            return call.result, not leader
+
+    def do_future(self, key, start):
+        """
+        Start a computation that runs elsewhere unless one with the same key is in flight.
+
+        The flight lasts until the returned future completes, so callers
+        arriving meanwhile get the same future. Each caller waits on it
+        itself (with its own timeout or progress polling).
+
+        Args:
+            key: Hashable identity of the computation
+            start: Zero-argument callable starting it and returning a
+                ``concurrent.futures.Future``
+
+        Returns:
+            Tuple (future, shared): shared is True if another caller started it
+
+        Raises:
+            Whatever ``Exception`` ``start`` raised, in the leader and in the
+            callers that joined while it was starting
+        """
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                self._lead(key, call, start, until_done=True)
+            else:
+                call.done.wait()
+                if call.abandoned:
+                    continue
+            if call.error is not None:
+                raise call.error
+            return call.result, not leader
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                return call, True
+            call.waiters += 1
+            return call, False
+
+    def _lead(self, key, call, fn, until_done=False):
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        except BaseException:
+            # Interrupts this caller only (e.g. its session stopped or reran): waiters retry
+            call.abandoned = True
+            self._finish(key, call)
+            raise
+        if until_done and call.error is None:
+            call.done.set()
+            call.result.add_done_callback(lambda _: self._finish(key, call))
+        else:
+            self._finish(key, call)
+
+    def _finish(self, key, call):
+        with self._lock:
+            del self._calls[key]
+            self.executed += 1
+            self.shared += call.waiters
+            executed, shared = self.executed, self.shared
+        call.done.set()
+        self.registry.set_gauge(f'{self.name}.executed', executed)
+        self.registry.set_gauge(f'{self.name}.shared', shared)
+
+    def in_flight(self):
+        """Number of distinct computations currently running."""
+        with self._lock:
+            return len(self._calls)
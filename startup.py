@@ -0,0 +1,116 @@
+"""
+Cold Start: Lazy Imports & Startup Budget
+=========================================
+
+``lazy_module`` returns a proxy whose module is only imported on first
+attribute access. app.py reaches pandas and the local modules built on
+pandas/numpy (datasets, search_engine, ...) through such proxies, so the real
+imports happen when a tab first loads its dataset. PIL, requests and
+rapidfuzz are imported inside the functions that use them.
+
+Two cold-start numbers are tracked against a budget:
+
+- ``startup.import_ms``: app.py's own import block on the first run
+- ``startup.first_paint_ms``: script start until the header, sidebar and tab
+  bar have been sent, before any dataset is loaded
+
+Budgets are set with ``RECOMMENDER_IMPORT_BUDGET_MS`` and
+``RECOMMENDER_FIRST_PAINT_BUDGET_MS``. To check the import budget from a
+fresh interpreter (e.g. in CI):
+
+    python startup.py            # exits 1 if over budget
+"""
+
+import importlib
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = float(os.environ.get('RECOMMENDER_IMPORT_BUDGET_MS', 200))
+FIRST_PAINT_BUDGET_MS = float(os.environ.get('RECOMMENDER_FIRST_PAINT_BUDGET_MS', 500))
+
+BUDGETS_MS = {
+    'startup.import_ms': IMPORT_BUDGET_MS,
+    'startup.first_paint_ms': FIRST_PAINT_BUDGET_MS,
+}
+
+# Modules that must not be imported eagerly by app.py
+HEAVY_MODULES = ['pandas', 'numpy', 'PIL.Image', 'requests', 'rapidfuzz', 'pyarrow']
+
+
+class _LazyModule:
+    """Stand-in that imports the real module on first attribute access.
+
+    It is deliberately not registered in ``sys.modules``: tools that walk
+    ``sys.modules`` (``inspect.getmodule``, which Streamlit calls on its first
+    element) would otherwise trigger every deferred import.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    """
+    Return a module proxy that imports ``name`` on first attribute access.
+
+    Use ``proxy.attr`` everywhere; ``from name import attr`` would import eagerly.
+    """
+    return _LazyModule(name)
+
+
+def is_loaded(name):
+    """True if a module has actually been imported."""
+    return name in sys.modules
+
+
+def over_budget(measurements):
+    """Names of budgeted measurements (in ms) that exceed their budget."""
+    return [name for name, budget in BUDGETS_MS.items()
+            if measurements.get(name) is not None and measurements[name] > budget]
+
+
+# Run in a fresh interpreter; streamlit itself is imported first because the
+# server has always imported it before running app.py
+_MEASURE_SNIPPET = """
+import json, sys, time
+import streamlit
+start = time.perf_counter()
+import app
+elapsed_ms = (time.perf_counter() - start) * 1000
+from startup import HEAVY_MODULES, is_loaded
+print(json.dumps({'import_ms': elapsed_ms, 'eager': [m for m in HEAVY_MODULES if is_loaded(m)]}))
+"""
+
+
+def measure_import(app_dir=None):
+    """Cold import time of app.py (ms) and heavy modules it imported eagerly."""
+    import json
+
+    app_dir = app_dir or os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', _MEASURE_SNIPPET], cwd=app_dir,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    result = measure_import()
+    print(f"app.py import: {result['import_ms']:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    if result['eager']:
+        print(f"Eagerly imported heavy modules: {', '.join(result['eager'])}")
+    failed = over_budget({'startup.import_ms': result['import_ms']}) or result['eager']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
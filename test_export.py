@@ -0,0 +1,68 @@
+"""
+Tests for streaming exports (export.py).
+
+Run with:
+    python -m pytest test_export.py
+"""
+
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+
+
+def _catalog(n_rows):
+    return pd.DataFrame({
+        'title': [f'Title {i}' for i in range(n_rows)],
+        'title_lower': [f'title {i}' for i in range(n_rows)],
+        'rating': np.linspace(1, 5, n_rows),
+    })
+
+
+def _jsonl_lines(data):
+    return data.decode('utf-8').split('\n')
+
+
+def test_jsonl_export_spanning_several_chunks_is_valid_jsonl():
+    df = _catalog(25)
+    data = b''.join(export.export_rows(df, fmt='jsonl', chunk_rows=10))
+
+    lines = _jsonl_lines(data)
+    assert lines[-1] == ''  # trailing newline only
+    records = [json.loads(line) for line in lines[:-1]]
+    assert [record['title'] for record in records] == df['title'].tolist()
+    assert all('title_lower' not in record for record in records)
+
+
+def test_compressed_jsonl_export_of_selected_positions():
+    df = _catalog(25)
+    positions = np.array([24, 3, 17, 0, 9, 11, 5, 20, 8, 1, 2, 13])
+    data = b''.join(export.export_rows(df, positions, fmt='jsonl', compression='gzip', chunk_rows=5))
+
+    records = [json.loads(line) for line in _jsonl_lines(gzip.decompress(data))[:-1]]
+    assert [record['title'] for record in records] == df['title'].iloc[positions].tolist()
+
+
+def test_csv_export_spanning_several_chunks_has_one_header():
+    df = _catalog(25)
+    data = b''.join(export.export_rows(df, fmt='csv', chunk_rows=10)).decode('utf-8')
+
+    lines = data.splitlines()
+    assert lines[0] == 'title,rating'
+    assert len(lines) == 1 + len(df)
+
+
+def test_cli_reports_missing_zstandard_without_creating_the_file(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(export, 'zstandard', None)
+    out = tmp_path / 'movies.csv.zst'
+
+    with pytest.raises(SystemExit) as exc:
+        export.main(['movies', '--compression', 'zstd', '--out', str(out)])
+
+    assert exc.value.code == 1
+    assert 'requires zstandard' in capsys.readouterr().err
+    assert not out.exists()
@@ -0,0 +1,109 @@
+"""
+Tests for read-only shared datasets (frozen_frame.py).
+
+Run with:
+    python -m pytest test_frozen_frame.py
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frozen_frame import FrozenDataFrame, FrozenDatasetError, freeze
+
+
+def _catalog():
+    df = pd.DataFrame({
+        'title': pd.array(['Dune', 'Emma', 'Ulysses'], dtype='str'),
+        'rating': [4.2, 3.9, np.nan],
+        'year': [1965, 1815, 1922],
+    })
+    df.attrs['dataset_version'] = 'v1'
+    return df
+
+
+BLOCKED = {
+    'loc': lambda df: df.loc.__setitem__((0, 'title'), 'x'),
+    'iloc': lambda df: df.iloc.__setitem__((0, 1), 1.0),
+    'at': lambda df: df.at.__setitem__((0, 'title'), 'x'),
+    'iat': lambda df: df.iat.__setitem__((0, 2), 1),
+    'setitem new column': lambda df: df.__setitem__('new', 1),
+    'setitem existing column': lambda df: df.__setitem__('rating', 0.0),
+    'delitem': lambda df: df.__delitem__('year'),
+    'insert': lambda df: df.insert(0, 'new', 1),
+    'pop': lambda df: df.pop('year'),
+    'update': lambda df: df.update(pd.DataFrame({'year': [2000]})),
+    'drop inplace': lambda df: df.drop(columns=['year'], inplace=True),
+    'fillna inplace': lambda df: df.fillna({'rating': 0.0}, inplace=True),
+    'sort_values inplace': lambda df: df.sort_values('year', inplace=True),
+    'reset_index inplace': lambda df: df.reset_index(drop=True, inplace=True),
+    'rename inplace': lambda df: df.rename(columns={'title': 'name'}, inplace=True),
+    'columns': lambda df: setattr(df, 'columns', ['a', 'b', 'c']),
+    'index': lambda df: setattr(df, 'index', [7, 8, 9]),
+    'attrs': lambda df: setattr(df, 'attrs', {}),
+}
+
+
+@pytest.mark.parametrize('mutation', list(BLOCKED))
+def test_mutations_of_a_frozen_frame_are_refused(mutation):
+    original = _catalog()
+    frozen = freeze(original.copy())
+
+    with pytest.raises(FrozenDatasetError):
+        BLOCKED[mutation](frozen)
+
+    pd.testing.assert_frame_equal(pd.DataFrame(frozen), original)
+
+
+def test_in_place_operators_are_refused():
+    numbers = _catalog()[['rating', 'year']]
+    frozen = freeze(numbers.copy())
+
+    with pytest.raises(FrozenDatasetError):
+        frozen += 1
+
+    pd.testing.assert_frame_equal(pd.DataFrame(frozen), numbers)
+
+
+def test_frozen_frame_shares_data_and_attrs():
+    df = _catalog()
+    frozen = freeze(df)
+
+    assert isinstance(frozen, FrozenDataFrame)
+    assert frozen.attrs['dataset_version'] == 'v1'
+    assert freeze(frozen) is frozen
+    assert frozen.loc[0, 'title'] == 'Dune'
+    assert frozen.iloc[[2, 0]]['year'].tolist() == [1922, 1965]
+
+
+def test_derived_frames_are_writable_and_never_reach_the_shared_data():
+    original = _catalog()
+    frozen = freeze(original.copy())
+
+    subset = frozen[frozen['year'] > 1900]
+    subset.loc[subset.index[0], 'title'] = 'changed'
+    subset['new'] = 1
+    copy = frozen.copy()
+    copy.drop(columns=['year'], inplace=True)
+    column = frozen['rating']
+    column.iloc[0] = 0.0
+
+    assert type(subset) is pd.DataFrame and type(copy) is pd.DataFrame
+    pd.testing.assert_frame_equal(pd.DataFrame(frozen), original)
+
+
+def test_array_views_are_read_only():
+    frozen = freeze(_catalog())
+
+    with pytest.raises(ValueError):
+        frozen['rating'].to_numpy()[0] = 0.0
+
+
+def test_unpickled_frozen_frame_stays_frozen():
+    restored = pickle.loads(pickle.dumps(freeze(_catalog())))
+
+    assert restored.attrs['dataset_version'] == 'v1'
+    with pytest.raises(FrozenDatasetError):
+        restored['new'] = 1
@@ -0,0 +1,95 @@
+"""
+Tests for bounded search execution (search_pool.py).
+
+Run with:
+    python -m pytest test_search_pool.py
+"""
+
+import threading
+import time
+
+import pytest
+
+import search_pool
+from metrics import MetricsRegistry
+from search_pool import SearchPool, SearchRejected
+
+TIMEOUT_S = 5
+
+
+def _pool(workers=1, queue_size=1, deadline_ms=TIMEOUT_S * 1000):
+    return SearchPool(workers, queue_size, deadline_ms, registry=MetricsRegistry())
+
+
+def _blocked(gate, result='result'):
+    def fn(deadline):
+        assert gate.wait(TIMEOUT_S)
+        return result
+    return fn
+
+
+def _settled(pool):
+    """Stats once every admitted search has released its slot (done-callbacks run after result())."""
+    give_up = time.monotonic() + TIMEOUT_S
+    while pool.stats()['admitted'] and time.monotonic() < give_up:
+        time.sleep(0.01)
+    return pool.stats()
+
+
+def test_a_saturated_pool_rejects_instead_of_queueing():
+    pool = _pool(workers=1, queue_size=1)
+    gate = threading.Event()
+    running = pool.submit(_blocked(gate))
+    queued = pool.submit(_blocked(gate))
+    assert pool.stats()['admitted'] == 2
+
+    with pytest.raises(SearchRejected):
+        pool.submit(_blocked(gate))
+
+    gate.set()
+    assert pool.wait(running) == pool.wait(queued) == 'result'
+    stats = _settled(pool)
+    assert (stats['admitted'], stats['completed'], stats['rejected']) == (0, 2, 1)
+    # Freed slots admit new searches again
+    assert pool.run(lambda deadline: 'again') == 'again'
+
+
+def test_a_search_still_running_past_give_up_is_abandoned(monkeypatch):
+    monkeypatch.setattr(search_pool, 'ABANDON_GRACE_MS', 0)
+    pool = _pool(deadline_ms=200)
+    gate = threading.Event()
+    polls = []
+
+    started = time.monotonic()
+    with pytest.raises(SearchRejected):
+        pool.run(_blocked(gate), poll=lambda: polls.append(1))
+    assert time.monotonic() - started < TIMEOUT_S
+    assert polls
+
+    gate.set()
+    stats = _settled(pool)
+    # The abandoned search released its slot but does not count as completed
+    assert (stats['admitted'], stats['completed'], stats['rejected']) == (0, 0, 1)
+
+
+def test_degraded_results_and_errors_release_their_slots():
+    pool = _pool(workers=1, queue_size=1)
+
+    class Partial(list):
+        degraded = True
+
+    assert pool.run(lambda deadline: Partial()) == []
+    with pytest.raises(ZeroDivisionError):
+        pool.run(lambda deadline: 1 / 0)
+
+    stats = _settled(pool)
+    assert (stats['admitted'], stats['completed'], stats['degraded']) == (0, 0, 1)
+
+
+def test_the_deadline_is_measured_from_admission():
+    pool = _pool(deadline_ms=200)
+    before = time.monotonic()
+
+    deadline = pool.run(lambda deadline: deadline)
+
+    assert before + 0.2 <= deadline <= time.monotonic() + 0.2
@@ -1,10 +1,28 @@
 """
 Test Script for Smart Recommender System
 Run this to verify your installation and dataset setup.
+
+    python test_setup.py                          # full installation check
+    python test_setup.py --fast --report out.json # validate large CSVs in seconds
 """
 
-import sys
+import argparse
+import csv
+import io
+import json
+import mmap
 import os
+import sys
+import time
+
+# Chunk size for scanning CSV bytes (memory use stays at about this much)
+SCAN_CHUNK_BYTES = 16 * 1024 * 1024
+# Stratified sample: rows read at each of SAMPLE_STRATA evenly spaced offsets
+SAMPLE_STRATA = 20
+SAMPLE_ROWS_PER_STRATUM = 50
+# Share of sampled values that must parse as numbers for a numeric column
+NUMERIC_THRESHOLD = 0.95
+
 
 def check_python_version():
     """Check if Python version is 3.8 or higher."""
@@ -26,7 +44,8 @@ def check_dependencies():
         'PIL': 'pillow',
         'rapidfuzz': 'rapidfuzz',
         'numpy': 'numpy',
-        'requests': 'requests'
+        'requests': 'requests',
+        'pyarrow': 'pyarrow'
     }
     
     print("\n📦 Checking dependencies...")
@@ -66,54 +85,250 @@ def check_csv_structure():
     
     try:
         import pandas as pd
-        
-        # Check books.csv
-        if os.path.exists('books.csv'):
-            try:
-                df = pd.read_csv('books.csv', nrows=1)
-                required_cols = ['title', 'authors', 'average_rating', 'image_url']
-                missing = [col for col in required_cols if col not in df.columns]
-                
-                if not missing:
-                    print(f"  ✓ books.csv has all required columns")
-                    print(f"    Total columns: {len(df.columns)}, Rows: {len(pd.read_csv('books.csv'))}")
-                else:
-                    print(f"  ✗ books.csv missing columns: {missing}")
-            except Exception as e:
-                print(f"  ✗ Error reading books.csv: {e}")
-        
-        # Check courses.csv
-        if os.path.exists('courses.csv'):
-            try:
-                df = pd.read_csv('courses.csv', nrows=1)
-                required_cols = ['course_title', 'course_rating', 'course_difficulty']
-                missing = [col for col in required_cols if col not in df.columns]
-                
-                if not missing:
-                    print(f"  ✓ courses.csv has all required columns")
-                    print(f"    Total columns: {len(df.columns)}, Rows: {len(pd.read_csv('courses.csv'))}")
-                else:
-                    print(f"  ✗ courses.csv missing columns: {missing}")
-            except Exception as e:
-                print(f"  ✗ Error reading courses.csv: {e}")
-        
-        # Check movies.csv
-        if os.path.exists('movies.csv'):
-            try:
-                df = pd.read_csv('movies.csv', nrows=1)
-                required_cols = ['Title', 'IMDB Score', 'Genre', 'Poster']
-                missing = [col for col in required_cols if col not in df.columns]
-                
-                if not missing:
-                    print(f"  ✓ movies.csv has all required columns")
-                    print(f"    Total columns: {len(df.columns)}, Rows: {len(pd.read_csv('movies.csv'))}")
-                else:
-                    print(f"  ✗ movies.csv missing columns: {missing}")
-            except Exception as e:
-                print(f"  ✗ Error reading movies.csv: {e}")
-                
+        from datasets import CATALOGS
     except ImportError:
         print("  ⚠ pandas not installed, skipping structure check")
+        return
+    
+    for kind, meta in CATALOGS.items():
+        filename = meta['file']
+        if not os.path.exists(filename):
+            continue
+        try:
+            df = pd.read_csv(filename, nrows=1)
+            missing = [col for col in meta['required_cols'] if col not in df.columns]
+            
+            if not missing:
+                print(f"  ✓ {filename} has all required columns")
+                print(f"    Total columns: {len(df.columns)}, Rows: {count_csv_rows(filename):,}")
+            else:
+                print(f"  ✗ {filename} missing columns: {missing}")
+        except Exception as e:
+            print(f"  ✗ Error reading {filename}: {e}")
+
+
+# ============================================================================
+# FAST LARGE-FILE VALIDATION
+# ============================================================================
+
+def _release_pages(mm, start, length):
+    """Drop scanned pages from this process's resident set (they stay in the OS page cache)."""
+    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+        mm.madvise(mmap.MADV_DONTNEED, start, length)
+
+
+def count_csv_rows(path):
+    """
+    Count data rows by scanning the memory-mapped file in fixed-size chunks.
+    
+    Newlines inside quoted fields are not row breaks: quote parity is carried
+    across chunks (an escaped "" toggles twice, so parity is unaffected).
+    
+    Returns:
+        Number of rows excluding the header
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    
+    line_breaks = 0
+    in_quotes = False
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, size, SCAN_CHUNK_BYTES):
+            chunk = mm[start:start + SCAN_CHUNK_BYTES]
+            _release_pages(mm, start, len(chunk))
+            if b'"' not in chunk:
+                if not in_quotes:
+                    line_breaks += chunk.count(b'\n')
+                continue
+            for part in chunk.split(b'"'):
+                if not in_quotes:
+                    line_breaks += part.count(b'\n')
+                in_quotes = not in_quotes
+            # split() yields one part more than there are quotes
+            in_quotes = not in_quotes
+        ends_with_newline = mm[size - 1:size] == b'\n'
+    
+    records = line_breaks + (0 if ends_with_newline else 1)
+    return max(records - 1, 0)
+
+
+def _decode(data):
+    """Decode CSV bytes like the loaders: utf-8, falling back to latin-1."""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def read_csv_header(path, max_bytes=1 << 20):
+    """Column names from the first record of a CSV."""
+    with open(path, 'rb') as f:
+        head = f.read(max_bytes)
+    # Cut at the last complete line so a multi-byte character is never split
+    if b'\n' in head:
+        head = head[:head.rindex(b'\n') + 1]
+    return next(csv.reader(io.StringIO(_decode(head))), [])
+
+
+def sample_csv_rows(path, strata=SAMPLE_STRATA, rows_per_stratum=SAMPLE_ROWS_PER_STRATUM,
+                    window_bytes=1 << 20):
+    """
+    Read a stratified sample of rows from evenly spaced byte offsets.
+    
+    Each stratum seeks to its offset, skips to the next line start, and parses
+    up to ``rows_per_stratum`` records from a bounded window, so memory does
+    not depend on file size.
+    
+    Returns:
+        List of parsed rows (lists of strings); the first stratum starts after the header
+    """
+    size = os.path.getsize(path)
+    rows = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b'\n') + 1
+        if header_end <= 0:
+            return rows
+        span = max(size - header_end, 1)
+        for i in range(strata):
+            offset = header_end + span * i // strata
+            if i > 0:
+                line_end = mm.find(b'\n', offset)
+                if line_end < 0:
+                    break
+                offset = line_end + 1
+            window = mm[offset:offset + window_bytes]
+            if b'\n' in window and offset + window_bytes < size:
+                window = window[:window.rindex(b'\n') + 1]
+            reader = csv.reader(io.StringIO(_decode(window)))
+            for _, row in zip(range(rows_per_stratum), reader):
+                if row:
+                    rows.append(row)
+    return rows
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def profile_columns(header, rows):
+    """
+    Type profile of each column over the sampled rows.
+    
+    Returns:
+        Dict column -> {type, non_empty, numeric_share, example}
+    """
+    profile = {}
+    for index, column in enumerate(header):
+        values = [row[index].strip() for row in rows if index < len(row)]
+        non_empty = [value for value in values if value and value.lower() not in ('nan', 'null', 'none')]
+        numeric = [value for value in non_empty if _is_number(value)]
+        numeric_share = len(numeric) / len(non_empty) if non_empty else 0.0
+        if not non_empty:
+            kind = 'empty'
+        elif numeric_share >= NUMERIC_THRESHOLD:
+            kind = 'integer' if all(value.lstrip('-').isdigit() for value in numeric) else 'float'
+        else:
+            kind = 'string'
+        profile[column] = {
+            'type': kind,
+            'non_empty': round(len(non_empty) / len(values), 4) if values else 0.0,
+            'numeric_share': round(numeric_share, 4),
+            'example': non_empty[0][:80] if non_empty else None,
+        }
+    return profile
+
+
+def validate_csv_fast(kind, path):
+    """
+    Validate one catalog CSV without loading it.
+    
+    Checks the header against the loader's required columns, counts rows,
+    flags sampled rows with the wrong number of fields, and checks that the
+    rating column is numeric.
+    
+    Returns:
+        JSON-serialisable report dict with an ``ok`` flag
+    """
+    from datasets import CATALOGS
+    
+    meta = CATALOGS[kind]
+    start = time.perf_counter()
+    header = read_csv_header(path)
+    rows = sample_csv_rows(path)
+    profile = profile_columns(header, rows)
+    missing = [col for col in meta['required_cols'] if col not in header]
+    malformed = sum(1 for row in rows if len(row) != len(header))
+    
+    problems = []
+    if missing:
+        problems.append(f"missing required columns: {missing}")
+    rating = profile.get(meta['rating_col'])
+    if rating is not None and rating['type'] not in ('integer', 'float'):
+        problems.append(f"{meta['rating_col']} is not numeric in the sample "
+                        f"({rating['numeric_share']:.0%} of values parse as numbers)")
+    if rows and malformed / len(rows) > 0.01:
+        problems.append(f"{malformed} of {len(rows)} sampled rows have the wrong number of fields")
+    
+    return {
+        'kind': kind,
+        'path': os.path.abspath(path),
+        'bytes': os.path.getsize(path),
+        'rows': count_csv_rows(path),
+        'columns': header,
+        'missing_required': missing,
+        'sample_rows': len(rows),
+        'malformed_sample_rows': malformed,
+        'column_profile': profile,
+        'problems': problems,
+        'ok': not problems,
+        'elapsed_s': round(time.perf_counter() - start, 3),
+    }
+
+
+def run_fast_validation(report_path=None):
+    """
+    Validate every catalog CSV present and emit a machine-readable report.
+    
+    Args:
+        report_path: Where to write the JSON report ('-' for stdout, None to skip)
+    
+    Returns:
+        True if every present file passed
+    """
+    from datasets import CATALOGS
+    
+    # Keep stdout pure JSON when the report goes there
+    out = sys.stderr if report_path == '-' else sys.stdout
+    print("\n⚡ Fast validation (memory-mapped scan + stratified sample)...", file=out)
+    files = {}
+    for kind, meta in CATALOGS.items():
+        if not os.path.exists(meta['file']):
+            print(f"  ⚠ {meta['file']} NOT found, skipped", file=out)
+            continue
+        result = files[kind] = validate_csv_fast(kind, meta['file'])
+        status = "✓" if result['ok'] else "✗"
+        print(f"  {status} {meta['file']}: {result['rows']:,} rows, {len(result['columns'])} columns, "
+              f"{result['bytes']:,} bytes ({result['elapsed_s']:.2f}s)", file=out)
+        for problem in result['problems']:
+            print(f"    ✗ {problem}", file=out)
+    
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'files': files,
+        'ok': all(result['ok'] for result in files.values()),
+    }
+    if report_path == '-':
+        print(json.dumps(report, indent=2))
+    elif report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"  📝 Report written to {report_path}")
+    return report['ok']
 
 
 def check_app_file():
@@ -130,6 +345,17 @@ def check_app_file():
 
 def main():
     """Run all checks."""
+    parser = argparse.ArgumentParser(description="Verify installation and dataset setup")
+    parser.add_argument('--fast', action='store_true',
+                        help="Validate CSVs by memory-mapped scan and sampling only (for very large files)")
+    parser.add_argument('--report', metavar='PATH',
+                        help="Write a JSON validation report (use '-' for stdout); implies --fast")
+    args = parser.parse_args()
+    
+    if args.fast or args.report:
+        ok = run_fast_validation(args.report)
+        sys.exit(0 if ok else 1)
+    
     print("=" * 60)
     print("🎯 Smart Recommender System - Installation Test")
     print("=" * 60)
@@ -0,0 +1,95 @@
+"""
+Tests for scatter-gather search (sharding.py).
+
+Shards normally only exist for catalogs of MIN_SHARD_ROWS rows or more; these
+tests lower that threshold so the bundled sample catalogs split into shards,
+and check that sharded searches rank exactly like unsharded ones.
+
+Run with:
+    python -m pytest test_sharding.py
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import sharding
+from datasets import load_catalog
+from search_engine import search
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+N_SHARDS = 3
+
+QUERIES = [
+    ('books', ('', '', ''), 5),
+    ('books', ('harry potter', '', ''), 5),
+    ('books', ('pride and prejudise', '', ''), 5),  # typos: ranked by the fuzzy stage
+    ('books', ('the hobit', '', ''), 5),
+    ('books', ('the', '', ''), 20),
+    ('books', ('', 'fantasy', ''), 5),
+    ('books', ('', '', 'rowling'), 5),
+    ('books', ('hunger', '', 'collins'), 5),
+    ('books', ('zzzz qqqq', '', ''), 5),
+    ('courses', ('', ''), 5),
+    ('courses', ('data science', ''), 5),
+    ('courses', ('machin lerning', ''), 5),
+    ('courses', ('', 'beginner'), 5),
+    ('courses', ('python', 'intermediate'), 10),
+]
+
+
+@pytest.fixture(scope='module')
+def catalogs():
+    return {kind: load_catalog(kind, file_path=os.path.join(HERE, f'{kind}.csv'))
+            for kind in ('books', 'courses')}
+
+
+@pytest.fixture(scope='module')
+def executor():
+    with ThreadPoolExecutor(max_workers=N_SHARDS, thread_name_prefix='test-shard') as pool:
+        yield pool
+
+
+@pytest.fixture
+def sharded(monkeypatch, catalogs, executor):
+    monkeypatch.setattr(sharding, 'MIN_SHARD_ROWS', 100)
+    return {kind: sharding.build_sharded_catalog(kind, df, N_SHARDS, executor) for kind, df in catalogs.items()}
+
+
+def test_small_catalogs_are_not_sharded(catalogs):
+    assert sharding.build_sharded_catalog('books', catalogs['books'], N_SHARDS) is None
+
+
+def test_shards_cover_every_row_once(sharded, catalogs):
+    for kind, shards in sharded.items():
+        assert len(shards) == N_SHARDS
+        assert shards.matches(catalogs[kind])
+        offsets = [shard.offset for shard in shards.shards]
+        assert offsets[0] == 0
+        assert sum(shard.n_rows for shard in shards.shards) == len(catalogs[kind])
+
+
+@pytest.mark.parametrize('kind,params,top_n', QUERIES)
+def test_sharded_search_matches_unsharded(sharded, catalogs, kind, params, top_n):
+    df = catalogs[kind]
+
+    expected = search(kind, df, params, top_n=top_n)
+    actual = search(kind, df, params, top_n=top_n, shards=sharded[kind])
+
+    np.testing.assert_array_equal(actual.positions, expected.positions)
+    assert actual.total == expected.total
+    assert not actual.degraded
+
+
+def test_shards_of_another_dataset_are_ignored(sharded, catalogs):
+    # A reloaded catalog with different rows: searching the old shards would return wrong positions
+    df = catalogs['books'].iloc[::-1].reset_index(drop=True)
+    df.attrs['dataset_version'] = 'reloaded'
+
+    expected = search('books', df, ('the hobit', '', ''))
+    actual = search('books', df, ('the hobit', '', ''), shards=sharded['books'])
+
+    assert len(expected.positions)
+    np.testing.assert_array_equal(actual.positions, expected.positions)
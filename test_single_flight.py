@@ -0,0 +1,157 @@
+"""
+Tests for request coalescing (single_flight.py).
+
+Run with:
+    python -m pytest test_single_flight.py
+"""
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from metrics import MetricsRegistry
+from single_flight import SingleFlight
+
+TIMEOUT_S = 5
+
+
+class StopSession(BaseException):
+    """Stands in for the exceptions Streamlit raises to stop or rerun a session."""
+
+
+def _flights():
+    return SingleFlight(registry=MetricsRegistry())
+
+
+def _start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def _join_waiters(flights, key, n_waiters, fn, outcomes):
+    """Start callers that join the flight in progress; returns once all of them are waiting."""
+    waiting = []
+
+    def caller(joined):
+        try:
+            outcomes.append(flights.do(key, fn, poll=joined.set))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = []
+    for _ in range(n_waiters):
+        joined = threading.Event()
+        waiting.append(joined)
+        threads.append(_start(lambda joined=joined: caller(joined)))
+    for joined in waiting:
+        assert joined.wait(TIMEOUT_S)
+    return threads
+
+
+def _lead(flights, key, gate, outcome, error=None):
+    """Start a leader computing under ``key`` until ``gate`` is set; returns once it runs."""
+    running = threading.Event()
+
+    def fn():
+        running.set()
+        assert gate.wait(TIMEOUT_S)
+        if error is not None:
+            raise error
+        return outcome
+
+    results = []
+
+    def leader():
+        try:
+            results.append(flights.do(key, fn))
+        except BaseException as e:
+            results.append(e)
+
+    thread = _start(leader)
+    assert running.wait(TIMEOUT_S)
+    return thread, results
+
+
+def test_concurrent_callers_share_the_leaders_result():
+    flights = _flights()
+    gate = threading.Event()
+    leader, leader_results = _lead(flights, 'q', gate, ['shared result'])
+
+    outcomes = []
+    waiters = _join_waiters(flights, 'q', 3, lambda: pytest.fail("waiters must not compute"), outcomes)
+    gate.set()
+    for thread in [leader, *waiters]:
+        thread.join(TIMEOUT_S)
+
+    assert leader_results == [(['shared result'], False)]
+    assert len(outcomes) == 3
+    assert all(result is leader_results[0][0] and shared for result, shared in outcomes)
+    assert (flights.executed, flights.shared, flights.in_flight()) == (1, 3, 0)
+
+
+def test_an_exception_is_shared_with_every_waiter():
+    flights = _flights()
+    gate = threading.Event()
+    error = ValueError("bad query")
+    leader, leader_results = _lead(flights, 'q', gate, None, error=error)
+
+    outcomes = []
+    waiters = _join_waiters(flights, 'q', 2, lambda: pytest.fail("waiters must not compute"), outcomes)
+    gate.set()
+    for thread in [leader, *waiters]:
+        thread.join(TIMEOUT_S)
+
+    assert leader_results == [error]
+    assert outcomes == [error, error]
+    assert flights.in_flight() == 0
+
+
+def test_waiters_retry_when_the_leader_is_interrupted():
+    flights = _flights()
+    gate = threading.Event()
+    leader, leader_results = _lead(flights, 'q', gate, None, error=StopSession())
+
+    outcomes = []
+    waiters = _join_waiters(flights, 'q', 1, lambda: 'own result', outcomes)
+    gate.set()
+    for thread in [leader, *waiters]:
+        thread.join(TIMEOUT_S)
+
+    assert isinstance(leader_results[0], StopSession)
+    # The waiter was not handed the interrupt; it became the leader of a new flight
+    assert outcomes == [('own result', False)]
+    assert flights.in_flight() == 0
+
+
+def test_sequential_calls_are_not_cached():
+    flights = _flights()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flights.do('q', fn) == (1, False)
+    assert flights.do('q', fn) == (2, False)
+
+
+def test_do_future_shares_the_future_until_it_completes():
+    flights = _flights()
+    started = []
+
+    def start():
+        started.append(Future())
+        return started[-1]
+
+    first, shared_first = flights.do_future('q', start)
+    second, shared_second = flights.do_future('q', start)
+    assert (shared_first, shared_second) == (False, True)
+    assert second is first and len(started) == 1
+    assert flights.in_flight() == 1
+
+    first.set_result('done')
+    assert flights.in_flight() == 0
+    third, shared_third = flights.do_future('q', start)
+    assert third is not first and not shared_third
@@ -0,0 +1,217 @@
+"""
+Startup Warm-Up
+===============
+
+Without warming, the first visitor after a deploy pays for everything at
+once: loading each catalog, ranking its default ("leave fields empty")
+results, and fetching and resizing every cover and poster on the first
+page. ``WarmUp`` does that work once per process, on a background thread:
+
+1. Loads each catalog through the app's dataset cache (and its indexes).
+2. Ranks the default results of each tab, plus the results for the most
+   common facet values (book authors, course difficulties, movie genres),
+   and keeps their cursors for ``lookup``. Searches without a title never
+   run the fuzzy stage and depend only on the dataset version, so one
+   cursor serves every session.
+3. Prefetches the images of the first rows of every warmed result into the
+   image cache, on a small thread pool and up to a byte limit.
+
+Configured with ``RECOMMENDER_WARMUP`` (0 disables it),
+``RECOMMENDER_WARMUP_FACETS``, ``RECOMMENDER_WARMUP_IMAGE_ROWS``,
+``RECOMMENDER_WARMUP_WORKERS`` and ``RECOMMENDER_WARMUP_IMAGE_MB``.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import REGISTRY
+
+WARMUP_ENABLED = os.environ.get('RECOMMENDER_WARMUP', '1') != '0'
+# Facet values warmed per catalog (most frequent first)
+WARMUP_FACETS = int(os.environ.get('RECOMMENDER_WARMUP_FACETS', 5))
+# Rows per warmed result whose images are prefetched (the largest page size)
+WARMUP_IMAGE_ROWS = int(os.environ.get('RECOMMENDER_WARMUP_IMAGE_ROWS', 20))
+WARMUP_WORKERS = int(os.environ.get('RECOMMENDER_WARMUP_WORKERS', 4))
+WARMUP_IMAGE_BYTES = int(float(os.environ.get('RECOMMENDER_WARMUP_IMAGE_MB', '16')) * 1024 * 1024)
+
+# Per catalog: number of search parameters, position of the warmed filter,
+# column its values come from, and the separator of multi-valued cells
+FACETS = {
+    'books': (3, 2, 'authors', ','),
+    'courses': (2, 1, 'course_difficulty', None),
+    'movies': (2, 1, 'Genre', '|'),
+}
+
+
+def facet_values(df, column, separator=None, limit=WARMUP_FACETS):
+    """Most frequent values of a filter column, lowercased as normalized queries are."""
+    values = df[column].dropna().astype(str)
+    if separator:
+        values = values.str.split(separator).explode()
+    values = values.str.strip().str.lower()
+    return values[values != ''].value_counts().head(limit).index.tolist()
+
+
+def warm_queries(kind, df, limit=WARMUP_FACETS):
+    """
+    Parameter tuples warmed for a catalog.
+
+    Returns:
+        The default query (every field empty), then one query per common
+        facet value
+    """
+    n_params, position, column, separator = FACETS[kind]
+    queries = [('',) * n_params]
+    for value in facet_values(df, column, separator, limit):
+        params = [''] * n_params
+        params[position] = value
+        queries.append(tuple(params))
+    return queries
+
+
+class WarmUp:
+    """Background warm-up of datasets, default results and their images.
+
+    Args:
+        kinds: Catalogs to warm, in order
+        load: Callable ``kind -> DataFrame or None`` (the app's cached loader)
+        search: Callable ``(kind, df, params) -> SearchCursor``
+        image_tasks: Callable ``(kind, df, positions) -> list`` of zero-argument
+            callables, each putting one image into the image cache and
+            returning its size in bytes
+        workers: Concurrent image fetches
+        max_image_bytes: Stop prefetching once this many bytes are cached
+        image_rows: Rows per warmed result whose images are prefetched
+        registry: MetricsRegistry receiving ``warmup.*`` gauges
+    """
+
+    def __init__(self, kinds, load, search, image_tasks, workers=WARMUP_WORKERS,
+                 max_image_bytes=WARMUP_IMAGE_BYTES, image_rows=WARMUP_IMAGE_ROWS, registry=REGISTRY):
+        self.kinds = list(kinds)
+        self.load = load
+        self.search = search
+        self.image_tasks = image_tasks
+        self.workers = workers
+        self.max_image_bytes = max_image_bytes
+        self.image_rows = image_rows
+        self.registry = registry
+        self.state = 'idle'
+        self.elapsed_ms = None
+        self.images = 0
+        self.image_bytes = 0
+        self.hits = 0
+        self.errors = []
+        self._results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start warming on a daemon thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = 'running'
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until warming finishes. Returns True if it has."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == 'done'
+
+    def _run(self):
+        started = time.perf_counter()
+        warmed = []
+        try:
+            for kind in self.kinds:
+                try:
+                    df = self.load(kind)
+                    if df is None:
+                        continue
+                    for params in warm_queries(kind, df):
+                        cursor = self.search(kind, df, params)
+                        with self._lock:
+                            self._results[self._key(kind, df, params)] = cursor
+                        warmed.append((kind, df, cursor))
+                except Exception as e:
+                    self.errors.append(f"{kind}: {type(e).__name__}: {e}")
+            self.registry.set_gauge('warmup.results', len(self._results))
+            self._prefetch(warmed)
+        except Exception as e:
+            self.errors.append(f"warm-up: {type(e).__name__}: {e}")
+        finally:
+            # Always finish, so wait() and stats() never report a warm-up stuck 'running'
+            self.elapsed_ms = (time.perf_counter() - started) * 1000
+            self.registry.set_gauge('warmup.elapsed_ms', self.elapsed_ms)
+            self.state = 'done'
+
+    def _prefetch(self, warmed):
+        """Fetch images for the first rows of each result, best-ranked results first."""
+        tasks = []
+        for kind, df, cursor in warmed:
+            tasks.extend(self.image_tasks(kind, df, cursor.positions[:self.image_rows]))
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='warmup-image') as pool:
+            pending = set()
+            try:
+                for task in tasks:
+                    if self.image_bytes >= self.max_image_bytes:
+                        break
+                    pending.add(pool.submit(task))
+                    if len(pending) >= self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._count_images(done)
+            except RuntimeError as e:
+                # The interpreter is shutting down: "cannot schedule new futures after shutdown"
+                self.errors.append(f"image prefetch stopped: {e}")
+            self._count_images(wait(pending)[0])
+
+    def _count_images(self, futures):
+        for future in futures:
+            try:
+                self.image_bytes += future.result()
+                self.images += 1
+            except Exception as e:
+                self.errors.append(f"image: {type(e).__name__}: {e}")
+        self.registry.set_gauge('warmup.images', self.images)
+        self.registry.set_gauge('warmup.image_bytes', self.image_bytes)
+
+    @staticmethod
+    def _key(kind, df, params):
+        return kind, df.attrs.get('dataset_version'), tuple(params)
+
+    def lookup(self, kind, df, params, max_results):
+        """
+        A warmed cursor for this search, if there is one.
+
+        Args:
+            kind: 'books', 'courses' or 'movies'
+            df: Catalog DataFrame being searched
+            params: Normalized search parameters
+            max_results: The search's cap on ranked positions (None for all)
+
+        Returns:
+            A SearchCursor of the caller's own, or None if this search was
+            not warmed (or was warmed with a different cap)
+        """
+        if df is None or not self._results:
+            return None
+        with self._lock:
+            cursor = self._results.get(self._key(kind, df, params))
+            if cursor is None:
+                return None
+            cap = cursor.total if max_results is None else min(cursor.total, max_results)
+            if len(cursor.positions) != cap:
+                return None
+            self.hits += 1
+            hits = self.hits
+        self.registry.set_gauge('warmup.hits', hits)
+        return cursor.copy()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'results': len(self._results), 'images': self.images,
+                    'image_bytes': self.image_bytes, 'elapsed_ms': self.elapsed_ms, 'hits': self.hits,
+                    'errors': len(self.errors)}